@@ -1,5 +1,47 @@
 # base_agent.py
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Callable, Optional, FrozenSet
+import asyncio
+import sys
+import logging
+import logging.handlers
+import queue
+
+logger = logging.getLogger(__name__)
+
+# 本包日志的根logger，只配置它而不动root logger，避免httpx等第三方库的INFO日志被一并输出
+_PACKAGE_LOGGER = "BaseAgent"
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_agent_logging(level: int = logging.INFO,
+                        handler: Optional[logging.Handler] = None) -> logging.handlers.QueueListener:
+    """
+    配置异步日志：agent线程只把日志记录放入队列，由后台监听线程负责输出，
+    避免在调度热路径上进行同步的stdout I/O
+    
+    重复调用时直接返回已创建的监听器，不会重复添加handler。
+    
+    Returns:
+        QueueListener: 已启动的监听器，退出前（包括出错退出）应调用stop()刷新剩余日志
+    """
+    global _log_listener
+    if _log_listener is not None:
+        return _log_listener
+    
+    log_queue: queue.Queue = queue.Queue(-1)
+    handler = handler or logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    
+    package_logger = logging.getLogger(_PACKAGE_LOGGER)
+    package_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    package_logger.setLevel(level)
+    # 已由本包的handler输出，不再传给root logger，避免重复打印
+    package_logger.propagate = False
+    listener.start()
+    _log_listener = listener
+    return listener
+
 
 class BaseAgent:
     def __init__(self, profile, memory, planner, action, toolset: List[str]):
@@ -8,37 +50,147 @@ class BaseAgent:
         self.planner = planner
         self.action = action
         self.toolset = toolset
+        self.toolset_set: FrozenSet[str] = frozenset(sys.intern(t) for t in toolset)
+        self._action_cache: Dict[str, Callable] = {}
+        # 需要特殊写回context的步骤，其余步骤的结果直接以步骤名存入context
+        self._result_handlers: Dict[str, Callable[[Dict[str, Any], Any], None]] = {
+            "get_competitor_listed_companies": self._store_competitors,
+        }
+
+    def _store_competitors(self, context: Dict[str, Any], result):
+        """竞争对手列表加上目标公司自身，统一存为all_companies"""
+        result.append(self.profile.get_config())
+        context["all_companies"] = result
+
+    def _store_result(self, next_step: str, context: Dict[str, Any], result):
+        handler = self._result_handlers.get(next_step)
+        if handler:
+            handler(context, result)
+        else:
+            context[next_step] = result
+
+    def _build_action_cache(self):
+        """预先解析toolset中的动作函数，避免每一步重复getattr；同时刷新工具名集合"""
+        self.toolset_set = frozenset(sys.intern(t) for t in self.toolset)
+        self._action_cache = {}
+        for name in self.toolset_set:
+            func = getattr(self.action, name, None)
+            if callable(func):
+                self._action_cache[name] = func
 
     def run(self):
+        # completed/failed 保留执行顺序供planner展示，集合用于O(1)查重
         completed, failed = [], []
+        done_steps = set()
         context = {}
+        # toolset可能在注册时被调度器替换，因此在每次运行开始时重新解析
+        self._build_action_cache()
+        new_tick, end_tick = self._tick_hooks()
+
+        # 先一次性请求完整计划并按顺序执行；计划为空或有步骤失败时再逐步规划修复
+        plan_all = getattr(self.planner, "plan_all", None)
+        plan = plan_all(context, completed, failed, self.toolset_set) if plan_all else []
+        replan = not plan
+        for next_step in plan:
+            if new_tick:
+                new_tick()
+            if next_step in done_steps:
+                continue
+            logger.info("📋 按计划执行：%s", next_step)
+            if not self._execute_step(next_step, context, completed, failed, done_steps):
+                replan = True
+                break
 
-        while True:
-            next_step = self.planner.decide_next_step(context, completed, failed, self.toolset)
+        while replan:
+            if new_tick:
+                new_tick()
+            next_step = self.planner.decide_next_step(context, completed, failed, self.toolset_set)
             # next_step = "analyze_companies_in_directory"
             if next_step == "done":
                 break
 
-            if next_step in completed or next_step in failed:
-                print(f"🔄 重复步骤：{next_step}，跳过执行。")
+            if next_step in done_steps:
+                logger.info("🔄 重复步骤：%s，跳过执行。", next_step)
+                continue
+
+            logger.info("🧠 LLM决定执行：%s", next_step)
+            self._execute_step(next_step, context, completed, failed, done_steps)
+        if end_tick:
+            end_tick()
+        return context
+
+    def _tick_hooks(self):
+        """工具集可选的tick钩子：每次planner决策前开启新tick，使同一决策内的重复计算只做一次"""
+        return getattr(self.action, "_new_tick", None), getattr(self.action, "_end_tick", None)
+
+    def _execute_step(self, next_step: str, context: Dict[str, Any], completed: List[str],
+                      failed: List[str], done_steps: set) -> bool:
+        """执行单个步骤并记录结果，返回是否成功"""
+        func = self._action_cache.get(next_step) or getattr(self.action, next_step, None)
+        if not func:
+            logger.warning("❌ 无效步骤：%s", next_step)
+            failed.append(next_step)
+            done_steps.add(next_step)
+            return False
+
+        try:
+            result = func(context)  # 所有函数以 context 为参数
+            self._store_result(next_step, context, result)
+            completed.append(next_step)
+            ok = True
+        except Exception as e:
+            logger.error("❌ %s 执行失败: %s", next_step, e)
+            failed.append(next_step)
+            ok = False
+        done_steps.add(next_step)
+        return ok
+
+    async def _aexecute_step(self, next_step: str, context: Dict[str, Any], completed: List[str],
+                             failed: List[str], done_steps: set) -> bool:
+        """_execute_step的异步包装：放到线程中执行，不阻塞事件循环"""
+        return await asyncio.to_thread(self._execute_step, next_step, context, completed, failed, done_steps)
+
+    async def arun(self):
+        """
+        run的异步版本，流程与run一致（先整体规划，失败时逐步规划修复）；
+        planner支持异步时直接await，规划和工具调用放到线程中执行，使多个agent可在同一事件循环中并发运行
+        """
+        completed, failed = [], []
+        done_steps = set()
+        context = {}
+        self._build_action_cache()
+        new_tick, end_tick = self._tick_hooks()
+
+        plan_all = getattr(self.planner, "plan_all", None)
+        plan = await asyncio.to_thread(plan_all, context, completed, failed, self.toolset_set) if plan_all else []
+        replan = not plan
+        for next_step in plan:
+            if new_tick:
+                new_tick()
+            if next_step in done_steps:
                 continue
+            logger.info("📋 按计划执行：%s", next_step)
+            if not await self._aexecute_step(next_step, context, completed, failed, done_steps):
+                replan = True
+                break
+
+        decide = getattr(self.planner, "adecide_next_step", None)
+        while replan:
+            if new_tick:
+                new_tick()
+            if decide:
+                next_step = await decide(context, completed, failed, self.toolset_set)
+            else:
+                next_step = await asyncio.to_thread(self.planner.decide_next_step, context, completed, failed, self.toolset_set)
+            if next_step == "done":
+                break
 
-            print(f"🧠 LLM决定执行：{next_step}")
-            func = getattr(self.action, next_step, None)
-            if not func:
-                print(f"❌ 无效步骤：{next_step}")
-                failed.append(next_step)
+            if next_step in done_steps:
+                logger.info("🔄 重复步骤：%s，跳过执行。", next_step)
                 continue
 
-            try:
-                result = func(context)  # 所有函数以 context 为参数
-                if next_step == "get_competitor_listed_companies":
-                    result.append(self.profile.get_config())
-                    context["all_companies"] = result
-                else:
-                    context[next_step] = result
-                completed.append(next_step)
-            except Exception as e:
-                print(f"❌ {next_step} 执行失败: {e}")
-                failed.append(next_step)
+            logger.info("🧠 LLM决定执行：%s", next_step)
+            await self._aexecute_step(next_step, context, completed, failed, done_steps)
+        if end_tick:
+            end_tick()
         return context
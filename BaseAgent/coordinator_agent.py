@@ -1,8 +1,12 @@
 # coordinator_agent.py
 from typing import Dict, List, Any, Optional, Tuple
-import json
-import time
+from collections import deque, defaultdict
 import os
+import time
+import functools
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from .base_agent import BaseAgent
 from .memory import AgentMemory
@@ -10,6 +14,52 @@ from .profile import AgentProfile
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from toolset.utils.report_type_config import ReportTypeConfig, ReportType
+from toolset.utils.json_io import dumps
+
+# 尝试导入faiss，如果失败则使用NumPy暴力检索
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+
+# 协调器报告模板，预先定义在模块级别，渲染时使用format_map填充
+_PROGRESS_TMPL = """
+## 项目进展分析
+
+**当前阶段**: {current_phase}
+**总体进度**: {overall_progress:.1%}
+**已完成阶段**: {completed_phases_str}
+
+### Agent状态
+- **已完成**: {completed_agents_str}
+- **运行中**: {active_agents_str}
+- **失败**: {failed_agents_str}
+
+### 记忆统计
+- **基础记忆**: {base_memory_stats}
+- **Agent记忆数量**: {agent_memory_count}
+        """
+
+_STATUS_REPORT_TMPL = """
+# 多Agent系统状态报告
+生成时间: {generated_at}
+
+## 执行进展
+- 启动时间: {start_time}
+- 当前阶段: {current_phase}
+- 已完成: {completed_count} agents
+- 失败: {failed_count} agents
+
+## 记忆使用情况
+- 全局上下文项目: {global_context_size}
+- 基础记忆大小: {base_context_size}
+- 注册Agent数量: {agent_memory_count}
+
+## 下一步建议
+{next_action}
+        """
 
 
 class GlobalMemoryManager:
@@ -23,47 +73,198 @@ class GlobalMemoryManager:
         self.agent_memories: Dict[str, AgentMemory] = {}
         self.global_context = {}
         
+        # 跨agent语义搜索索引：faiss可用时使用HNSW，否则使用合并后的NumPy矩阵
+        # 向量均已L2归一化，内积即余弦相似度；记忆变化时增量追加新向量
+        self.use_faiss = FAISS_AVAILABLE
+        self.hnsw_m = 32
+        self.hnsw_ef_search = 64
+        self.index = None
+        self._matrix: Optional[np.ndarray] = None
+        self._dim: Optional[int] = None
+        self._index_versions: Optional[Tuple] = None
+        self.id_to_meta: List[Tuple[str, AgentMemory, str]] = []
+        self._indexed_rows: Dict[Tuple[int, str], Any] = {}
+        
+        # 查询嵌入缓存：相同查询不再重复调用嵌入模型
+        self._embed = functools.lru_cache(maxsize=1024)(self._embed_uncached)
+        
+        # 记忆快照缓存：按记忆版本号判断是否需要重建对应条目
+        self._snapshot_cache: Dict[str, Any] = {}
+        self._snapshot_versions: Dict[str, int] = {}
+        
     def register_agent_memory(self, agent_name: str, memory: AgentMemory):
-        """注册agent的记忆模块"""
+        """
+        注册agent的记忆模块
+        
+        子agent记忆应由基础记忆的create_child()创建，以基础记忆为父记忆；
+        跨agent搜索只索引各记忆自身的向量，父记忆中的内容不会被重复索引。
+        """
         self.agent_memories[agent_name] = memory
         
     def get_global_memory_snapshot(self) -> Dict[str, Any]:
-        """获取全局记忆快照"""
+        """获取全局记忆快照（仅重建版本号发生变化的记忆条目）"""
+        base_stats = self._cached_snapshot_entry(
+            "__base__", self.base_memory, self.base_memory.get_memory_stats
+        )
         snapshot = {
             "global_context": self.global_context,
-            "base_memory_stats": self.base_memory.get_memory_stats(),
+            "base_memory_stats": base_stats,
             "agent_memories": {}
         }
         
         for agent_name, memory in self.agent_memories.items():
-            snapshot["agent_memories"][agent_name] = {
-                "stats": memory.get_memory_stats(),
-                "context": memory.context_all(),
-                "persistent_keys": memory.list_persistent_keys()
-            }
+            snapshot["agent_memories"][agent_name] = self._cached_snapshot_entry(
+                agent_name, memory, lambda memory=memory: {
+                    "stats": memory.get_memory_stats(),
+                    "context": memory.context_all(),
+                    "persistent_keys": memory.list_persistent_keys()
+                }
+            )
             
         return snapshot
     
-    def cross_agent_search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
-        """跨agent语义搜索"""
-        all_results = []
-        
-        # 搜索基础记忆
-        base_results = self.base_memory.semantic_search(query, top_k, threshold=0.6)
-        for result in base_results:
-            result["source"] = "base_memory"
-            all_results.append(result)
-            
-        # 搜索各个agent的记忆
-        for agent_name, memory in self.agent_memories.items():
-            agent_results = memory.semantic_search(query, top_k, threshold=0.6)
-            for result in agent_results:
-                result["source"] = f"agent_{agent_name}"
-                all_results.append(result)
+    def _cached_snapshot_entry(self, name: str, memory: AgentMemory, build):
+        """记忆版本号未变化时复用缓存的快照条目"""
+        if self._snapshot_versions.get(name) != memory.version or name not in self._snapshot_cache:
+            self._snapshot_cache[name] = build()
+            # get_memory_stats会清理过期缓存并可能递增版本号，因此构建后再记录
+            self._snapshot_versions[name] = memory.version
+        return self._snapshot_cache[name]
+    
+    def _search_sources(self) -> List[Tuple[str, AgentMemory]]:
+        """参与跨agent搜索的记忆来源，同一记忆实例只保留第一次出现"""
+        sources = [("base_memory", self.base_memory)]
+        sources += [(f"agent_{name}", memory) for name, memory in self.agent_memories.items()]
+        seen = set()
+        unique = []
+        for source, memory in sources:
+            if id(memory) not in seen:
+                seen.add(id(memory))
+                unique.append((source, memory))
+        return unique
+    
+    def _reset_search_index(self) -> None:
+        """清空跨agent搜索索引"""
+        self.index = None
+        self._matrix = None
+        self._dim = None
+        self.id_to_meta = []
+        self._indexed_rows = {}
+    
+    def _add_to_search_index(self, vectors: List[np.ndarray]) -> None:
+        """将一批已归一化的向量追加到索引"""
+        block = np.vstack(vectors).astype(np.float32)
+        if self.use_faiss:
+            if self.index is None:
+                self.index = faiss.IndexHNSWFlat(self._dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+                self.index.hnsw.efSearch = self.hnsw_ef_search
+            self.index.add(block)
+        else:
+            self._matrix = block if self._matrix is None else np.vstack([self._matrix, block])
+    
+    def _ensure_search_index(self) -> None:
+        """同步跨agent搜索索引：仅追加新增向量，向量被覆盖时整体重建"""
+        sources = self._search_sources()
+        versions = tuple((id(memory), memory.vector_version) for _, memory in sources)
+        if versions == self._index_versions:
+            return
+        
+        pending = []
+        for source, memory in sources:
+            for key, vector in memory.vector_memory.items():
+                indexed = self._indexed_rows.get((id(memory), key))
+                if indexed is vector:
+                    continue
+                if indexed is not None:
+                    # 已索引的向量被覆盖，HNSW不支持删除，直接重建
+                    self._reset_search_index()
+                    self._index_versions = None
+                    return self._ensure_search_index()
+                pending.append((source, memory, key, vector))
+        
+        new_vectors = []
+        for source, memory, key, vector in pending:
+            normalized = np.asarray(vector, dtype=np.float32).ravel()
+            if self._dim is None:
+                self._dim = normalized.shape[0]
+            elif normalized.shape[0] != self._dim:
+                continue
+            # 优先使用记忆中写入时已计算的范数
+            norm = memory.vector_norms.get(key) or np.linalg.norm(normalized)
+            new_vectors.append(normalized / norm if norm else normalized)
+            self.id_to_meta.append((source, memory, key))
+            self._indexed_rows[(id(memory), key)] = vector
+        
+        if new_vectors:
+            self._add_to_search_index(new_vectors)
+        self._index_versions = versions
+    
+    def _embed_uncached(self, query: str) -> np.ndarray:
+        """
+        对查询做嵌入，返回归一化后的只读float32向量
         
-        # 按相似度排序并返回top_k
-        all_results.sort(key=lambda x: x["similarity"], reverse=True)
-        return all_results[:top_k]
+        嵌入失败时抛出异常，避免失败结果被lru_cache缓存。
+        """
+        for _, memory in self._search_sources():
+            if memory.embedding_model is None:
+                continue
+            embedding = memory.create_embedding(query)
+            if embedding is None:
+                break
+            embedding = np.asarray(embedding, dtype=np.float32).ravel()
+            norm = np.linalg.norm(embedding)
+            embedding = embedding / norm if norm else embedding.copy()
+            # 缓存中的数组被多次复用，禁止原地修改
+            embedding.setflags(write=False)
+            return embedding
+        raise ValueError("查询嵌入失败")
+    
+    def _embed_query(self, query: str) -> Optional[np.ndarray]:
+        """获取查询的嵌入向量（带缓存），失败时返回None"""
+        try:
+            return self._embed(query)
+        except ValueError:
+            return None
+    
+    def cross_agent_search(self, query: str, top_k: int = 10, threshold: float = 0.6) -> List[Dict[str, Any]]:
+        """跨agent语义搜索：查询只嵌入一次，在合并索引上一次检索所有记忆"""
+        self._ensure_search_index()
+        if not self.id_to_meta or top_k <= 0:
+            return []
+        
+        query_embedding = self._embed_query(query)
+        if query_embedding is None or query_embedding.shape[0] != self._dim:
+            return []
+        
+        k = min(top_k, len(self.id_to_meta))
+        if self.use_faiss:
+            distances, indices = self.index.search(query_embedding[None, :], k)
+            hits = [(int(i), float(d)) for i, d in zip(indices[0], distances[0]) if i >= 0]
+        else:
+            similarities = self._matrix @ query_embedding
+            # 先按阈值过滤，只在剩余候选中做top-k选择
+            candidates = np.flatnonzero(similarities >= threshold)
+            if candidates.size == 0:
+                return []
+            if candidates.size > k:
+                candidates = candidates[np.argpartition(-similarities[candidates], k - 1)[:k]]
+            top_idx = candidates[np.argsort(-similarities[candidates])]
+            hits = [(int(i), float(similarities[i])) for i in top_idx]
+        
+        results = []
+        for idx, similarity in hits:
+            if similarity < threshold:
+                break
+            source, memory, key = self.id_to_meta[idx]
+            metadata = memory.vector_metadata.get(key, {})
+            results.append({
+                "key": key,
+                "similarity": similarity,
+                "text": metadata.get("text", ""),
+                "metadata": metadata,
+                "source": source
+            })
+        return results
     
     def get_agent_progress(self, agent_name: str) -> Dict[str, Any]:
         """获取特定agent的进展"""
@@ -93,68 +294,128 @@ class ProgressTracker:
     
     def __init__(self, memory_manager: GlobalMemoryManager):
         self.memory_manager = memory_manager
+        # 多个agent并发执行时保护project_state的读写
+        self._lock = threading.RLock()
+        # agent进入completed/failed状态时通知等待者，替代轮询sleep
+        self._cv = threading.Condition()
+        self.history_limit = 1024
+        # 时间戳统一以整数纳秒存储，仅在展示时格式化
+        self._time = time.time_ns
         self.project_state = {
-            "start_time": datetime.now().isoformat(),
+            "start_ts_ns": self._time(),
             "current_phase": "初始化",
             "completed_phases": [],
             "agent_status": {},
             "overall_progress": 0.0,
             "task_dependencies": {},
-            "execution_history": []
+            # 执行历史只保留最近的记录，避免无限增长
+            "execution_history": deque(maxlen=self.history_limit)
         }
+        # 按状态维护的agent集合，避免每次生成摘要时扫描全部agent；
+        # 用dict保持进入该状态的先后顺序，使报告和提示在多次运行间逐字节一致
+        self._by_status: Dict[str, Dict[str, None]] = defaultdict(dict)
+        self._status_of: Dict[str, str] = {}
+        # 状态版本号，agent状态或阶段变化时递增，供报告缓存判断是否失效
+        self.version = 0
         
     def update_agent_status(self, agent_name: str, status: str, details: Dict[str, Any] = None):
         """更新agent状态"""
-        self.project_state["agent_status"][agent_name] = {
-            "status": status,
-            "timestamp": datetime.now().isoformat(),
-            "details": details or {}
-        }
-        
-        # 记录执行历史
-        self.project_state["execution_history"].append({
-            "agent": agent_name,
-            "action": status,
-            "timestamp": datetime.now().isoformat(),
-            "details": details
-        })
-        
-        self.memory_manager.update_global_context("project_state", self.project_state)
+        with self._lock:
+            previous = self._status_of.get(agent_name)
+            if previous is not None:
+                self._by_status[previous].pop(agent_name, None)
+            self._by_status[status][agent_name] = None
+            self._status_of[agent_name] = status
+            self.version += 1
+            
+            ts_ns = self._time()
+            self.project_state["agent_status"][agent_name] = {
+                "status": status,
+                "ts_ns": ts_ns,
+                "details": details or {}
+            }
+            
+            # 记录执行历史
+            history_entry = {
+                "agent": agent_name,
+                "action": status,
+                "ts_ns": ts_ns,
+                "details": details
+            }
+            self.project_state["execution_history"].append(history_entry)
+            
+            # 只写入发生变化的字段
+            self.memory_manager.update_global_context("project_state_agent_status", self.project_state["agent_status"])
+            self.memory_manager.update_global_context("project_state_history_last", history_entry)
+        
+        # 在释放_lock之后再通知，避免与持有_cv的等待方产生锁顺序冲突
+        if status in ["completed", "failed"]:
+            with self._cv:
+                self._cv.notify_all()
     
     def complete_phase(self, phase_name: str):
         """完成一个阶段"""
-        if phase_name not in self.project_state["completed_phases"]:
-            self.project_state["completed_phases"].append(phase_name)
+        with self._lock:
+            if phase_name not in self.project_state["completed_phases"]:
+                self.project_state["completed_phases"].append(phase_name)
+                
+            # 更新总体进度
+            total_phases = len(self.project_state["completed_phases"]) + 1  # +1 for current phase
+            self.project_state["overall_progress"] = len(self.project_state["completed_phases"]) / total_phases
             
-        # 更新总体进度
-        total_phases = len(self.project_state["completed_phases"]) + 1  # +1 for current phase
-        self.project_state["overall_progress"] = len(self.project_state["completed_phases"]) / total_phases
-        
-        self.memory_manager.update_global_context("project_state", self.project_state)
+            self._publish_phase()
     
     def set_current_phase(self, phase_name: str):
         """设置当前阶段"""
-        self.project_state["current_phase"] = phase_name
-        self.memory_manager.update_global_context("project_state", self.project_state)
+        with self._lock:
+            self.project_state["current_phase"] = phase_name
+            self._publish_phase()
+    
+    def _publish_phase(self):
+        """写入阶段相关字段（调用方需持有锁）"""
+        self.version += 1
+        self.memory_manager.update_global_context("project_state_phase", {
+            "current_phase": self.project_state["current_phase"],
+            "completed_phases": list(self.project_state["completed_phases"]),
+            "overall_progress": self.project_state["overall_progress"]
+        })
+    
+    def get_project_state(self) -> Dict[str, Any]:
+        """按需组装完整的项目状态"""
+        with self._lock:
+            state = dict(self.project_state)
+            state["completed_phases"] = list(self.project_state["completed_phases"])
+            state["agent_status"] = dict(self.project_state["agent_status"])
+            state["execution_history"] = list(self.project_state["execution_history"])
+            return state
+    
+    @staticmethod
+    def _fmt(ts_ns: Optional[int]) -> str:
+        """将纳秒时间戳格式化为ISO字符串"""
+        if ts_ns is None:
+            return ""
+        return datetime.fromtimestamp(ts_ns / 1e9).isoformat()
+    
+    def get_agent_state(self, agent_name: str) -> Optional[str]:
+        """获取指定agent的当前状态"""
+        with self._lock:
+            return self._status_of.get(agent_name)
     
     def get_progress_summary(self) -> Dict[str, Any]:
         """获取进展摘要"""
+        with self._lock:
+            return self._build_progress_summary()
+    
+    def _build_progress_summary(self) -> Dict[str, Any]:
+        """构建进展摘要（调用方需持有锁）"""
         return {
+            "start_time": self._fmt(self.project_state["start_ts_ns"]),
             "current_phase": self.project_state["current_phase"],
             "overall_progress": self.project_state["overall_progress"],
             "completed_phases": self.project_state["completed_phases"],
-            "active_agents": [
-                name for name, info in self.project_state["agent_status"].items()
-                if info["status"] in ["running", "active"]
-            ],
-            "completed_agents": [
-                name for name, info in self.project_state["agent_status"].items()
-                if info["status"] == "completed"
-            ],
-            "failed_agents": [
-                name for name, info in self.project_state["agent_status"].items()
-                if info["status"] == "failed"
-            ]
+            "active_agents": list({**self._by_status["running"], **self._by_status["active"]}),
+            "completed_agents": list(self._by_status["completed"]),
+            "failed_agents": list(self._by_status["failed"])
         }
 
 
@@ -171,6 +432,8 @@ class AgentScheduler:
         self.agent_dependencies: Dict[str, List[str]] = {}
         self.execution_queue: List[str] = []
         self.report_config = ReportTypeConfig()
+        # 按(agent名, 研报类型)缓存解析后的工具集
+        self._toolset_cache: Dict[Tuple[str, ReportType], Optional[Tuple[str, ...]]] = {}
         
     def register_agent(self, agent: BaseAgent, dependencies: List[str] = None, report_type: ReportType = ReportType.COMPANY):
         """注册agent及其依赖关系"""
@@ -186,36 +449,68 @@ class AgentScheduler:
         
     def _update_agent_toolset(self, agent: BaseAgent, report_type: ReportType):
         """根据研报类型更新agent的工具集"""
-        if agent.profile.name == "DataAgent":
-            # 获取数据收集工具
-            data_tools = self.report_config.get_data_tools(report_type)
-            agent.toolset = data_tools
-        elif agent.profile.name == "AnalysisAgent":
-            # 获取分析工具
-            analysis_tools = self.report_config.get_analysis_tools(report_type)
-            agent.toolset = analysis_tools
+        key = (agent.profile.name, report_type)
+        if key not in self._toolset_cache:
+            if agent.profile.name == "DataAgent":
+                # 获取数据收集工具
+                tools = self.report_config.get_data_tools(report_type)
+            elif agent.profile.name == "AnalysisAgent":
+                # 获取分析工具
+                tools = self.report_config.get_analysis_tools(report_type)
+            else:
+                tools = None
+            self._toolset_cache[key] = tuple(tools) if tools is not None else None
         
+        tools = self._toolset_cache[key]
+        if tools is not None:
+            agent.toolset = list(tools)
+        
+    def _build_dag(self) -> Tuple[Dict[str, int], Dict[str, int], Dict[str, List[str]]]:
+        """
+        根据agent_dependencies构建依赖DAG
+        
+        Returns:
+            Tuple: (depth, wait, unlocks)
+                - depth: 每个agent在DAG中的层级，无依赖的agent为0
+                - wait: 每个agent尚未完成的依赖数量
+                - unlocks: 每个agent完成后可能被解锁的下游agent列表
+        """
+        depth: Dict[str, int] = {}
+        unlocks: Dict[str, List[str]] = {name: [] for name in self.agent_registry}
+        wait = {name: len(self.agent_dependencies.get(name, [])) for name in self.agent_registry}
+        
+        def _depth(name: str, visiting: set) -> int:
+            if name in depth:
+                return depth[name]
+            if name in visiting:
+                raise ValueError(f"检测到循环依赖: {name}")
+            visiting.add(name)
+            deps = [d for d in self.agent_dependencies.get(name, []) if d in self.agent_registry]
+            depth[name] = 1 + max((_depth(d, visiting) for d in deps), default=-1)
+            visiting.discard(name)
+            return depth[name]
+        
+        for name in self.agent_registry:
+            _depth(name, set())
+            for dep in self.agent_dependencies.get(name, []):
+                # 未注册的依赖永远不会完成，对应agent保持阻塞（与can_execute_agent一致）
+                if dep in unlocks:
+                    unlocks[dep].append(name)
+        
+        return depth, wait, unlocks
+    
     def can_execute_agent(self, agent_name: str) -> bool:
         """检查agent是否可以执行（依赖是否满足）"""
-        dependencies = self.agent_dependencies.get(agent_name, [])
-        completed_agents = self.progress_tracker.get_progress_summary()["completed_agents"]
-        
-        return all(dep in completed_agents for dep in dependencies)
+        return all(
+            self.progress_tracker.get_agent_state(dep) == "completed"
+            for dep in self.agent_dependencies.get(agent_name, [])
+        )
     
     def get_next_agent(self) -> Optional[str]:
-        """获取下一个应该执行的agent"""
-        progress = self.progress_tracker.get_progress_summary()
-        completed = set(progress["completed_agents"])
-        failed = set(progress["failed_agents"])
-        active = set(progress["active_agents"])
-        
-        for agent_name in self.agent_registry.keys():
-            if (agent_name not in completed and 
-                agent_name not in failed and 
-                agent_name not in active and
-                self.can_execute_agent(agent_name)):
+        """获取下一个应该执行的agent：尚未开始且依赖均已完成"""
+        for agent_name in self.agent_registry:
+            if self.progress_tracker.get_agent_state(agent_name) is None and self.can_execute_agent(agent_name):
                 return agent_name
-                
         return None
     
     def execute_agent(self, agent_name: str) -> Dict[str, Any]:
@@ -233,7 +528,7 @@ class AgentScheduler:
         
         # 更新状态为运行中
         self.progress_tracker.update_agent_status(agent_name, "running", {
-            "start_time": datetime.now().isoformat()
+            "start_ts_ns": time.time_ns()
         })
         
         try:
@@ -249,7 +544,7 @@ class AgentScheduler:
             
             # 更新状态为完成
             self.progress_tracker.update_agent_status(agent_name, "completed", {
-                "end_time": datetime.now().isoformat(),
+                "end_ts_ns": time.time_ns(),
                 "result_keys": list(result.keys()) if isinstance(result, dict) else []
             })
             
@@ -261,7 +556,7 @@ class AgentScheduler:
         except Exception as e:
             # 更新状态为失败
             self.progress_tracker.update_agent_status(agent_name, "failed", {
-                "end_time": datetime.now().isoformat(),
+                "end_ts_ns": time.time_ns(),
                 "error": str(e)
             })
             return {"error": str(e)}
@@ -283,30 +578,80 @@ class CoordinatorActionToolset:
         self.scheduler = scheduler
         self.progress_tracker = progress_tracker
         self.memory_manager = memory_manager
+        
+        # 报告缓存：进展与基础记忆均未变化且未超过刷新间隔时直接复用
+        self.report_refresh_interval = 2.0
+        self._report_cache: Dict[str, Tuple[Tuple[int, int], float, str]] = {}
+        self._report_lock = threading.Lock()
+        self._last_progress_fields: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None
+        
+        # 单次planner决策（tick）内的计算缓存，None表示不在tick内、不缓存
+        self._tick_cache: Optional[Dict[str, Any]] = None
+    
+    def _new_tick(self):
+        """开始新的决策tick，丢弃上一个tick的缓存"""
+        self._tick_cache = {}
+    
+    def _end_tick(self):
+        """结束tick，之后的调用直接计算"""
+        self._tick_cache = None
+    
+    def _cached(self, name: str, compute):
+        """同一tick内只计算一次"""
+        cache = self._tick_cache
+        if cache is None:
+            return compute()
+        if name not in cache:
+            cache[name] = compute()
+        return cache[name]
+    
+    def _cached_report(self, name: str, compute, context: Dict[str, Any]) -> str:
+        """
+        返回缓存的报告，状态发生变化或超过刷新间隔时同步重新生成
+        """
+        state = (self.progress_tracker.version, self.memory_manager.base_memory.version)
+        with self._report_lock:
+            cached = self._report_cache.get(name)
+            if (cached is not None and cached[0] == state
+                    and time.monotonic() - cached[1] <= self.report_refresh_interval):
+                return cached[2]
+            report = compute(context)
+            self._report_cache[name] = (state, time.monotonic(), report)
+            return report
     
     def analyze_global_progress(self, context: Dict[str, Any]) -> str:
         """分析全局进展"""
-        progress = self.progress_tracker.get_progress_summary()
-        memory_snapshot = self.memory_manager.get_global_memory_snapshot()
-        
-        analysis = f"""
-## 项目进展分析
-
-**当前阶段**: {progress['current_phase']}
-**总体进度**: {progress['overall_progress']:.1%}
-**已完成阶段**: {', '.join(progress['completed_phases'])}
-
-### Agent状态
-- **已完成**: {', '.join(progress['completed_agents'])}
-- **运行中**: {', '.join(progress['active_agents'])}
-- **失败**: {', '.join(progress['failed_agents'])}
-
-### 记忆统计
-- **基础记忆**: {memory_snapshot['base_memory_stats']}
-- **Agent记忆数量**: {len(memory_snapshot['agent_memories'])}
+        return self._cached_report("global_progress", self._compute_global_progress, context)
+    
+    def _progress_fields(self, progress: Dict[str, Any]) -> Dict[str, Any]:
         """
+        将进展摘要中的列表预先拼接为字符串
         
-        return analysis
+        同一份摘要被多个报告使用时只拼接一次。
+        """
+        cached = self._last_progress_fields
+        if cached is not None and cached[0] is progress:
+            return cached[1]
+        fields = dict(progress)
+        fields["completed_phases_str"] = ", ".join(progress["completed_phases"])
+        fields["completed_agents_str"] = ", ".join(progress["completed_agents"])
+        fields["active_agents_str"] = ", ".join(progress["active_agents"])
+        fields["failed_agents_str"] = ", ".join(progress["failed_agents"])
+        fields["completed_count"] = len(progress["completed_agents"])
+        fields["failed_count"] = len(progress["failed_agents"])
+        self._last_progress_fields = (progress, fields)
+        return fields
+    
+    def _compute_global_progress(self, context: Dict[str, Any]) -> str:
+        """渲染全局进展分析"""
+        progress = self._cached("progress", self.progress_tracker.get_progress_summary)
+        memory_snapshot = self._cached("snapshot", self.memory_manager.get_global_memory_snapshot)
+        
+        return _PROGRESS_TMPL.format_map({
+            **self._progress_fields(progress),
+            "base_memory_stats": memory_snapshot['base_memory_stats'],
+            "agent_memory_count": len(memory_snapshot['agent_memories'])
+        })
     
     def decide_next_action(self, context: Dict[str, Any]) -> str:
         """决定下一步行动"""
@@ -314,7 +659,7 @@ class CoordinatorActionToolset:
         if next_agent:
             return f"execute_agent_{next_agent}"
         
-        progress = self.progress_tracker.get_progress_summary()
+        progress = self._cached("progress", self.progress_tracker.get_progress_summary)
         if progress['active_agents']:
             return "wait_for_completion"
         elif progress['failed_agents']:
@@ -340,44 +685,37 @@ class CoordinatorActionToolset:
                 "can_execute": self.scheduler.can_execute_agent(agent_name)
             }
         
-        return json.dumps(dependency_status, indent=2, ensure_ascii=False)
+        return dumps(dependency_status, default=str)
     
     def search_knowledge(self, context: Dict[str, Any]) -> str:
         """搜索知识库"""
         query = context.get("search_query", "财务分析进展")
         results = self.memory_manager.cross_agent_search(query, top_k=5)
         
-        summary = "## 知识搜索结果\n\n"
+        parts = ["## 知识搜索结果\n\n"]
         for i, result in enumerate(results, 1):
-            summary += f"**{i}. [{result['source']}] (相似度: {result['similarity']:.3f})**\n"
-            summary += f"{result['text'][:200]}...\n\n"
+            parts.append(f"**{i}. [{result['source']}] (相似度: {result['similarity']:.3f})**\n")
+            parts.append(f"{result['text'][:200]}...\n\n")
             
-        return summary
+        return "".join(parts)
     
     def generate_status_report(self, context: Dict[str, Any]) -> str:
         """生成状态报告"""
-        progress = self.progress_tracker.get_progress_summary()
-        memory_stats = self.memory_manager.get_global_memory_snapshot()
-        
-        report = f"""
-# 多Agent系统状态报告
-生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-## 执行进展
-- 当前阶段: {progress['current_phase']}
-- 已完成: {len(progress['completed_agents'])} agents
-- 失败: {len(progress['failed_agents'])} agents
-
-## 记忆使用情况
-- 全局上下文项目: {len(memory_stats['global_context'])}
-- 基础记忆大小: {memory_stats['base_memory_stats']['context_size']}
-- 注册Agent数量: {len(memory_stats['agent_memories'])}
-
-## 下一步建议
-{self.decide_next_action(context)}
-        """
-        
-        return report
+        return self._cached_report("status_report", self._compute_status_report, context)
+    
+    def _compute_status_report(self, context: Dict[str, Any]) -> str:
+        """渲染系统状态报告"""
+        progress = self._cached("progress", self.progress_tracker.get_progress_summary)
+        memory_stats = self._cached("snapshot", self.memory_manager.get_global_memory_snapshot)
+        
+        return _STATUS_REPORT_TMPL.format_map({
+            **self._progress_fields(progress),
+            "generated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "global_context_size": len(memory_stats['global_context']),
+            "base_context_size": memory_stats['base_memory_stats']['context_size'],
+            "agent_memory_count": len(memory_stats['agent_memories']),
+            "next_action": self.decide_next_action(context)
+        })
 
 
 class CoordinatorAgent(BaseAgent):
@@ -448,35 +786,72 @@ class CoordinatorAgent(BaseAgent):
         """注册要管理的agent"""
         self.scheduler.register_agent(agent, dependencies, self.current_report_type)
     
-    def execute_workflow(self) -> Dict[str, Any]:
-        """执行完整的工作流程，支持不同研报类型"""
+    def execute_workflow(self, max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        执行完整的工作流程，支持不同研报类型
+        
+        按依赖关系构建DAG，所有依赖已满足的agent并发执行；
+        某个agent完成后立即解锁其下游agent，而不必等待整层完成。
+        
+        Args:
+            max_workers: 最大并发agent数，默认为已注册agent数量
+        """
         report_type_name = self.report_config.get_config(self.current_report_type)["name"]
         self.progress_tracker.set_current_phase(f"执行{report_type_name}工作流程")
         
         print(f"🎯 开始执行{report_type_name}生成流程")
         
         workflow_results = {}
-        
-        while True:
-            next_agent = self.scheduler.get_next_agent()
-            if not next_agent:
-                # 检查是否还有agent在运行
-                active_agents = self.progress_tracker.get_progress_summary()["active_agents"]
-                if not active_agents:
-                    break
-                    
-                # 等待运行中的agent完成
-                time.sleep(1)
-                continue
+        depth, wait, unlocks = self.scheduler._build_dag()
+        if not depth:
+            self.progress_tracker.set_current_phase(f"{report_type_name}工作流程完成")
+            return workflow_results
+        
+        # 复用进展跟踪器的条件变量：保护DAG计数，并在agent结束时唤醒主线程
+        cv = self.progress_tracker._cv
+        pending = 0
+        
+        with ThreadPoolExecutor(max_workers=max_workers or len(depth)) as executor:
+            def submit(agent_name: str):
+                nonlocal pending
+                print(f"🎯 Coordinator: 执行 {agent_name} ({report_type_name})")
+                pending += 1
+                future = executor.submit(self.scheduler.execute_agent, agent_name)
+                future.add_done_callback(lambda f, name=agent_name: on_done(name, f))
             
-            # 执行下一个agent
-            print(f"🎯 Coordinator: 执行 {next_agent} ({report_type_name})")
-            result = self.scheduler.execute_agent(next_agent)
-            workflow_results[next_agent] = result
+            def on_done(agent_name: str, future):
+                nonlocal pending
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"error": str(e)}
+                with cv:
+                    workflow_results[agent_name] = result
+                    
+                    # 生成阶段报告
+                    if agent_name in ["CoordinatorAgent", "DataAgent", "AnalysisAgent", "EvaluationAgent"]:
+                        self.progress_tracker.complete_phase(f"{agent_name}完成")
+                    
+                    # 只有成功完成的agent才能解锁下游
+                    if self.progress_tracker.get_agent_state(agent_name) == "completed":
+                        ready = []
+                        for child in unlocks[agent_name]:
+                            wait[child] -= 1
+                            if wait[child] == 0:
+                                ready.append(child)
+                        for child in sorted(ready, key=depth.get):
+                            submit(child)
+                    
+                    pending -= 1
+                    cv.notify_all()
             
-            # 生成阶段报告
-            if next_agent in ["CoordinatorAgent", "DataAgent", "AnalysisAgent", "EvaluationAgent"]:
-                self.progress_tracker.complete_phase(f"{next_agent}完成")
+            with cv:
+                roots = sorted((name for name, count in wait.items() if count == 0), key=depth.get)
+                for agent_name in roots:
+                    submit(agent_name)
+                # 有超时兜底，防止通知丢失时永久阻塞
+                while pending:
+                    cv.wait(timeout=5.0)
         
         self.progress_tracker.set_current_phase(f"{report_type_name}工作流程完成")
         return workflow_results
@@ -484,7 +859,12 @@ class CoordinatorAgent(BaseAgent):
     def get_global_summary(self) -> str:
         """获取全局摘要"""
         return self.action.generate_status_report({})
-    
+
+    def close(self):
+        """关闭coordinator：写出各记忆尚未落盘的向量数据"""
+        for _, memory in self.memory_manager._search_sources():
+            memory.flush()
+
     def run(self) -> Dict[str, Any]:
         """运行coordinator（可以用于单独的coordinator任务）"""
         return super().run()
\ No newline at end of file
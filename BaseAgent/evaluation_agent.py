@@ -1,7 +1,13 @@
 # evaluation_agent.py
 from typing import Dict, List, Any, Optional
+import asyncio
+import hashlib
+import json
 import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from jinja2 import Environment, StrictUndefined
 from .base_agent import BaseAgent
 from .memory import AgentMemory
 from .profile import AgentProfile
@@ -9,6 +15,52 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from toolset.action_financial import FinancialActionToolset
 from toolset.utils.report_type_config import ReportTypeConfig, ReportType
+from toolset.utils.json_io import dump_json
+
+
+# 批量评价汇总报告模板，模块加载时编译一次
+_BATCH_REPORT_TEMPLATE = Environment(trim_blocks=True, lstrip_blocks=True, undefined=StrictUndefined).from_string("""
+# 批量研报评价汇总报告
+
+## 评价概况
+- **评价时间**: {{ now }}
+- **报告总数**: {{ summary.total_reports }}
+- **成功评价**: {{ summary.successful }}
+- **失败评价**: {{ summary.failed }}
+- **平均评分**: {{ summary.average_score }}/100
+
+## 评分分布
+{% if grades %}
+
+### 等级分布
+{% for name, count, percentage in grades %}
+- **{{ name }}**: {{ count }}份 ({{ "%.1f"|format(percentage) }}%)
+{% endfor %}
+{% endif %}
+{% if types %}
+
+### 研报类型分布
+{% for name, count, percentage in types %}
+- **{{ name }}**: {{ count }}份 ({{ "%.1f"|format(percentage) }}%)
+{% endfor %}
+{% endif %}
+
+## 详细评价结果
+{% for row in successful %}
+
+### {{ row.rank }}. {{ row.name }}
+- **类型**: {{ row.type }}
+- **评分**: {{ row.score }}/100
+- **等级**: {{ row.grade }}
+{% endfor %}
+{% if failed %}
+
+## 评价失败的报告
+{% for row in failed %}
+- **{{ row.name }}**: {{ row.error }}
+{% endfor %}
+{% endif %}
+""")
 
 
 class EvaluationAgent(BaseAgent):
@@ -57,8 +109,68 @@ class EvaluationAgent(BaseAgent):
             "output_format": "detailed_report"
         })
     
+    def _cache_key(self, report_path: str) -> Optional[str]:
+        """由报告内容、评价配置、评价模型和评价提示模板计算缓存键，报告不存在时返回None"""
+        if not os.path.isfile(report_path):
+            return None
+        digest = hashlib.sha256()
+        with open(report_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        # 评价配置、模型或提示模板变化时缓存自动失效
+        config = json.dumps(self.profile.get_config(), sort_keys=True, ensure_ascii=False, default=str)
+        digest.update(config.encode("utf-8"))
+        model = getattr(self.action.cfg, "model", None) or ""
+        digest.update(b"\0" + model.encode("utf-8"))
+        digest.update(b"\0" + self.action.eval_prompt_fingerprint.encode("ascii"))
+        return digest.hexdigest()
+    
+    def _cache_path(self, cache_key: str) -> str:
+        return os.path.join(self.memory.info_dir, "eval_cache", f"{cache_key}.json")
+    
+    def _load_cached_evaluation(self, cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """读取缓存的评价结果"""
+        if cache_key is None:
+            return None
+        path = self._cache_path(cache_key)
+        if not os.path.exists(path):
+            return None
+        try:
+            cached = self.memory.load_json(path)
+        except Exception:
+            return None
+        print(f"♻️ 评价缓存命中: {cache_key[:12]}")
+        return cached
+    
+    def _save_cached_evaluation(self, cache_key: Optional[str], evaluation: Dict[str, Any]):
+        """
+        缓存成功的评价结果
+        
+        并发评价相同内容的报告时会写同一缓存文件，每次写入使用独立的临时文件再原子替换，
+        读取方不会看到半截文件。
+        """
+        if cache_key is None or not isinstance(evaluation, dict) or "error" in evaluation:
+            return
+        path = self._cache_path(cache_key)
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            os.close(fd)
+            dump_json(tmp_path, evaluation, indent=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            print(f"⚠️ 评价结果缓存失败: {e}")
+    
     def evaluate_report(self, report_path: str) -> Dict[str, Any]:
-        """评价指定的研报文件"""
+        """评价指定的研报文件，相同内容和配置的报告直接返回缓存结果"""
+        cache_key = self._cache_key(report_path)
+        cached = self._load_cached_evaluation(cache_key)
+        if cached is not None:
+            return cached
+        
         # 设置评价任务的上下文
         context = {"report_path": report_path}
         
@@ -68,6 +180,7 @@ class EvaluationAgent(BaseAgent):
         # 返回最终评价结果
         final_evaluation = self.memory.context_get("final_evaluation")
         if final_evaluation:
+            self._save_cached_evaluation(cache_key, final_evaluation)
             return final_evaluation
         else:
             return {
@@ -85,31 +198,127 @@ class EvaluationAgent(BaseAgent):
         # 调用父类的run方法
         return super().run()
     
-    def batch_evaluate_reports(self, report_paths: List[str]) -> List[Dict[str, Any]]:
-        """批量评价多个研报"""
-        results = []
+    async def arun(self, initial_context: Dict[str, Any] = None) -> Dict[str, Any]:
+        """run的异步版本，支持传入初始上下文"""
+        if initial_context:
+            for key, value in initial_context.items():
+                self.memory.context_set(key, value)
+        return await super().arun()
+    
+    async def aevaluate_report(self, report_path: str) -> Dict[str, Any]:
+        """evaluate_report的异步版本"""
+        cache_key = await asyncio.to_thread(self._cache_key, report_path)
+        cached = self._load_cached_evaluation(cache_key)
+        if cached is not None:
+            return cached
+        
+        result = await self.arun({"report_path": report_path})
+        
+        final_evaluation = self.memory.context_get("final_evaluation")
+        if final_evaluation:
+            self._save_cached_evaluation(cache_key, final_evaluation)
+            return final_evaluation
+        else:
+            return {
+                "error": "评价未完成",
+                "context_keys": list(result.keys()) if isinstance(result, dict) else []
+            }
+    
+    async def abatch_evaluate_reports(self, report_paths: List[str], concurrency: int = 16) -> List[Dict[str, Any]]:
+        """
+        异步批量评价多个研报，结果顺序与report_paths一致
+        
+        Args:
+            concurrency: 同时进行的评价数量上限
+        """
+        sem = asyncio.Semaphore(concurrency)
+        
+        async def _bounded(report_path: str) -> Dict[str, Any]:
+            async with sem:
+                try:
+                    worker = EvaluationAgent(self.profile, self._clone_memory(), self.planner,
+                                             self.action.llm, self.action.cfg)
+                    result = await worker.aevaluate_report(report_path)
+                    result["report_path"] = report_path
+                    print(f"✅ 完成评价: {os.path.basename(report_path)}")
+                    return result
+                except Exception as e:
+                    print(f"❌ 评价失败: {os.path.basename(report_path)} - {e}")
+                    return {
+                        "report_path": report_path,
+                        "error": str(e),
+                        "overall_score": 0,
+                        "grade": "评价失败"
+                    }
+        
+        return list(await asyncio.gather(*[_bounded(report_path) for report_path in report_paths]))
+    
+    def _clone_memory(self) -> AgentMemory:
+        """
+        创建与当前记忆同目录配置的独立记忆，供单个报告的并发评价使用
+        
+        多个副本共享同一vector_dir，副本的向量不落盘，避免并发写向量文件时互相覆盖。
+        """
+        m = self.memory
+        return AgentMemory(m.data_dir, m.info_dir, m.industry_dir,
+                           embedding_model=m.embedding_model, vector_dir=m.vector_dir,
+                           persist_vectors=False)
+    
+    def _evaluate_one(self, report_path: str, isolated: bool = False) -> Dict[str, Any]:
+        """
+        评价单个报告，失败时返回错误结果而不抛出异常
         
-        for report_path in report_paths:
-            try:
+        Args:
+            isolated: 为True时使用独立的记忆和工具集，可安全地与其他评价并发执行
+        """
+        try:
+            if isolated:
+                worker = EvaluationAgent(self.profile, self._clone_memory(), self.planner,
+                                         self.action.llm, self.action.cfg)
+            else:
                 # 为每个报告重置memory context
                 self.memory.context_clear()
-                
-                result = self.evaluate_report(report_path)
-                result["report_path"] = report_path
-                results.append(result)
-                
-                print(f"✅ 完成评价: {os.path.basename(report_path)}")
-                
-            except Exception as e:
-                error_result = {
-                    "report_path": report_path,
-                    "error": str(e),
-                    "overall_score": 0,
-                    "grade": "评价失败"
-                }
-                results.append(error_result)
-                print(f"❌ 评价失败: {os.path.basename(report_path)} - {e}")
+                worker = self
+            
+            result = worker.evaluate_report(report_path)
+            result["report_path"] = report_path
+            print(f"✅ 完成评价: {os.path.basename(report_path)}")
+            return result
+            
+        except Exception as e:
+            print(f"❌ 评价失败: {os.path.basename(report_path)} - {e}")
+            return {
+                "report_path": report_path,
+                "error": str(e),
+                "overall_score": 0,
+                "grade": "评价失败"
+            }
+    
+    def batch_evaluate_reports(self, report_paths: List[str], n_jobs: int = 1,
+                               mode: str = "thread") -> List[Dict[str, Any]]:
+        """
+        批量评价多个研报，结果顺序与report_paths一致
         
+        Args:
+            n_jobs: 并发评价的报告数量，默认为1即逐个评价，大于1时才按mode并发
+            mode: "sequential" 逐个评价；"thread" 线程池并发评价；"async" 事件循环并发评价
+        """
+        if mode == "async":
+            return asyncio.run(self.abatch_evaluate_reports(report_paths, concurrency=n_jobs))
+        if mode == "sequential" or n_jobs <= 1 or len(report_paths) <= 1:
+            return [self._evaluate_one(report_path) for report_path in report_paths]
+        if mode != "thread":
+            raise ValueError(f"未知的批量评价模式: {mode}")
+        
+        # 评价主要阻塞在LLM请求和文件I/O上，线程池可以并发执行；每个报告使用独立记忆
+        results: List[Optional[Dict[str, Any]]] = [None] * len(report_paths)
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            futures = {
+                executor.submit(self._evaluate_one, report_path, True): i
+                for i, report_path in enumerate(report_paths)
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
         return results
     
     def get_evaluation_summary(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -117,45 +326,47 @@ class EvaluationAgent(BaseAgent):
         if not results:
             return {"error": "没有评价结果"}
         
-        # 统计评价结果
-        successful_evaluations = [r for r in results if "error" not in r]
-        failed_evaluations = [r for r in results if "error" in r]
+        # 单次遍历累计所有统计信息
+        n_ok = n_fail = 0
+        score_sum = 0
+        score_min = score_max = None
+        grade_counts: Dict[str, int] = {}
+        type_distribution: Dict[str, int] = {}
+        for result in results:
+            if "error" in result:
+                n_fail += 1
+                continue
+            n_ok += 1
+            score = result.get("overall_score", 0)
+            score_sum += score
+            if score_min is None or score < score_min:
+                score_min = score
+            if score_max is None or score > score_max:
+                score_max = score
+            grade = result.get("grade", "未知")
+            grade_counts[grade] = grade_counts.get(grade, 0) + 1
+            report_type = result.get("report_type", "未知")
+            type_distribution[report_type] = type_distribution.get(report_type, 0) + 1
         
-        if not successful_evaluations:
+        if not n_ok:
             return {
                 "total_reports": len(results),
                 "successful": 0,
-                "failed": len(failed_evaluations),
+                "failed": n_fail,
                 "average_score": 0,
                 "grade_distribution": {}
             }
         
-        # 计算统计信息
-        scores = [r.get("overall_score", 0) for r in successful_evaluations]
-        average_score = sum(scores) / len(scores) if scores else 0
-        
-        # 等级分布
-        grade_counts = {}
-        for result in successful_evaluations:
-            grade = result.get("grade", "未知")
-            grade_counts[grade] = grade_counts.get(grade, 0) + 1
-        
-        # 按研报类型分布
-        type_distribution = {}
-        for result in successful_evaluations:
-            report_type = result.get("report_type", "未知")
-            type_distribution[report_type] = type_distribution.get(report_type, 0) + 1
-        
         return {
             "total_reports": len(results),
-            "successful": len(successful_evaluations),
-            "failed": len(failed_evaluations),
-            "average_score": round(average_score, 2),
+            "successful": n_ok,
+            "failed": n_fail,
+            "average_score": round(score_sum / n_ok, 2),
             "grade_distribution": grade_counts,
             "type_distribution": type_distribution,
             "score_range": {
-                "min": min(scores) if scores else 0,
-                "max": max(scores) if scores else 0
+                "min": score_min,
+                "max": score_max
             }
         }
     
@@ -167,66 +378,42 @@ class EvaluationAgent(BaseAgent):
         if output_path is None:
             output_path = f"批量评价汇总报告_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
         
-        # 构建汇总报告内容
-        report_content = f"""
-# 批量研报评价汇总报告
-
-## 评价概况
-- **评价时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-- **报告总数**: {summary['total_reports']}
-- **成功评价**: {summary['successful']}
-- **失败评价**: {summary['failed']}
-- **平均评分**: {summary['average_score']}/100
-
-## 评分分布
-"""
-        
-        # 等级分布
-        if summary.get('grade_distribution'):
-            report_content += "\n### 等级分布\n"
-            for grade, count in summary['grade_distribution'].items():
-                percentage = (count / summary['successful']) * 100
-                report_content += f"- **{grade}**: {count}份 ({percentage:.1f}%)\n"
-        
-        # 研报类型分布  
-        if summary.get('type_distribution'):
-            report_content += "\n### 研报类型分布\n"
-            for report_type, count in summary['type_distribution'].items():
-                percentage = (count / summary['successful']) * 100
-                report_content += f"- **{report_type}**: {count}份 ({percentage:.1f}%)\n"
-        
-        # 详细评价结果
-        report_content += "\n## 详细评价结果\n"
+        # 预先整理各部分数据，版式由预编译的模板负责
+        def distribution(counts: Dict[str, int]):
+            return [(name, count, count / summary['successful'] * 100) for name, count in counts.items()]
         
-        successful_results = [r for r in results if "error" not in r]
         # 按评分排序
-        successful_results.sort(key=lambda x: x.get("overall_score", 0), reverse=True)
-        
-        for i, result in enumerate(successful_results, 1):
-            report_name = os.path.basename(result.get("report_path", f"报告{i}"))
-            score = result.get("overall_score", 0)
-            grade = result.get("grade", "未知")
-            report_type = result.get("report_type", "未知")
-            
-            report_content += f"""
-### {i}. {report_name}
-- **类型**: {report_type}
-- **评分**: {score}/100
-- **等级**: {grade}
-"""
-        
-        # 失败的评价
+        successful_results = sorted((r for r in results if "error" not in r),
+                                    key=lambda x: x.get("overall_score", 0), reverse=True)
         failed_results = [r for r in results if "error" in r]
-        if failed_results:
-            report_content += "\n## 评价失败的报告\n"
-            for result in failed_results:
-                report_name = os.path.basename(result.get("report_path", "未知"))
-                error_msg = result.get("error", "未知错误")
-                report_content += f"- **{report_name}**: {error_msg}\n"
+        
+        report_content = _BATCH_REPORT_TEMPLATE.render(
+            now=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            summary=summary,
+            grades=distribution(summary.get('grade_distribution') or {}),
+            types=distribution(summary.get('type_distribution') or {}),
+            successful=[
+                {
+                    "rank": i,
+                    "name": os.path.basename(result.get("report_path", f"报告{i}")),
+                    "type": result.get("report_type", "未知"),
+                    "score": result.get("overall_score", 0),
+                    "grade": result.get("grade", "未知")
+                }
+                for i, result in enumerate(successful_results, 1)
+            ],
+            failed=[
+                {
+                    "name": os.path.basename(result.get("report_path", "未知")),
+                    "error": result.get("error", "未知错误")
+                }
+                for result in failed_results
+            ]
+        )
         
         # 保存报告
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
+            with open(output_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
                 f.write(report_content.strip())
             return f"批量评价汇总报告已保存至: {output_path}"
         except Exception as e:
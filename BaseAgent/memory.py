@@ -1,11 +1,30 @@
 # memory.py
 import os
+import sys
 import json
-import glob
 import time
+import atexit
+import threading
+import weakref
+from collections import OrderedDict
 import numpy as np
 from typing import Dict, Any, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
+from toolset.utils.json_io import orjson, ORJSON_AVAILABLE, loads
+
+# 尝试导入faiss，如果失败则使用NumPy暴力检索
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+
+def _flush_at_exit(memory_ref: "weakref.ref"):
+    """进程退出时写出尚未落盘的向量数据"""
+    memory = memory_ref()
+    if memory is not None:
+        memory.flush()
 
 class AgentMemory:
     """
@@ -14,9 +33,18 @@ class AgentMemory:
     - 长期记忆：持久化存储，结构化数据
     - 上下文记忆：当前会话状态
     - 向量记忆：语义搜索支持
+    
+    可指定只读的父记忆（parent）：缓存、上下文、长期记忆在本地未命中时回落到父记忆读取，
+    写入只发生在本地，使子agent只保存自身的增量数据。
+    
+    persist_vectors为False时向量记忆只保留在内存中，flush()不写盘，
+    用于与其他实例共享同一vector_dir的临时记忆，避免并发覆盖向量文件。
     """
     def __init__(self, data_dir: str, info_dir: str, industry_dir: str, 
-                 embedding_model: Optional[Any] = None, vector_dir: Optional[str] = None):
+                 embedding_model: Optional[Any] = None, vector_dir: Optional[str] = None,
+                 parent: Optional["AgentMemory"] = None, persist_vectors: bool = True):
+        self.parent = parent
+        self.persist_vectors = persist_vectors
         self.data_dir = data_dir
         self.info_dir = info_dir
         self.industry_dir = industry_dir
@@ -37,53 +65,227 @@ class AgentMemory:
         self.embedding_model = embedding_model
         self.vector_memory: Dict[str, np.ndarray] = {}
         self.vector_metadata: Dict[str, Dict[str, Any]] = {}
+        # 每个已存向量的L2范数，写入时计算一次，之后归一化无需重复求范数
+        self.vector_norms: Dict[str, float] = {}
+        # 归一化后的float32向量矩阵（按容量倍增预分配），语义搜索和去重时一次BLAS矩阵向量乘法完成打分
+        self._unit_matrix: Optional[np.ndarray] = None
+        self._emb_keys: List[str] = []
+        self._emb_rows: Dict[str, int] = {}
+        # 可选的FAISS HNSW索引（内积即余弦相似度），行顺序与_faiss_keys一致；
+        # HNSW不支持删除，覆盖已有键时标记为脏，检索前整体重建
+        self.use_faiss = FAISS_AVAILABLE
+        self.hnsw_m = 32
+        self._faiss_index = None
+        self._faiss_keys: List[str] = []
+        self._faiss_dirty = False
+        # 与已有向量相似度超过该阈值的文本视为重复，不再重复存储，新键记为已有键的别名
+        self.dedup_threshold = 0.98
+        self.vector_aliases: Dict[str, str] = {}
+        # 向量数据延迟落盘：写入只标记为脏，由flush()或进程退出时统一保存
+        self._vectors_dirty = False
+        if persist_vectors:
+            atexit.register(_flush_at_exit, weakref.ref(self))
+        # 向量记忆版本号，每次写入递增，供外部判断索引是否需要重建
+        self.vector_version = 0
+        # 记忆整体版本号，任何写入都会递增，供外部判断快照是否失效
+        self.version = 0
         
         # 加载持久化数据
         self._load_persistent_data()
         self._load_vector_data()
 
     def _load_persistent_data(self):
-        """加载持久化数据到内存"""
-        self.persistent_data = {}
-        for file_path in glob.glob(os.path.join(self.info_dir, "*.json")):
-            key = os.path.splitext(os.path.basename(file_path))[0]
-            try:
-                self.persistent_data[key] = self.load_json(file_path)
-            except:
-                continue
+        """
+        建立长期记忆的键索引，数据在首次读取时才从磁盘加载
+        
+        persistent_data是最近使用数据的LRU缓存，最多保留persistent_cache_size条。
+        """
+        self.persistent_cache_size = 256
+        self.persistent_data: "OrderedDict[str, dict]" = OrderedDict()
+        self._persistent_lock = threading.Lock()
+        # 单次scandir建立索引，之后由save_persistent维护，列出键时无需再访问磁盘
+        with os.scandir(self.info_dir) as entries:
+            self._persistent_index = {
+                entry.name[:-5] for entry in entries
+                if entry.name.endswith(".json") and entry.is_file()
+            }
+
+    def _cache_persistent(self, key: str, data: dict):
+        """写入LRU缓存（调用方需持有_persistent_lock）"""
+        self.persistent_data[key] = data
+        self.persistent_data.move_to_end(key)
+        while len(self.persistent_data) > self.persistent_cache_size:
+            self.persistent_data.popitem(last=False)
 
     def _load_vector_data(self):
         """加载向量数据"""
+        matrix_file = os.path.join(self.vector_dir, "vectors.npy")
+        keys_file = os.path.join(self.vector_dir, "keys.json")
+        index_file = os.path.join(self.vector_dir, "vectors.faiss")
         vector_file = os.path.join(self.vector_dir, "vectors.json")
         metadata_file = os.path.join(self.vector_dir, "metadata.json")
+        aliases_file = os.path.join(self.vector_dir, "aliases.json")
         
-        if os.path.exists(vector_file):
+        if os.path.exists(matrix_file) and os.path.exists(keys_file):
+            try:
+                # 内存映射加载，各向量是映射上的只读视图，未访问的页不会读入内存
+                matrix = np.load(matrix_file, mmap_mode='r')
+                keys = self.load_json(keys_file)
+                for row, key in enumerate(keys):
+                    self.vector_memory[key] = matrix[row]
+            except:
+                pass
+            self._rebuild_embedding_matrix(index_file)
+        elif os.path.exists(vector_file):
+            # 兼容旧版JSON格式，下次保存时转为二进制格式
             try:
                 vector_data = self.load_json(vector_file)
                 for key, vector_list in vector_data.items():
                     self.vector_memory[key] = np.array(vector_list)
             except:
                 pass
+            self._rebuild_embedding_matrix()
         
         if os.path.exists(metadata_file):
             try:
                 self.vector_metadata = self.load_json(metadata_file)
             except:
                 pass
+        
+        if os.path.exists(aliases_file):
+            try:
+                self.vector_aliases = self.load_json(aliases_file)
+            except:
+                pass
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        """L2归一化为float32一维向量"""
+        unit = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(unit)
+        return unit / norm if norm else unit
+
+    def _rebuild_embedding_matrix(self, index_file: Optional[str] = None):
+        """根据vector_memory重建向量矩阵及FAISS索引"""
+        self._unit_matrix = None
+        self._emb_keys = []
+        self._emb_rows = {}
+        self.vector_norms = {}
+        for key in self.vector_memory:
+            self._set_embedding_row(key, self._unit_of(key), index=False)
+        self._build_faiss_index(index_file)
+
+    def _unit_of(self, key: str) -> np.ndarray:
+        """用存储的范数归一化已存向量"""
+        raw = np.asarray(self.vector_memory[key], dtype=np.float32).ravel()
+        norm = self.vector_norms.get(key)
+        if norm is None:
+            norm = float(np.linalg.norm(raw)) or 1e-12
+            self.vector_norms[key] = norm
+        return raw / norm
+
+    def _build_faiss_index(self, index_file: Optional[str] = None):
+        """按矩阵行顺序整体构建FAISS索引，持久化的索引与当前向量一致时直接加载"""
+        self._faiss_index = None
+        self._faiss_keys = []
+        self._faiss_dirty = False
+        if not self.use_faiss or not self._emb_keys:
+            return
+        
+        dim = self._unit_matrix.shape[1]
+        if index_file and os.path.exists(index_file):
+            try:
+                index = faiss.read_index(index_file)
+                if index.ntotal == len(self._emb_keys) and index.d == dim:
+                    self._faiss_index = index
+                    self._faiss_keys = list(self._emb_keys)
+                    return
+            except Exception:
+                pass
+        
+        vectors = self._unit_matrix[:len(self._emb_keys)]
+        index = faiss.IndexHNSWFlat(dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.add(vectors)
+        self._faiss_index = index
+        self._faiss_keys = list(self._emb_keys)
+
+    def _set_embedding_row(self, key: str, unit: np.ndarray, index: bool = True):
+        """将已归一化的向量写入（或覆盖）矩阵中的一行，容量不足时倍增；index为True时同步FAISS索引"""
+        if self._unit_matrix is not None and unit.shape[0] != self._unit_matrix.shape[1]:
+            # 维度不一致（如更换了嵌入模型），无法参与同一矩阵检索
+            return
+        row = self._emb_rows.get(key)
+        if row is None:
+            row = len(self._emb_keys)
+            if self._unit_matrix is None:
+                self._unit_matrix = np.empty((16, unit.shape[0]), dtype=np.float32)
+            elif row >= self._unit_matrix.shape[0]:
+                grown = np.empty((self._unit_matrix.shape[0] * 2, self._unit_matrix.shape[1]), dtype=np.float32)
+                grown[:row] = self._unit_matrix[:row]
+                self._unit_matrix = grown
+            self._emb_keys.append(key)
+            self._emb_rows[key] = row
+            if index and self.use_faiss and not self._faiss_dirty:
+                if self._faiss_index is None:
+                    self._faiss_index = faiss.IndexHNSWFlat(unit.shape[0], self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+                self._faiss_index.add(unit.reshape(1, -1))
+                self._faiss_keys.append(key)
+        elif index and self.use_faiss:
+            self._faiss_dirty = True
+        self._unit_matrix[row] = unit
 
     def _save_vector_data(self):
-        """保存向量数据"""
+        """保存向量数据：向量矩阵存为.npy，键顺序单独存为JSON"""
+        matrix_file = os.path.join(self.vector_dir, "vectors.npy")
+        keys_file = os.path.join(self.vector_dir, "keys.json")
+        index_file = os.path.join(self.vector_dir, "vectors.faiss")
         vector_file = os.path.join(self.vector_dir, "vectors.json")
         metadata_file = os.path.join(self.vector_dir, "metadata.json")
         
-        # 转换numpy数组为列表以便JSON序列化
-        vector_data = {
-            key: vector.tolist() 
-            for key, vector in self.vector_memory.items()
-        }
+        keys = list(self.vector_memory.keys())
+        vectors = [np.asarray(self.vector_memory[key]).ravel() for key in keys]
+        if len({vector.shape for vector in vectors}) <= 1:
+            matrix = np.stack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)
+            # 先写临时文件再原子替换，避免中断时留下半截文件。
+            # 加载时的向量是旧文件内存映射上的视图，Windows下文件被映射时无法替换，
+            # 因此先改为引用内存中的新矩阵，释放对映射的全部引用后再替换
+            tmp_file = matrix_file + ".tmp"
+            with open(tmp_file, 'wb') as f:
+                np.save(f, matrix)
+            for row, key in enumerate(keys):
+                self.vector_memory[key] = matrix[row]
+            os.replace(tmp_file, matrix_file)
+            self.save_json(keys_file, keys, indent=False)
+            if os.path.exists(vector_file):
+                os.remove(vector_file)
+            # 保存HNSW索引，下次加载时免去重建
+            if self.use_faiss and self._emb_keys:
+                if self._faiss_dirty or self._faiss_index is None:
+                    self._build_faiss_index()
+                faiss.write_index(self._faiss_index, index_file + ".tmp")
+                os.replace(index_file + ".tmp", index_file)
+            elif os.path.exists(index_file):
+                os.remove(index_file)
+        else:
+            # 维度不一致无法组成矩阵，退回JSON格式
+            self.save_json(vector_file, {key: vector.tolist() for key, vector in zip(keys, vectors)}, indent=False)
+            for stale in (matrix_file, keys_file, index_file):
+                if os.path.exists(stale):
+                    os.remove(stale)
         
-        self.save_json(vector_file, vector_data)
         self.save_json(metadata_file, self.vector_metadata)
+        self.save_json(os.path.join(self.vector_dir, "aliases.json"), self.vector_aliases, indent=False)
+
+    def create_child(self, name: str) -> "AgentMemory":
+        """
+        创建以本记忆为父记忆的子agent记忆
+        
+        子记忆与本记忆共用数据目录，读取未命中时回落到本记忆；
+        向量单独存放在vector_dir/name下，避免与父记忆及其他子记忆互相覆盖向量文件。
+        """
+        return AgentMemory(self.data_dir, self.info_dir, self.industry_dir,
+                           embedding_model=self.embedding_model,
+                           vector_dir=os.path.join(self.vector_dir, name), parent=self)
 
     # ======== 向量记忆接口 ========
     def create_embedding(self, text: str) -> Optional[np.ndarray]:
@@ -110,16 +312,119 @@ class AgentMemory:
             print(f"嵌入创建失败: {e}")
             return None
 
-    def save_embedding(self, key: str, text: str, metadata: Optional[Dict[str, Any]] = None):
-        """保存文本及其嵌入向量"""
+    def create_embeddings(self, texts: List[str], batch_size: int = 64) -> List[Optional[np.ndarray]]:
+        """批量创建文本嵌入向量，模型不支持批量时逐条创建"""
+        if self.embedding_model is None or not texts:
+            return [None] * len(texts)
+        
+        try:
+            if hasattr(self.embedding_model, 'encode'):
+                # sentence-transformers 等，一次编码整批文本
+                embeddings = self.embedding_model.encode(list(texts), batch_size=batch_size)
+            elif hasattr(self.embedding_model, 'embed_documents'):
+                # LangChain 兼容，或带批量接口的自定义函数
+                embeddings = self.embedding_model.embed_documents(list(texts))
+            else:
+                return [self.create_embedding(text) for text in texts]
+            return [np.array(embedding) if embedding is not None else None for embedding in embeddings]
+        except Exception as e:
+            print(f"批量嵌入创建失败，改为逐条创建: {e}")
+            return [self.create_embedding(text) for text in texts]
+
+    def _find_duplicate(self, unit: np.ndarray, exclude_key: Optional[str] = None) -> Optional[str]:
+        """查找与给定归一化向量几乎相同的已存键，不存在时返回None"""
+        count = len(self._emb_keys)
+        if count == 0 or unit.shape[0] != self._unit_matrix.shape[1]:
+            return None
+        # 与semantic_search共用float32单位向量矩阵，一次BLAS矩阵向量乘法找到最相似的行
+        sims = self._unit_matrix[:count] @ unit.astype(np.float32, copy=False)
+        if exclude_key in self._emb_rows:
+            sims[self._emb_rows[exclude_key]] = -np.inf
+        row = int(np.argmax(sims))
+        key = self._emb_keys[row]
+        if key == exclude_key:
+            return None
+        if float(sims[row]) > self.dedup_threshold:
+            return key
+        return None
+
+    def save_embedding(self, key: str, text: str, metadata: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """
+        保存文本及其嵌入向量
+        
+        Returns:
+            实际存储该文本的键：与已有向量重复时返回已有键，嵌入失败时返回None
+        """
         embedding = self.create_embedding(text)
         if embedding is not None:
-            self.vector_memory[key] = embedding
-            self.vector_metadata[key] = {
-                "text": text,
-                "created_at": datetime.now().isoformat(),
-                **(metadata or {})
-            }
+            return self._store_embedding(key, text, embedding, metadata)
+        return None
+
+    def save_embeddings(self, items: List[Tuple[str, str, Optional[Dict[str, Any]]]]) -> List[Optional[str]]:
+        """
+        批量保存文本及其嵌入向量，嵌入只请求一次
+        
+        Args:
+            items: (key, text, metadata) 列表
+        
+        Returns:
+            每条文本实际存储的键，含义同save_embedding
+        """
+        embeddings = self.create_embeddings([text for _, text, _ in items])
+        return [
+            self._store_embedding(key, text, embedding, metadata) if embedding is not None else None
+            for (key, text, metadata), embedding in zip(items, embeddings)
+        ]
+
+    def _store_embedding(self, key: str, text: str, embedding: np.ndarray,
+                         metadata: Optional[Dict[str, Any]] = None) -> str:
+        """去重后写入一条嵌入向量，返回实际存储的键"""
+        raw = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(raw)) or 1e-12
+        unit = raw / norm
+        duplicate = self._find_duplicate(unit, exclude_key=key)
+        if duplicate is not None:
+            # 不重复存储向量，但记录别名，之后仍可按新键读取
+            if self.vector_aliases.get(key) != duplicate:
+                self.vector_aliases[key] = duplicate
+                self.version += 1
+                self._vectors_dirty = True
+            return duplicate
+        self.vector_aliases.pop(key, None)
+        self.vector_memory[key] = embedding
+        self.vector_norms[key] = norm
+        self._set_embedding_row(key, unit)
+        self.vector_metadata[key] = {
+            "text": text,
+            "created_at": datetime.now().isoformat(),
+            **(metadata or {})
+        }
+        self.vector_version += 1
+        self.version += 1
+        self._vectors_dirty = True
+        return key
+
+    def resolve_key(self, key: str) -> str:
+        """返回键实际对应的向量键（因去重被记为别名时返回已有键）"""
+        return self.vector_aliases.get(key, key)
+
+    def get_embedding(self, key: str) -> Optional[Dict[str, Any]]:
+        """按键读取已存向量及其文本和元数据，支持别名，不存在时返回None"""
+        key = self.resolve_key(key)
+        if key not in self.vector_memory:
+            return None
+        metadata = self.vector_metadata.get(key, {})
+        return {
+            "key": key,
+            "vector": self.vector_memory[key],
+            "text": metadata.get("text", ""),
+            "metadata": metadata
+        }
+
+    def flush(self):
+        """将尚未落盘的向量数据写入磁盘"""
+        if self._vectors_dirty and self.persist_vectors:
+            self._vectors_dirty = False
             self._save_vector_data()
 
     def semantic_search(self, query: str, top_k: int = 5, threshold: float = 0.7) -> List[Dict[str, Any]]:
@@ -131,24 +436,45 @@ class AgentMemory:
         if query_embedding is None:
             return []
         
-        results = []
-        for key, stored_embedding in self.vector_memory.items():
-            # 计算余弦相似度
-            similarity = np.dot(query_embedding, stored_embedding) / (
-                np.linalg.norm(query_embedding) * np.linalg.norm(stored_embedding)
-            )
-            
-            if similarity >= threshold:
+        count = len(self._emb_keys)
+        query_unit = self._normalize(query_embedding)
+        if count == 0 or top_k <= 0 or query_unit.shape[0] != self._unit_matrix.shape[1]:
+            return []
+        
+        if self.use_faiss:
+            if self._faiss_dirty or self._faiss_index is None:
+                self._build_faiss_index()
+            scores, ids = self._faiss_index.search(query_unit.reshape(1, -1), min(top_k, count))
+            results = []
+            for score, idx in zip(scores[0], ids[0]):
+                if idx < 0 or score < threshold:
+                    continue
+                key = self._faiss_keys[idx]
                 results.append({
                     "key": key,
-                    "similarity": float(similarity),
+                    "similarity": float(score),
                     "text": self.vector_metadata[key]["text"],
                     "metadata": self.vector_metadata[key]
                 })
+            return results
+        
+        # 直接用float32单位向量矩阵打分（BLAS），避免每次查询把整个int8矩阵拓宽为int32副本
+        sims = self._unit_matrix[:count] @ query_unit.astype(np.float32, copy=False)
+        candidates = np.flatnonzero(sims >= threshold)
+        if candidates.size > top_k:
+            candidates = candidates[np.argpartition(-sims[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-sims[candidates], kind="stable")]
         
-        # 按相似度排序
-        results.sort(key=lambda x: x["similarity"], reverse=True)
-        return results[:top_k]
+        results = []
+        for row in candidates:
+            key = self._emb_keys[row]
+            results.append({
+                "key": key,
+                "similarity": float(sims[row]),
+                "text": self.vector_metadata[key]["text"],
+                "metadata": self.vector_metadata[key]
+            })
+        return results
 
     def get_embedding_stats(self) -> Dict[str, Any]:
         """获取向量记忆统计"""
@@ -163,15 +489,24 @@ class AgentMemory:
         """设置临时缓存"""
         expire_time = time.time() + (ttl or self.cache_ttl)
         self.temp_cache[key] = (value, expire_time)
+        self.version += 1
 
     def cache_get(self, key: str) -> Any:
         """获取临时缓存"""
+        value = self._local_cache_get(key)
+        if value is None and self.parent is not None:
+            return self.parent.cache_get(key)
+        return value
+
+    def _local_cache_get(self, key: str) -> Any:
+        """只读取本地临时缓存，不回落到父记忆"""
         if key in self.temp_cache:
             value, expire_time = self.temp_cache[key]
             if time.time() < expire_time:
                 return value
             else:
                 del self.temp_cache[key]
+                self.version += 1
         return None
 
     def cache_clear_expired(self):
@@ -183,71 +518,153 @@ class AgentMemory:
         ]
         for key in expired_keys:
             del self.temp_cache[key]
+        if expired_keys:
+            self.version += 1
 
     # ======== 上下文记忆接口 ========
     def context_set(self, key: str, value: Any):
         """设置上下文记忆"""
         self.context_memory[key] = value
+        self.version += 1
 
     def context_get(self, key: str) -> Any:
         """获取上下文记忆"""
-        return self.context_memory.get(key)
+        if key in self.context_memory or self.parent is None:
+            return self.context_memory.get(key)
+        return self.parent.context_get(key)
 
     def context_clear(self):
         """清空上下文记忆"""
         self.context_memory.clear()
+        self.version += 1
 
     def context_all(self) -> Dict[str, Any]:
         """获取所有上下文"""
         return self.context_memory.copy()
 
     # ======== 长期记忆接口 ========
-    def save_json(self, path: str, data: dict):
-        """保存JSON数据"""
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+    def save_json(self, path: str, data: dict, indent: bool = True):
+        """保存JSON数据（先写临时文件再替换，避免中断时留下被当作缓存的半截文件）
+
+        indent=False时紧凑输出，用于只由程序读取的缓存、向量等热路径文件
+        """
+        tmp_path = f"{path}.tmp"
+        payload = None
+        if ORJSON_AVAILABLE:
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            try:
+                payload = orjson.dumps(data, option=option)
+            except TypeError:
+                # orjson不支持的类型（如超出64位的整数）交给标准库处理
+                payload = None
+        try:
+            if payload is not None:
+                with open(tmp_path, 'wb', buffering=1 << 20) as f:
+                    f.write(payload)
+            else:
+                # 标准库直接流式写入文件句柄，不在内存中拼出完整字符串
+                with open(tmp_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2 if indent else None)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
 
     def load_json(self, path: str) -> dict:
         """加载JSON数据"""
         if not os.path.exists(path):
             return {}
-        with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        # 1MB缓冲区，大文件读取时减少系统调用次数
+        with open(path, 'rb', buffering=1 << 20) as f:
+            return loads(f.read())
 
     def save_persistent(self, key: str, data: dict):
         """保存到长期记忆"""
         path = os.path.join(self.info_dir, f"{key}.json")
         self.save_json(path, data)
-        self.persistent_data[key] = data
+        with self._persistent_lock:
+            self._persistent_index.add(key)
+            self._cache_persistent(key, data)
+        self.version += 1
 
     def load_persistent(self, key: str) -> dict:
-        """从长期记忆加载"""
-        return self.persistent_data.get(key, {})
+        """从长期记忆加载，首次读取某个键时才读盘"""
+        data = self._local_load_persistent(key)
+        if not data and self.parent is not None:
+            return self.parent.load_persistent(key)
+        return data
+
+    def _local_load_persistent(self, key: str) -> dict:
+        """只读取本地长期记忆，不回落到父记忆"""
+        with self._persistent_lock:
+            if key in self.persistent_data:
+                self.persistent_data.move_to_end(key)
+                return self.persistent_data[key]
+            indexed = key in self._persistent_index
+        
+        if indexed:
+            try:
+                data = self.load_json(os.path.join(self.info_dir, f"{key}.json"))
+            except Exception:
+                # 无法解析的文件视为不存在
+                with self._persistent_lock:
+                    self._persistent_index.discard(key)
+            else:
+                with self._persistent_lock:
+                    self._cache_persistent(key, data)
+                return data
+        return {}
 
     def list_persistent_keys(self) -> List[str]:
         """列出所有长期记忆键"""
-        return list(self.persistent_data.keys())
+        return list(self._persistent_index)
 
     # ======== 智能记忆接口 ========
+    @staticmethod
+    def _approx_size(value: Any) -> int:
+        """
+        估算值的大小，用于选择存储位置
+        
+        字符串取长度，容器只浅层累加元素大小，避免str(value)生成完整repr。
+        """
+        def shallow(item: Any) -> int:
+            return len(item) if isinstance(item, str) else sys.getsizeof(item)
+        
+        if isinstance(value, str):
+            return len(value)
+        if isinstance(value, dict):
+            return sum(shallow(k) + shallow(v) for k, v in value.items())
+        if isinstance(value, (list, tuple)):
+            return sum(shallow(item) for item in value)
+        return sys.getsizeof(value)
+
     def smart_get(self, key: str, default: Any = None) -> Any:
         """
         智能获取：优先从缓存获取，然后上下文，最后长期记忆
+        
+        本地三层均未命中时才查询父记忆，父记忆中的同名键不会遮盖本地的值。
         """
         # 1. 检查临时缓存
-        cached = self.cache_get(key)
+        cached = self._local_cache_get(key)
         if cached is not None:
             return cached
         
         # 2. 检查上下文记忆
-        context_value = self.context_get(key)
+        context_value = self.context_memory.get(key)
         if context_value is not None:
             return context_value
         
         # 3. 检查长期记忆
-        persistent_value = self.load_persistent(key)
+        persistent_value = self._local_load_persistent(key)
         if persistent_value:
             return persistent_value
         
+        # 4. 回落到父记忆
+        if self.parent is not None:
+            return self.parent.smart_get(key, default)
         return default
 
     def smart_set(self, key: str, value: Any, storage_type: str = "auto"):
@@ -257,9 +674,10 @@ class AgentMemory:
         """
         if storage_type == "auto":
             # 自动选择存储类型
-            if isinstance(value, dict) and len(str(value)) > 1000:
+            size = self._approx_size(value)
+            if isinstance(value, dict) and size > 1000:
                 storage_type = "persistent"
-            elif isinstance(value, (str, dict, list)) and len(str(value)) < 500:
+            elif isinstance(value, (str, dict, list)) and size < 500:
                 storage_type = "cache"
             else:
                 storage_type = "context"
@@ -281,7 +699,7 @@ class AgentMemory:
         - 结论/摘要/洞察（字符串且含关键词）→ 向量记忆
         - 其他 → 上下文记忆
         """
-        if isinstance(value, dict) and len(str(value)) > 1000:
+        if isinstance(value, dict) and self._approx_size(value) > 1000:
             self.save_persistent(key, value)
         elif isinstance(value, str) and any(word in value for word in ["结论", "摘要", "洞察", "insight", "summary"]):
             self.save_embedding(key, value, meta if meta is not None else {})
@@ -323,11 +741,11 @@ class AgentMemory:
         return {
             "cache_size": len(self.temp_cache),
             "context_size": len(self.context_memory),
-            "persistent_size": len(self.persistent_data),
+            "persistent_size": len(self._persistent_index),
             "vector_size": len(self.vector_memory),
             "cache_keys": list(self.temp_cache.keys()),
             "context_keys": list(self.context_memory.keys()),
-            "persistent_keys": list(self.persistent_data.keys()),
+            "persistent_keys": list(self._persistent_index),
             "vector_keys": list(self.vector_memory.keys()),
             "has_embedding_model": self.embedding_model is not None
         }
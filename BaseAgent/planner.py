@@ -1,34 +1,127 @@
 # planner.py
-from typing import Dict, Any, List
+import json
+import re
+from typing import Dict, Any, List, Collection
 from utils.prompt_manager import PromptManager
 
+# 规划器只返回一个函数名，回复长度可预知，统一限制输出token数
+_PLANNER_MAX_TOKENS = 64
+# 用户提示中最多展示的已完成/失败步骤数，避免提示长度随迭代次数增长
+_PROMPT_STEP_LIMIT = 16
+
+
+def _recent_steps(steps: List[str], limit: int = _PROMPT_STEP_LIMIT) -> List[str]:
+    """只保留最近limit个步骤，更早的步骤折叠为一项计数"""
+    if len(steps) <= limit:
+        return steps
+    return [f"...等{len(steps) - limit + 1}项"] + steps[-(limit - 1):]
+
+
 class AgentPlanner:
     def __init__(self, profile, llm, prompt_path="prompts/planner/toolset_illustration.yaml"):
         self.profile = profile
         self.llm = llm
         self.prompt_manager = PromptManager()
         self.prompt_path = prompt_path
+        # 用户提示模板只编译一次，规划循环中只做渲染
+        self._user_tmpl = self.prompt_manager.get_template("user_prompt.jinja")
+        # 系统提示在同一工具集下保持不变，缓存后逐字节一致，便于服务端前缀缓存命中
+        self._cached_system_prompt: Dict[Any, str] = {}
+        # 研报类型和agent身份在规划期间不变，任务描述的生成方式在初始化时确定一次
+        self._report_type = profile.get_config().get("report_type", "company")
+        self._make_task = self._bind_task_builder(profile, self._report_type)
 
-    def decide_next_step(self, context: Dict[str, Any], completed: List[str], failed: List[str], toolset: List[str]) -> str:
-        context_summary = ""
-        for k, v in context.items():
-            if isinstance(v, str):
-                context_summary += f"【{k}】{v[:1000]}\n"
-            else:
-                context_summary += f"【{k}】[结构化数据]\n"
-
-        # 生成任务描述
-        report_type = self.profile.get_config().get("report_type", "company")
+    @staticmethod
+    def _bind_task_builder(profile, report_type: str):
+        """按研报类型选择任务描述生成函数，与类型无关的固定描述直接预先生成"""
         if report_type == "industry":
-            task = f"请规划{self.profile.get_config().get('industry', '目标行业')}行业研报的数据收集和分析任务"
-        elif report_type == "macro":
-            task = f"请规划{self.profile.get_config().get('country', '中国')}宏观经济研报的数据收集和分析任务"
-        else:  # company
-            if self.profile.name == "AnalysisAgent":
-                task = "请规划分析阶段的图表生成、两两对比、估值建模等任务"
-            else:
-                task = f"请规划获取 {self.profile.get_identity()} 的基础信息、竞争者和财务信息。"
+            return lambda: f"请规划{profile.get_config().get('industry', '目标行业')}行业研报的数据收集和分析任务"
+        if report_type == "macro":
+            return lambda: f"请规划{profile.get_config().get('country', '中国')}宏观经济研报的数据收集和分析任务"
+        # company
+        if profile.name == "AnalysisAgent":
+            task = "请规划分析阶段的图表生成、两两对比、估值建模等任务"
+            return lambda: task
+        return lambda: f"请规划获取 {profile.get_identity()} 的基础信息、竞争者和财务信息。"
+
+    def decide_next_step(self, context: Dict[str, Any], completed: List[str], failed: List[str], toolset: Collection[str]) -> str:
+        """toolset建议传入frozenset，使结果校验为O(1)"""
+        if self._all_steps_done(completed, failed, toolset):
+            return "done"
+        user_prompt, system_prompt = self._build_prompts(context, completed, failed, toolset)
+        reply = self.llm.call(user_prompt, system_prompt=system_prompt + "你是一个规划器，只返回函数名",
+                              max_tokens=_PLANNER_MAX_TOKENS, cache_system=True)
+        choice = reply.strip()
+        return choice if choice in toolset else "done"
+
+    async def adecide_next_step(self, context: Dict[str, Any], completed: List[str], failed: List[str], toolset: Collection[str]) -> str:
+        """decide_next_step的异步版本"""
+        if self._all_steps_done(completed, failed, toolset):
+            return "done"
+        user_prompt, system_prompt = self._build_prompts(context, completed, failed, toolset)
+        reply = await self.llm.async_call(user_prompt, system_prompt=system_prompt + "你是一个规划器，只返回函数名",
+                                          max_tokens=_PLANNER_MAX_TOKENS, cache_system=True)
+        choice = reply.strip()
+        return choice if choice in toolset else "done"
+
+    def plan_all(self, context: Dict[str, Any], completed: List[str], failed: List[str], toolset: Collection[str]) -> List[str]:
+        """
+        一次LLM调用返回按执行顺序排列的完整步骤列表
+        
+        只保留toolset中的函数名并去重；解析失败时返回空列表，由调用方退回逐步规划。
+        """
+        user_prompt, system_prompt = self._build_prompts(context, completed, failed, toolset)
+        reply = self.llm.call(
+            user_prompt,
+            system_prompt=system_prompt + "你是一个规划器，请按执行顺序返回需要调用的全部函数名，"
+                                          "格式为JSON数组，例如[\"func_a\", \"func_b\"]，不要返回其他内容",
+            cache_system=True
+        )
+        return self._parse_plan(reply, toolset)
+
+    @staticmethod
+    def _all_steps_done(completed: List[str], failed: List[str], toolset: Collection[str]) -> bool:
+        """工具集中的每个步骤都已执行过（成功或失败）时无需再询问LLM"""
+        if not toolset:
+            return False
+        executed = set(completed)
+        executed.update(failed)
+        return executed.issuperset(toolset)
+
+    @staticmethod
+    def _parse_plan(reply: str, toolset: Collection[str]) -> List[str]:
+        """从LLM回复中解析函数名数组"""
+        if not reply:
+            return []
+        try:
+            steps = json.loads(reply.strip())
+        except ValueError:
+            match = re.search(r"\[.*?\]", reply, re.DOTALL)
+            if not match:
+                return []
+            try:
+                steps = json.loads(match.group(0))
+            except ValueError:
+                return []
+        if not isinstance(steps, list):
+            return []
+        
+        plan, seen = [], set()
+        for step in steps:
+            if isinstance(step, str):
+                step = step.strip()
+                if step in toolset and step not in seen:
+                    seen.add(step)
+                    plan.append(step)
+        return plan
 
+    def _system_prompt(self, toolset: Collection[str], report_type: str) -> str:
+        """按(工具集, 研报类型)缓存系统提示"""
+        key = (frozenset(toolset), report_type)
+        cached = self._cached_system_prompt.get(key)
+        if cached is not None:
+            return cached
+        
         # 使用新的prompt加载方法
         try:
             system_prompt = self.prompt_manager.load_system_prompt_from_profile(
@@ -37,17 +130,25 @@ class AgentPlanner:
         except:
             # 如果新方法失败，回退到旧方法
             system_prompt = self.prompt_manager.load_system_prompt(self.prompt_path, self.profile.name)
-            
+        self._cached_system_prompt[key] = system_prompt
+        return system_prompt
+
+    @staticmethod
+    def _truncate_context(context: Dict[str, Any], max_len: int = 300) -> Dict[str, str]:
+        """一次性截断上下文：字符串取前max_len个字符，其余以占位符代替"""
+        return {k: (v[:max_len] if isinstance(v, str) else "[结构化数据]") for k, v in context.items()}
+
+    def _build_prompts(self, context: Dict[str, Any], completed: List[str], failed: List[str], toolset: Collection[str]):
+        """构建规划所需的(user_prompt, system_prompt)，模板只接收截断后的上下文"""
+        task = self._make_task()
+        system_prompt = self._system_prompt(toolset, self._report_type)
+
         # Prepare the prompt for the LLM
-        user_prompt = self.prompt_manager.render_user_prompt(
-            "user_prompt.jinja", {
-                "profile": self.profile,
-                "task": task,
-                "context": context,
-                "completed": completed,
-                "failed": failed
-            }
+        user_prompt = self._user_tmpl.render(
+            profile=self.profile,
+            task=task,
+            truncated_context=self._truncate_context(context),
+            completed=_recent_steps(completed),
+            failed=_recent_steps(failed)
         )
-
-        reply = self.llm.call(user_prompt, system_prompt=system_prompt + "你是一个规划器，只返回函数名")
-        return reply.strip() if reply.strip() in toolset else "done"
+        return user_prompt, system_prompt
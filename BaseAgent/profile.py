@@ -1,7 +1,11 @@
 # profile.py
+import functools
 from typing import List, Dict, Optional
 
 class AgentProfile:
+    # describe()输出依赖的字段，重新赋值时清除缓存
+    _DESCRIBED_FIELDS = frozenset({"name", "role", "objectives", "tools", "knowledge", "memory_type", "_interaction"})
+
     def __init__(
         self,
         name: str,                      # Agent 名称，如 "DataAgent"
@@ -18,11 +22,30 @@ class AgentProfile:
         self.objectives = objectives
         self.tools = tools
         self.knowledge = knowledge
-        self.interaction = interaction or {}
+        self._interaction = interaction  # 未提供时延迟到首次访问再创建空dict
         self.memory_type = memory_type
         self.config = config or {}
 
+    def __setattr__(self, key, value):
+        super().__setattr__(key, value)
+        if key in AgentProfile._DESCRIBED_FIELDS:
+            self.__dict__.pop("_describe_cached", None)
+
+    @property
+    def interaction(self) -> Dict:
+        if self._interaction is None:
+            self._interaction = {}
+        return self._interaction
+
+    @interaction.setter
+    def interaction(self, value: Optional[Dict]):
+        self._interaction = value
+
     def describe(self) -> str:
+        return self._describe_cached
+
+    @functools.cached_property
+    def _describe_cached(self) -> str:
         return (
             f"Agent: {self.name}\n"
             f"Role: {self.role}\n"
@@ -30,7 +53,7 @@ class AgentProfile:
             f"Tools: {self.tools}\n"
             f"Knowledge: {self.knowledge}\n"
             f"Memory: {self.memory_type}\n"
-            f"Interaction: {self.interaction}\n"
+            f"Interaction: {self._interaction or {}}\n"
         )
 
     def get_tool_list(self) -> List[str]:
@@ -5,31 +5,177 @@
 """
 
 import os
-from typing import Optional, Any
+import atexit
+import hashlib
+import threading
+import functools
+from collections import OrderedDict
+from typing import Optional, Any, List
 from dotenv import load_dotenv
 
 load_dotenv()
 
+__all__ = ['EmbeddingCache', 'EmbeddingConfig', 'create_embedding_config']
+
+# 尝试导入diskcache，如果失败则只使用进程内缓存
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
+
+# 尝试导入httpx，如果失败则使用requests.Session
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+QWEN_EMBEDDING_MODEL = "text-embedding-v1"
+
+
+def _create_http_session(api_key: str):
+    """创建进程内复用的HTTP连接池：优先httpx（安装h2时启用HTTP/2多路复用），否则回退到requests.Session"""
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    if HTTPX_AVAILABLE:
+        limits = httpx.Limits(max_connections=16)
+        try:
+            session = httpx.Client(headers=headers, http2=True, timeout=30, limits=limits)
+        except ImportError:
+            session = httpx.Client(headers=headers, timeout=30, limits=limits)
+    else:
+        import requests
+        session = requests.Session()
+        session.headers.update(headers)
+    atexit.register(session.close)
+    return session
+
+
+@functools.lru_cache(maxsize=None)
+def _load_sentence_transformer(model_name: str):
+    """按模型名加载并复用SentenceTransformer，重复创建配置时不再重新导入torch和加载权重"""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+class EmbeddingCache:
+    """
+    远程嵌入接口的精确匹配缓存
+    
+    以sha256(模型名|文本)为键：进程内LRU为一级，安装diskcache时磁盘为二级，跨运行复用。
+    调用方式与被包装的嵌入函数一致（单条调用与embed_documents批量调用），只对未命中的文本发起请求。
+    """
+
+    def __init__(self, embed_fn, model_name: str, cache_dir: Optional[str] = None, maxsize: int = 4096):
+        self._fn = embed_fn
+        self._batch_fn = getattr(embed_fn, "embed_documents", None)
+        self.model_name = model_name
+        self.maxsize = maxsize
+        self._mem: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = diskcache.Cache(cache_dir) if cache_dir and DISKCACHE_AVAILABLE else None
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}|{text}".encode("utf-8")).hexdigest()
+
+    def _get(self, key: str):
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return self._mem[key]
+        if self._disk is not None:
+            value = self._disk.get(key)
+            if value is not None:
+                self._remember(key, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _remember(self, key: str, value):
+        with self._lock:
+            self._mem[key] = value
+            self._mem.move_to_end(key)
+            if len(self._mem) > self.maxsize:
+                self._mem.popitem(last=False)
+
+    def _put(self, key: str, value):
+        # 调用失败返回的None不缓存
+        if value is None:
+            return
+        self._remember(key, value)
+        if self._disk is not None:
+            self._disk.set(key, value)
+
+    def __call__(self, text):
+        if isinstance(text, (list, tuple)):
+            return self.embed_documents(text)
+        key = self._key(text)
+        value = self._get(key)
+        if value is None:
+            value = self._fn(text)
+            self._put(key, value)
+        return value
+
+    def embed_documents(self, texts) -> List:
+        texts = list(texts)
+        keys = [self._key(t) for t in texts]
+        results = [self._get(k) for k in keys]
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            pending = [texts[i] for i in missing]
+            if self._batch_fn is not None:
+                fresh = self._batch_fn(pending)
+            else:
+                fresh = [self._fn(t) for t in pending]
+            for i, value in zip(missing, fresh):
+                results[i] = value
+                self._put(keys[i], value)
+        return results
+
+
 class EmbeddingConfig:
-    """嵌入模型配置类"""
+    """
+    嵌入模型配置类
+
+    各提供方的第三方依赖只在对应的_setup_*方法内导入，选择qwen时不会导入openai或torch。
+    """
+
+    _SETUPS = {
+        "openai": "_setup_openai",
+        "sentence_transformers": "_setup_sentence_transformers",
+        "qwen": "_setup_qwen",
+        "custom": "_setup_custom",
+    }
     
     def __init__(self, model_type: str = "openai", **kwargs):
         self.model_type = model_type
         self.model = None
         self._setup_model(**kwargs)
+        # 远程接口按次计费且延迟高，相同文本只请求一次
+        if self.model is not None and model_type in ("openai", "qwen") and kwargs.get("cache", True):
+            self.model = EmbeddingCache(
+                self.model,
+                model_name=OPENAI_EMBEDDING_MODEL if model_type == "openai" else QWEN_EMBEDDING_MODEL,
+                cache_dir=kwargs.get("cache_dir") or os.getenv("EMBEDDING_CACHE_DIR", "./cache/embeddings")
+            )
     
     def _setup_model(self, **kwargs):
         """设置嵌入模型"""
-        if self.model_type == "openai":
-            self._setup_openai(**kwargs)
-        elif self.model_type == "sentence_transformers":
-            self._setup_sentence_transformers(**kwargs)
-        elif self.model_type == "qwen":
-            self._setup_qwen(**kwargs)
-        elif self.model_type == "custom":
-            self._setup_custom(**kwargs)
-        else:
+        setup = self._SETUPS.get(self.model_type)
+        if setup is None:
             print(f"不支持的嵌入模型类型: {self.model_type}")
+            return
+        getattr(self, setup)(**kwargs)
     
     def _setup_openai(self, **kwargs):
         """设置OpenAI嵌入模型"""
@@ -44,14 +190,25 @@ class EmbeddingConfig:
             
             client = OpenAI(api_key=api_key, base_url=base_url)
             
-            # 创建嵌入函数
-            def create_embedding(text: str):
+            # 创建嵌入函数，传入列表时走批量接口
+            def create_embedding(text):
+                if isinstance(text, (list, tuple)):
+                    return create_embeddings(text)
                 response = client.embeddings.create(
-                    model="text-embedding-ada-002",
+                    model=OPENAI_EMBEDDING_MODEL,
                     input=text
                 )
                 return response.data[0].embedding
             
+            # 批量嵌入：一次请求处理多条文本
+            def create_embeddings(texts):
+                response = client.embeddings.create(
+                    model=OPENAI_EMBEDDING_MODEL,
+                    input=list(texts)
+                )
+                return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+            
+            create_embedding.embed_documents = create_embeddings
             self.model = create_embedding
             print("✅ OpenAI嵌入模型已加载")
             
@@ -63,10 +220,8 @@ class EmbeddingConfig:
     def _setup_sentence_transformers(self, **kwargs):
         """设置sentence-transformers嵌入模型"""
         try:
-            from sentence_transformers import SentenceTransformer
-            
             model_name = kwargs.get("model_name", "all-MiniLM-L6-v2")
-            self.model = SentenceTransformer(model_name)
+            self.model = _load_sentence_transformer(model_name)
             print(f"✅ sentence-transformers模型已加载: {model_name}")
             
         except ImportError:
@@ -77,9 +232,6 @@ class EmbeddingConfig:
     def _setup_qwen(self, **kwargs):
         """设置Qwen API嵌入模型"""
         try:
-            import requests
-            import json
-            
             api_key = kwargs.get("api_key") or os.getenv("QWEN_API_KEY")
             base_url = kwargs.get("base_url") or "https://dashscope.aliyuncs.com/compatible-mode/v1"
             
@@ -87,20 +239,21 @@ class EmbeddingConfig:
                 print("❌ 请设置QWEN_API_KEY环境变量")
                 return
             
-            # 创建嵌入函数
-            def create_embedding(text: str):
-                url = f"{base_url}/embeddings"
-                headers = {
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                }
+            # 复用同一个连接池，保持长连接，避免每次请求重新握手
+            session = _create_http_session(api_key)
+            url = f"{base_url}/embeddings"
+            
+            # 创建嵌入函数，传入列表时走批量接口
+            def create_embedding(text):
+                if isinstance(text, (list, tuple)):
+                    return create_embeddings(text)
                 data = {
-                    "model": "text-embedding-v1",
+                    "model": QWEN_EMBEDDING_MODEL,
                     "input": text
                 }
                 
                 try:
-                    response = requests.post(url, headers=headers, json=data, timeout=30)
+                    response = session.post(url, json=data, timeout=30)
                     response.raise_for_status()
                     result = response.json()
                     if "data" in result and len(result["data"]) > 0:
@@ -112,11 +265,34 @@ class EmbeddingConfig:
                     print(f"❌ Qwen API调用失败: {e}")
                     return None
             
+            # 批量嵌入：接口单次最多接受batch_size条文本，按批请求
+            def create_embeddings(texts, batch_size: int = 10):
+                texts = list(texts)
+                embeddings = []
+                for start in range(0, len(texts), batch_size):
+                    batch = texts[start:start + batch_size]
+                    data = {
+                        "model": QWEN_EMBEDDING_MODEL,
+                        "input": batch
+                    }
+                    try:
+                        response = session.post(url, json=data, timeout=30)
+                        response.raise_for_status()
+                        items = sorted(response.json().get("data", []), key=lambda d: d.get("index", 0))
+                        if len(items) != len(batch):
+                            raise ValueError(f"返回数量{len(items)}与请求数量{len(batch)}不一致")
+                        embeddings.extend(item["embedding"] for item in items)
+                    except Exception as e:
+                        print(f"❌ Qwen API批量调用失败: {e}")
+                        embeddings.extend([None] * len(batch))
+                return embeddings
+            
+            create_embedding.embed_documents = create_embeddings
             self.model = create_embedding
             print("✅ Qwen API嵌入模型已配置")
             
         except ImportError:
-            print("❌ 请安装requests: pip install requests")
+            print("❌ 请安装httpx或requests: pip install httpx")
         except Exception as e:
             print(f"❌ Qwen API配置失败: {e}")
     
@@ -4,23 +4,38 @@
 """
 
 import os
+import sys
 from typing import Dict, Any, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, replace
 
 
 from dotenv import load_dotenv
 load_dotenv()
 
 
+_DEFAULT_API_KEY = os.environ.get("OPENAI_API_KEY", "")
+_DEFAULT_BASE_URL = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")
+_DEFAULT_MODEL = os.environ.get("OPENAI_MODEL", "gpt-4-turbo-preview")
 
-@dataclass
+# slots需要Python 3.10+，低版本仅保持frozen
+_DATACLASS_OPTIONS = {"frozen": True, "slots": True} if sys.version_info >= (3, 10) else {"frozen": True}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class LLMConfig:
-    """LLM配置"""
+    """
+    LLM配置
+
+    不可变且可哈希，可直接作为缓存键或在线程间共享；需要修改时使用 with_updates 生成新实例。
+
+    服务端提示前缀缓存要求system提示逐字节一致：不要在system提示中插入公司名、日期等变量，
+    动态内容一律放在用户消息里。provider为anthropic时，cache_system=True会显式标记system消息可缓存。
+    """
 
     provider: str = "openai"  # openai, anthropic, etc.
-    api_key: str = os.environ.get("OPENAI_API_KEY", "")
-    base_url: str = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")
-    model: str = os.environ.get("OPENAI_MODEL", "gpt-4-turbo-preview")
+    api_key: str = _DEFAULT_API_KEY
+    base_url: str = _DEFAULT_BASE_URL
+    model: str = _DEFAULT_MODEL
     temperature: float = 0.1
     max_tokens: int = 8192
 
@@ -33,6 +48,10 @@ class LLMConfig:
         """从字典创建配置"""
         return cls(**data)
 
+    def with_updates(self, **changes) -> 'LLMConfig':
+        """返回修改了指定字段的新配置"""
+        return replace(self, **changes)
+
     def validate(self) -> bool:
         """验证配置有效性"""
         if not self.api_key:
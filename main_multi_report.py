@@ -1,5 +1,5 @@
 # main_multi_report.py - 支持多种研报类型的主程序（包含评价功能）
-from BaseAgent.base_agent import BaseAgent
+from BaseAgent.base_agent import BaseAgent, setup_agent_logging
 from BaseAgent.profile import AgentProfile
 from BaseAgent.memory import AgentMemory
 from BaseAgent.planner import AgentPlanner
@@ -76,12 +76,14 @@ def create_multi_report_system(instruction: str):
     )
     
     memory = AgentMemory("./data/financials", "./data/info", "./data/industry", embedding_model)
+    # 各子agent使用以基础记忆为父记忆的独立记忆，只保存自身的增量数据
+    data_memory = memory.create_child("DataAgent")
     llm = LLMHelper(llm_config)
     planner = AgentPlanner(data_agent_profile, llm)
-    action = FinancialActionToolset(data_agent_profile, memory, llm, llm_config)
+    action = FinancialActionToolset(data_agent_profile, data_memory, llm, llm_config)
     
     # 创建数据提取agent
-    agent_d = BaseAgent(data_agent_profile, memory, planner, action, 
+    agent_d = BaseAgent(data_agent_profile, data_memory, planner, action, 
                        report_config.get_data_tools(report_type))
     
     ##### 分析Agent #####
@@ -97,12 +99,13 @@ def create_multi_report_system(instruction: str):
     )
     
     # 创建分析agent
+    analysis_memory = memory.create_child("AnalysisAgent")
     agent_a = BaseAgent(
         profile=analysis_agent_profile,
-        memory=memory,
+        memory=analysis_memory,
         planner=AgentPlanner(analysis_agent_profile, llm, 
                            prompt_path="prompts/planner/toolset_illustration.yaml"),
-        action=FinancialActionToolset(analysis_agent_profile, memory, llm, llm_config),
+        action=FinancialActionToolset(analysis_agent_profile, analysis_memory, llm, llm_config),
         toolset=report_config.get_analysis_tools(report_type)
     )
     
@@ -125,7 +128,7 @@ def create_multi_report_system(instruction: str):
     # 创建评价agent
     agent_e = EvaluationAgent(
         profile=evaluation_agent_profile,
-        memory=memory,
+        memory=memory.create_child("EvaluationAgent"),
         planner=AgentPlanner(evaluation_agent_profile, llm,
                            prompt_path="prompts/planner/toolset_illustration.yaml"),
         llm=llm,
@@ -177,7 +180,9 @@ def main():
     if not instruction:
         print("❌ 未提供有效指令")
         return
-        
+    
+    log_listener = setup_agent_logging()
+    coordinator = None
     try:
         # 创建多研报类型系统
         coordinator, agent_d, agent_a, agent_e, report_type = create_multi_report_system(instruction)
@@ -223,6 +228,11 @@ def main():
         print(f"❌ 系统执行出错: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        # 出错时也要写出尚未落盘的向量记忆
+        if coordinator is not None:
+            coordinator.close()
+        log_listener.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -38,7 +38,8 @@ data_analysis_system_prompt = """你是一个专业的数据分析助手，运
 📊 数据分析工作流程（必须严格按顺序执行）：
 
 **阶段1：数据探索（使用 generate_code 动作）**
-- 首次数据加载时尝试多种编码：['utf-8', 'gbk', 'gb18030', 'gb2312']
+- 按文件后缀选择读取函数：.feather用pd.read_feather，.parquet用pd.read_parquet，.csv用pd.read_csv
+- 读取CSV时尝试多种编码：['utf-8', 'gbk', 'gb18030', 'gb2312']
 - 使用df.head()查看前几行数据
 - 使用df.info()了解数据类型和缺失值
 - 使用df.describe()查看数值列的统计信息
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试BaseAgent同步与异步执行流程的一致性
+"""
+
+import sys
+import os
+import asyncio
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from BaseAgent.base_agent import BaseAgent
+from BaseAgent.profile import AgentProfile
+
+
+class FakePlanner:
+    """先返回完整计划，之后按固定顺序逐步决策"""
+
+    def __init__(self, plan, steps):
+        self.plan = list(plan)
+        self.steps = list(steps)
+        self.calls = []
+
+    def plan_all(self, context, completed, failed, toolset):
+        self.calls.append("plan_all")
+        return list(self.plan)
+
+    def decide_next_step(self, context, completed, failed, toolset):
+        self.calls.append("decide")
+        return self.steps.pop(0) if self.steps else "done"
+
+
+class AsyncFakePlanner(FakePlanner):
+    async def adecide_next_step(self, context, completed, failed, toolset):
+        self.calls.append("adecide")
+        return self.steps.pop(0) if self.steps else "done"
+
+
+class FakeAction:
+    """记录工具调用和tick次数，broken步骤抛出异常"""
+
+    def __init__(self):
+        self.log = []
+        self.ticks = 0
+        self.ended = 0
+
+    def _new_tick(self):
+        self.ticks += 1
+
+    def _end_tick(self):
+        self.ended += 1
+
+    def fetch(self, context):
+        self.log.append("fetch")
+        return "数据"
+
+    def broken(self, context):
+        self.log.append("broken")
+        raise RuntimeError("执行失败")
+
+    def report(self, context):
+        self.log.append("report")
+        return "报告"
+
+
+def make_agent(planner):
+    profile = AgentProfile(name="TestAgent", role="测试", objectives=[], tools=[])
+    return BaseAgent(profile, None, planner, FakeAction(), ["fetch", "broken", "report"])
+
+
+def run_both(make_planner):
+    """分别用run和arun执行，返回(上下文, 工具调用顺序, tick次数, end_tick次数)"""
+    outcomes = []
+    for use_async in (False, True):
+        agent = make_agent(make_planner())
+        context = asyncio.run(agent.arun()) if use_async else agent.run()
+        outcomes.append((context, agent.action.log, agent.action.ticks, agent.action.ended))
+    return outcomes
+
+
+@pytest.mark.parametrize("planner_cls", [FakePlanner, AsyncFakePlanner])
+def test_plan_executed_without_replanning(planner_cls):
+    """计划全部成功时不再逐步决策，同步与异步结果一致"""
+    planners = []
+
+    def make_planner():
+        planners.append(planner_cls(["fetch", "report"], ["broken"]))
+        return planners[-1]
+
+    sync, async_ = run_both(make_planner)
+    assert sync == async_
+    assert sync[0] == {"fetch": "数据", "report": "报告"}
+    assert sync[1] == ["fetch", "report"]
+    assert sync[2] == 2 and sync[3] == 1
+    assert [p.calls for p in planners] == [["plan_all"], ["plan_all"]]
+
+
+@pytest.mark.parametrize("planner_cls", [FakePlanner, AsyncFakePlanner])
+def test_failed_step_triggers_replanning(planner_cls):
+    """计划中的步骤失败后改为逐步规划，重复和无效步骤的处理同步与异步一致"""
+    def make_planner():
+        return planner_cls(["fetch", "broken", "report"], ["fetch", "missing", "report"])
+
+    sync, async_ = run_both(make_planner)
+    assert sync == async_
+    assert sync[1] == ["fetch", "broken", "report"]
+    assert sync[0] == {"fetch": "数据", "report": "报告"}
+
+
+def test_empty_plan_falls_back_to_step_planning():
+    """计划为空时直接逐步规划"""
+    sync, async_ = run_both(lambda: AsyncFakePlanner([], ["report", "fetch"]))
+    assert sync == async_
+    assert sync[1] == ["report", "fetch"]
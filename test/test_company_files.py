@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试公司数据文件的扫描
+"""
+
+import sys
+import os
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+pytest.importorskip("pandas")
+action_financial = pytest.importorskip("toolset.action_financial")
+
+
+@pytest.fixture
+def action():
+    """get_company_files不依赖实例状态，跳过需要LLM和记忆的完整初始化"""
+    return object.__new__(action_financial.FinancialActionToolset)
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("a,b\n1,2\n")
+
+
+def test_group_by_company_prefer_best_format(action, tmp_path):
+    """按文件名前缀分组，同一报表存在多种格式时只取优先级最高的一份"""
+    touch(tmp_path / "腾讯_资产负债表.csv")
+    touch(tmp_path / "腾讯_资产负债表.feather")
+    touch(tmp_path / "腾讯_利润表.parquet")
+    touch(tmp_path / "阿里_利润表.csv")
+    touch(tmp_path / "说明.txt")
+    touch(tmp_path / ".隐藏_利润表.csv")
+
+    companies = {name: sorted(os.path.basename(p) for p in paths)
+                 for name, paths in action.get_company_files(str(tmp_path)).items()}
+    assert companies == {
+        "腾讯": ["腾讯_利润表.parquet", "腾讯_资产负债表.feather"],
+        "阿里": ["阿里_利润表.csv"],
+    }
+
+
+def test_subdirectories_ignored(action, tmp_path):
+    """Analyzer的session_*输出和reports目录下的表格不会被当作公司数据"""
+    touch(tmp_path / "腾讯_利润表.csv")
+    touch(tmp_path / "session_x" / "分析结果_汇总.csv")
+    touch(tmp_path / "reports" / "报告_附表.parquet")
+    os.makedirs(tmp_path / "目录_伪装.csv")
+
+    assert list(action.get_company_files(str(tmp_path))) == ["腾讯"]
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试评价agent的批量评价模式及评价结果缓存
+"""
+
+import sys
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+pytest.importorskip("pandas")
+evaluation_agent = pytest.importorskip("BaseAgent.evaluation_agent")
+from BaseAgent.memory import AgentMemory
+
+
+@pytest.fixture
+def agent(tmp_path):
+    """只需要记忆的评价agent，跳过需要LLM的完整初始化"""
+    agent = object.__new__(evaluation_agent.EvaluationAgent)
+    agent.memory = AgentMemory(str(tmp_path / "data"), str(tmp_path / "info"), str(tmp_path / "industry"),
+                               persist_vectors=False)
+    return agent
+
+
+def test_batch_is_sequential_by_default(agent, monkeypatch):
+    """未指定n_jobs时逐个评价，且不创建独立记忆"""
+    calls = []
+
+    def evaluate_one(report_path, isolated=False):
+        calls.append((report_path, isolated, threading.current_thread() is threading.main_thread()))
+        return {"report_path": report_path}
+
+    monkeypatch.setattr(agent, "_evaluate_one", evaluate_one)
+    results = agent.batch_evaluate_reports(["a.md", "b.md", "c.md"])
+    assert [r["report_path"] for r in results] == ["a.md", "b.md", "c.md"]
+    assert calls == [("a.md", False, True), ("b.md", False, True), ("c.md", False, True)]
+
+
+def test_thread_mode_is_opt_in(agent, monkeypatch):
+    """n_jobs大于1时才并发，且每个报告使用独立记忆"""
+    calls = []
+    monkeypatch.setattr(agent, "_evaluate_one",
+                        lambda path, isolated=False: calls.append(isolated) or {"report_path": path})
+    results = agent.batch_evaluate_reports(["a.md", "b.md"], n_jobs=2)
+    assert [r["report_path"] for r in results] == ["a.md", "b.md"]
+    assert calls == [True, True]
+
+
+def test_cached_evaluation_round_trip(agent):
+    """成功结果写入缓存，错误结果不缓存"""
+    evaluation = {"overall_score": 88, "grade": "良好"}
+    agent._save_cached_evaluation("k1", evaluation)
+    assert agent._load_cached_evaluation("k1") == evaluation
+
+    agent._save_cached_evaluation("k2", {"error": "评价未完成"})
+    assert agent._load_cached_evaluation("k2") is None
+    assert agent._load_cached_evaluation(None) is None
+
+
+def test_concurrent_cache_writes(agent):
+    """并发写同一缓存键时结果完整，不残留临时文件"""
+    evaluations = [{"overall_score": i, "feedback": "评" * 2000} for i in range(32)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda e: agent._save_cached_evaluation("same", e), evaluations))
+
+    assert agent._load_cached_evaluation("same") in evaluations
+    cache_dir = os.path.dirname(agent._cache_path("same"))
+    assert os.listdir(cache_dir) == ["same.json"]
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试disk_memoize磁盘缓存装饰器
+"""
+
+import sys
+import os
+import time
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from toolset.utils import fetch_cache
+from toolset.utils.fetch_cache import disk_memoize, TEXT_CODEC
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """缓存写入临时目录"""
+    monkeypatch.setattr(fetch_cache, "FETCH_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def counting(result_of):
+    """返回被装饰函数及其调用参数记录"""
+    calls = []
+
+    def fetch(*args, **kwargs):
+        calls.append((args, kwargs))
+        return result_of(*args, **kwargs)
+    return fetch, calls
+
+
+def test_hit_skips_call(cache_dir):
+    """相同参数第二次调用直接读缓存，不同参数各自缓存"""
+    fetch, calls = counting(lambda code, market="A": {"code": code, "market": market})
+    cached = disk_memoize("test", ttl=60)(fetch)
+
+    assert cached("000001", market="A") == {"code": "000001", "market": "A"}
+    assert cached("000001", market="A") == {"code": "000001", "market": "A"}
+    assert len(calls) == 1
+
+    cached("000001", market="HK")
+    assert len(calls) == 2
+    assert len(os.listdir(cache_dir / "test")) == 2
+
+
+def test_expired_entry_refetched(cache_dir):
+    """超过ttl的条目视为过期，重新请求"""
+    fetch, calls = counting(lambda code: {"code": code})
+    cached = disk_memoize("test", ttl=60)(fetch)
+    cached("000001")
+
+    (entry,) = (cache_dir / "test").iterdir()
+    stale = time.time() - 120
+    os.utime(entry, (stale, stale))
+    cached("000001")
+    assert len(calls) == 2
+
+
+def test_ok_filter(cache_dir):
+    """ok(result)为假的结果不写缓存"""
+    fetch, calls = counting(lambda code: None if code == "bad" else "简介")
+    cached = disk_memoize("test", ttl=60, codec=TEXT_CODEC, ok=lambda text: text is not None)(fetch)
+
+    assert cached("bad") is None
+    assert cached("bad") is None
+    assert len(calls) == 2
+    assert cached("good") == "简介"
+    assert cached("good") == "简介"
+    assert len(calls) == 3
+
+
+def test_peek_and_force_refresh(cache_dir):
+    """peek只读缓存不触发请求；force_refresh跳过读取并覆盖旧条目"""
+    values = iter([["v1"], ["v2"]])
+    fetch, calls = counting(lambda query: next(values))
+    cached = disk_memoize("test", ttl=60)(fetch)
+
+    assert cached.peek("q") is None
+    assert calls == []
+    assert cached("q") == ["v1"]
+    assert cached.peek("q") == ["v1"]
+
+    assert cached("q", force_refresh=True) == ["v2"]
+    assert cached("q") == ["v2"]
+    assert len(calls) == 2
+
+
+def test_custom_key(cache_dir):
+    """key只取部分参数参与计算键，对象参数不影响命中"""
+    fetch, calls = counting(lambda engine, query: [query])
+    cached = disk_memoize("test", ttl=60, key=lambda engine, query: (query,))(fetch)
+
+    assert cached(object(), "q") == ["q"]
+    assert cached(object(), "q") == ["q"]
+    assert len(calls) == 1
+    assert cached.peek(object(), "q") == ["q"]
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试CachedLLM的SQLite持久化缓存
+"""
+
+import sys
+import os
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from utils.llm_cache import CachedLLM
+
+
+class FakeHelper:
+    """记录调用次数的LLMHelper替身，响应中带有调用序号"""
+
+    def __init__(self, model="qwen-test", response=None):
+        self.config = SimpleNamespace(model=model, max_tokens=1024, temperature=0.7)
+        self.response = response
+        self.calls = 0
+        self.extra = "透传属性"
+
+    def call(self, prompt, system_prompt=None, max_tokens=None, temperature=None, cache_system=False, prefix=None):
+        self.calls += 1
+        return self.response if self.response is not None else f"{prompt}#{self.calls}"
+
+    async def async_call(self, prompt, system_prompt=None, max_tokens=None, temperature=None,
+                         cache_system=False, prefix=None):
+        return self.call(prompt, system_prompt, max_tokens, temperature, cache_system, prefix)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "llm_cache.sqlite")
+
+
+def test_repeated_prompt_hits_cache(db_path):
+    """相同提示只调用一次LLM，属性透传给被包装的helper"""
+    helper = FakeHelper()
+    llm = CachedLLM(helper, db_path=db_path)
+    assert llm.call("分析", system_prompt="系统") == "分析#1"
+    assert llm.call("分析", system_prompt="系统") == "分析#1"
+    assert helper.calls == 1
+    assert llm.extra == "透传属性"
+    llm.close()
+
+
+def test_key_covers_call_parameters(db_path):
+    """系统提示、温度、最大token数、前缀或模型不同时不共用缓存"""
+    helper = FakeHelper()
+    llm = CachedLLM(helper, db_path=db_path)
+    llm.call("分析")
+    llm.call("分析", system_prompt="系统")
+    llm.call("分析", temperature=0.1)
+    llm.call("分析", max_tokens=16)
+    llm.call("分析", prefix="前缀")
+    assert helper.calls == 5
+
+    # 显式传入默认值与省略参数命中同一条目
+    llm.call("分析", temperature=0.7, max_tokens=1024)
+    assert helper.calls == 5
+    llm.close()
+
+    other_model = FakeHelper(model="qwen-other")
+    llm = CachedLLM(other_model, db_path=db_path)
+    llm.call("分析")
+    assert other_model.calls == 1
+    llm.close()
+
+
+def test_cache_persists_across_instances(db_path):
+    """缓存写入SQLite，新实例直接命中"""
+    llm = CachedLLM(FakeHelper(), db_path=db_path)
+    llm.call("分析")
+    llm.close()
+
+    helper = FakeHelper()
+    llm = CachedLLM(helper, db_path=db_path)
+    assert llm.call("分析") == "分析#1"
+    assert helper.calls == 0
+    llm.close()
+
+
+def test_empty_response_not_cached(db_path):
+    """调用失败返回的空字符串不写入缓存"""
+    helper = FakeHelper(response="")
+    llm = CachedLLM(helper, db_path=db_path)
+    assert llm.call("分析") == ""
+    assert llm.call("分析") == ""
+    assert helper.calls == 2
+    llm.close()
+
+
+def test_expired_entries(db_path):
+    """过期条目视为未命中，clear_expired将其删除"""
+    helper = FakeHelper()
+    llm = CachedLLM(helper, db_path=db_path, ttl_days=1)
+    llm.call("分析")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE llm_cache SET created_at = created_at - 2 * 86400")
+
+    assert llm.call("分析") == "分析#2"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE llm_cache SET created_at = created_at - 2 * 86400")
+    assert llm.clear_expired() == 1
+    llm.close()
+
+
+def test_async_call_shares_cache(db_path):
+    """异步调用与同步调用共用缓存"""
+    helper = FakeHelper()
+    llm = CachedLLM(helper, db_path=db_path)
+    llm.call("分析")
+    assert asyncio.run(llm.async_call("分析")) == "分析#1"
+    assert asyncio.run(llm.async_call("新提示")) == "新提示#2"
+    assert llm.call("新提示") == "新提示#2"
+    assert helper.calls == 2
+    llm.close()
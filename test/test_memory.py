@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试AgentMemory的分层读取及父记忆回落
+"""
+
+import sys
+import os
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from BaseAgent.memory import AgentMemory
+
+
+def make_memory(root, name, parent=None, **kwargs):
+    """在临时目录下创建一个记忆实例"""
+    base = os.path.join(str(root), name)
+    return AgentMemory(os.path.join(base, "data"), os.path.join(base, "info"), os.path.join(base, "industry"),
+                       parent=parent, **kwargs)
+
+
+def test_smart_get_tier_precedence(tmp_path):
+    """缓存优先于上下文，上下文优先于长期记忆"""
+    memory = make_memory(tmp_path, "m")
+    memory.save_persistent("k", {"tier": "persistent"})
+    assert memory.smart_get("k") == {"tier": "persistent"}
+
+    memory.context_set("k", "context")
+    assert memory.smart_get("k") == "context"
+
+    memory.cache_set("k", "cache")
+    assert memory.smart_get("k") == "cache"
+
+
+def test_smart_get_expired_cache_falls_back(tmp_path):
+    """缓存过期后回落到上下文记忆"""
+    memory = make_memory(tmp_path, "m")
+    memory.context_set("k", "context")
+    memory.cache_set("k", "cache", ttl=-1)
+    assert memory.smart_get("k") == "context"
+    assert "k" not in memory.temp_cache
+
+
+def test_local_tiers_shadow_parent(tmp_path):
+    """本地任一层命中时不读取父记忆，父记忆的缓存不会遮盖本地上下文"""
+    parent = make_memory(tmp_path, "parent")
+    child = make_memory(tmp_path, "child", parent=parent)
+
+    parent.cache_set("k", "parent-cache")
+    child.context_set("k", "child-context")
+    assert child.smart_get("k") == "child-context"
+
+    parent.context_set("p", "parent-context")
+    child.save_persistent("p", {"from": "child"})
+    assert child.smart_get("p") == {"from": "child"}
+
+
+def test_parent_fallthrough(tmp_path):
+    """本地全部未命中时依次回落到父记忆，父记忆也未命中时返回默认值"""
+    parent = make_memory(tmp_path, "parent")
+    child = make_memory(tmp_path, "child", parent=parent)
+
+    assert child.smart_get("missing", "default") == "default"
+
+    parent.save_persistent("k", {"from": "parent"})
+    assert child.smart_get("k") == {"from": "parent"}
+    assert child.load_persistent("k") == {"from": "parent"}
+
+    parent.cache_set("c", "parent-cache")
+    parent.context_set("x", "parent-context")
+    assert child.cache_get("c") == "parent-cache"
+    assert child.context_get("x") == "parent-context"
+
+
+def test_writes_stay_local(tmp_path):
+    """写入只发生在子记忆，父记忆不受影响"""
+    parent = make_memory(tmp_path, "parent")
+    child = make_memory(tmp_path, "child", parent=parent)
+
+    child.context_set("k", "child")
+    child.save_persistent("p", {"from": "child"})
+    assert parent.context_get("k") is None
+    assert parent.load_persistent("p") == {}
+    assert "p" not in parent.list_persistent_keys()
+
+
+class FakeEmbedding:
+    """按文本返回固定向量的嵌入模型，相同文本得到相同向量"""
+    VECTORS = {
+        "结论一": [1.0, 0.0, 0.0, 0.0],
+        "结论二": [0.0, 1.0, 0.0, 0.0],
+        "结论三": [0.0, 0.0, 1.0, 0.0],
+    }
+
+    def encode(self, text, batch_size=None):
+        if isinstance(text, list):
+            return [self.encode(item) for item in text]
+        return self.VECTORS[text]
+
+
+def test_duplicate_embedding_recorded_as_alias(tmp_path):
+    """重复文本不再存储向量，新键记为已有键的别名"""
+    memory = make_memory(tmp_path, "m", embedding_model=FakeEmbedding())
+    assert memory.save_embedding("a", "结论一") == "a"
+    assert memory.save_embedding("b", "结论二") == "b"
+    assert memory.save_embedding("c", "结论一") == "a"
+
+    assert sorted(memory.vector_memory) == ["a", "b"]
+    assert memory.resolve_key("c") == "a"
+    assert memory.get_embedding("c")["key"] == "a"
+    assert memory.get_embedding("c")["text"] == "结论一"
+    assert memory.get_embedding("missing") is None
+
+
+def test_alias_dropped_when_key_stored(tmp_path):
+    """别名键之后存入不同文本时改为真实存储"""
+    memory = make_memory(tmp_path, "m", embedding_model=FakeEmbedding())
+    memory.save_embedding("a", "结论一")
+    memory.save_embedding("c", "结论一")
+    assert memory.save_embedding("c", "结论三") == "c"
+    assert memory.resolve_key("c") == "c"
+    assert memory.get_embedding("c")["text"] == "结论三"
+
+
+def test_vector_persistence_round_trip(tmp_path):
+    """flush后重新加载，向量、元数据和别名保持一致"""
+    memory = make_memory(tmp_path, "m", embedding_model=FakeEmbedding())
+    memory.save_embeddings([("a", "结论一", {"source": "test"}), ("b", "结论二", None), ("c", "结论一", None)])
+    memory.flush()
+
+    reloaded = make_memory(tmp_path, "m", embedding_model=FakeEmbedding())
+    assert sorted(reloaded.vector_memory) == ["a", "b"]
+    assert reloaded.resolve_key("c") == "a"
+    assert reloaded.get_embedding("a")["metadata"]["source"] == "test"
+    assert list(reloaded.get_embedding("b")["vector"]) == FakeEmbedding.VECTORS["结论二"]
+    assert reloaded.semantic_search("结论二", top_k=1)[0]["key"] == "b"
+
+    # 再次保存时替换内存映射加载的旧矩阵
+    reloaded.save_embedding("d", "结论三")
+    reloaded.flush()
+    assert sorted(make_memory(tmp_path, "m").vector_memory) == ["a", "b", "d"]
+
+
+def test_non_persistent_memory_does_not_write(tmp_path):
+    """persist_vectors为False时flush不写盘"""
+    memory = make_memory(tmp_path, "m", embedding_model=FakeEmbedding(), persist_vectors=False)
+    memory.save_embedding("a", "结论一")
+    memory.flush()
+    assert make_memory(tmp_path, "m").vector_memory == {}
+
+
+def test_create_child(tmp_path):
+    """子记忆共用数据目录、读取回落到父记忆，向量存放在独立子目录"""
+    parent = make_memory(tmp_path, "m", embedding_model=FakeEmbedding())
+    child = parent.create_child("DataAgent")
+
+    assert child.parent is parent
+    assert child.data_dir == parent.data_dir and child.info_dir == parent.info_dir
+    assert child.vector_dir == os.path.join(parent.vector_dir, "DataAgent")
+
+    parent.context_set("report_type", "company")
+    assert child.smart_get("report_type") == "company"
+
+    child.save_embedding("a", "结论一")
+    child.flush()
+    assert parent.vector_memory == {}
+    assert sorted(parent.create_child("DataAgent").vector_memory) == ["a"]
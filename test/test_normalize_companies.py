@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试公司列表的规范化
+"""
+
+import sys
+import os
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+pytest.importorskip("pandas")
+action_financial = pytest.importorskip("toolset.action_financial")
+
+
+@pytest.fixture
+def action():
+    """_normalize_companies只依赖规范化结果缓存，跳过需要LLM和记忆的完整初始化"""
+    toolset = object.__new__(action_financial.FinancialActionToolset)
+    toolset._normalized_companies = None
+    return toolset
+
+
+def test_market_and_code_normalized_in_place(action):
+    """A股代码补交易所前缀，港股保持原代码，字典原地更新"""
+    companies = [
+        {"company": "平安银行", "market": "A股", "code": "000001"},
+        {"company": "贵州茅台", "market": "A股", "code": "600519"},
+        {"company": "腾讯控股", "market": "港股", "code": "00700"},
+        {"company": "招商银行", "market": "A股", "code": "SH600036"},
+    ]
+    context = {"all_companies": companies}
+    refs = action._normalize_companies(context)
+
+    assert [(r.name, r.code, r.market) for r in refs] == [
+        ("平安银行", "SZ000001", "A"),
+        ("贵州茅台", "SH600519", "A"),
+        ("腾讯控股", "00700", "HK"),
+        ("招商银行", "SH600036", "A"),
+    ]
+    assert companies[0] == {"company": "平安银行", "market": "A", "code": "SZ000001"}
+    assert context["all_companies"] is companies
+
+
+def test_incomplete_companies_skipped(action):
+    """缺少市场或代码的公司直接跳过，未知市场原样保留"""
+    context = {"all_companies": [
+        {"company": "缺代码", "market": "A股"},
+        {"company": "缺市场", "code": "000002"},
+        {"company": "美股公司", "market": "US", "code": "AAPL"},
+    ]}
+    refs = action._normalize_companies(context)
+    assert [(r.name, r.code, r.market) for r in refs] == [("美股公司", "AAPL", "US")]
+
+
+def test_missing_name_falls_back_to_code(action):
+    """没有公司名时以代码作为名称"""
+    refs = action._normalize_companies({"all_companies": [{"market": "港股", "code": "09988"}]})
+    assert refs[0].name == "09988"
+
+
+def test_same_list_normalized_once(action):
+    """同一列表重复调用直接返回缓存结果，列表被替换后重新规范化"""
+    companies = [{"company": "平安银行", "market": "A股", "code": "000001"}]
+    context = {"all_companies": companies}
+    first = action._normalize_companies(context)
+    assert action._normalize_companies(context) is first
+
+    context["all_companies"] = [{"company": "腾讯控股", "market": "港股", "code": "00700"}]
+    second = action._normalize_companies(context)
+    assert second is not first
+    assert [r.name for r in second] == ["腾讯控股"]
+
+
+def test_empty_context(action):
+    """context中没有公司列表时返回空列表"""
+    context = {}
+    assert action._normalize_companies(context) == []
+    assert context["all_companies"] == []
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试协调器的依赖DAG构建、并发调度及失败传播
+"""
+
+import sys
+import os
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from BaseAgent.memory import AgentMemory
+from BaseAgent.profile import AgentProfile
+from BaseAgent.coordinator_agent import CoordinatorAgent
+
+
+class FakeAgent:
+    """只记录执行情况的agent，fail为True时run抛出异常"""
+
+    def __init__(self, name, memory, log, fail=False):
+        self.profile = AgentProfile(name=name, role="测试", objectives=[], tools=[])
+        self.memory = memory
+        self.toolset = []
+        self.log = log
+        self.fail = fail
+
+    def run(self):
+        self.log.append(self.profile.name)
+        if self.fail:
+            raise RuntimeError(f"{self.profile.name} 执行失败")
+        return {"agent": self.profile.name}
+
+
+@pytest.fixture
+def coordinator(tmp_path):
+    memory = AgentMemory(str(tmp_path / "data"), str(tmp_path / "info"), str(tmp_path / "industry"),
+                         persist_vectors=False)
+    profile = AgentProfile(name="CoordinatorAgent", role="测试", objectives=[], tools=[],
+                           config={"report_type": "company"})
+    return CoordinatorAgent(profile, memory, planner=None, llm=None, llm_config=None)
+
+
+def register(coordinator, log, graph, failing=()):
+    """按{agent名: 依赖列表}注册一组FakeAgent"""
+    for name, deps in graph.items():
+        agent = FakeAgent(name, coordinator.memory, log, fail=name in failing)
+        coordinator.register_agent(agent, deps)
+
+
+DIAMOND = {"A": [], "B": ["A"], "C": ["A"], "D": ["B", "C"]}
+
+
+def test_build_dag(coordinator):
+    """层级、待完成依赖数和下游列表与依赖关系一致"""
+    register(coordinator, [], DIAMOND)
+    depth, wait, unlocks = coordinator.scheduler._build_dag()
+    assert depth == {"A": 0, "B": 1, "C": 1, "D": 2}
+    assert wait == {"A": 0, "B": 1, "C": 1, "D": 2}
+    assert unlocks == {"A": ["B", "C"], "B": ["D"], "C": ["D"], "D": []}
+
+
+def test_build_dag_detects_cycle(coordinator):
+    """循环依赖在构建时报错"""
+    register(coordinator, [], {"A": ["B"], "B": ["A"]})
+    with pytest.raises(ValueError):
+        coordinator.scheduler._build_dag()
+
+
+def test_next_agent_respects_dependencies(coordinator):
+    """只有依赖全部完成的agent才会被选中"""
+    register(coordinator, [], DIAMOND)
+    scheduler = coordinator.scheduler
+    assert scheduler.get_next_agent() == "A"
+    assert not scheduler.can_execute_agent("B")
+
+    scheduler.execute_agent("A")
+    assert scheduler.can_execute_agent("B") and scheduler.can_execute_agent("C")
+    assert scheduler.get_next_agent() == "B"
+    assert not scheduler.can_execute_agent("D")
+
+
+def test_workflow_runs_in_dependency_order(coordinator):
+    """所有agent均执行一次，且都在其依赖之后执行"""
+    log = []
+    register(coordinator, log, DIAMOND)
+    results = coordinator.execute_workflow()
+
+    assert sorted(results) == ["A", "B", "C", "D"]
+    assert sorted(log) == ["A", "B", "C", "D"]
+    for name, deps in DIAMOND.items():
+        assert all(log.index(dep) < log.index(name) for dep in deps)
+        assert coordinator.progress_tracker.get_agent_state(name) == "completed"
+
+
+def test_failure_blocks_downstream_only(coordinator):
+    """失败的agent不解锁下游，互不依赖的分支照常执行"""
+    log = []
+    graph = dict(DIAMOND, E=[], F=["E"])
+    register(coordinator, log, graph, failing={"B"})
+    results = coordinator.execute_workflow()
+
+    assert "error" in results["B"]
+    assert sorted(log) == ["A", "B", "C", "E", "F"]
+    assert "D" not in results
+    tracker = coordinator.progress_tracker
+    assert tracker.get_agent_state("B") == "failed"
+    assert tracker.get_agent_state("D") is None
+    assert tracker.get_progress_summary()["failed_agents"] == ["B"]
+
+
+def test_unregistered_dependency_blocks_agent(coordinator):
+    """依赖未注册的agent永远不会执行"""
+    log = []
+    register(coordinator, log, {"A": [], "B": ["Missing"]})
+    results = coordinator.execute_workflow()
+    assert list(results) == ["A"]
+    assert log == ["A"]
@@ -1,19 +1,142 @@
 # action_financial.py
-from toolset.utils.get_financial_statements import get_all_financial_statements, save_financial_statements_to_csv
-from toolset.utils.get_stock_intro import get_stock_intro, save_stock_intro_to_txt
+from toolset.utils.get_financial_statements import get_all_financial_statements, save_financial_statements, STATEMENTS_CACHE_CODEC
+from toolset.utils.get_stock_intro import get_stock_intro
 from toolset.utils.get_shareholder_info import get_shareholder_info, get_table_content
-from toolset.utils.search_engine import SearchEngine
+from toolset.utils.search_engine import SearchEngine, AsyncRateLimiter
 from toolset.utils.identify_competitors import identify_competitors_with_ai
-from toolset.utils.markdown_utils import save_markdown, format_markdown, convert_to_docx, extract_images_from_markdown, load_report_content, get_background, generate_outline, generate_section
-from toolset.utils.analyzer import Analyzer
+from toolset.utils.markdown_utils import save_markdown, format_markdown, convert_to_docx, extract_images_from_markdown, load_report_content, get_background, generate_outline, generate_section, summarize_section
 from toolset.utils.industry_data_collector import IndustryDataCollector
 from toolset.utils.macro_data_collector import MacroDataCollector
+from toolset.utils.json_io import dump_json, load_json
+from toolset.utils.fetch_cache import disk_memoize, TEXT_CODEC
 from toolset.utils.report_type_config import ReportTypeConfig, ReportType
-import time, random, os
+from utils.llm_cache import CachedLLM
+import time, os
+import asyncio
+import copy
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import hashlib
+import re
+import threading
+from collections import OrderedDict, defaultdict
 from datetime import datetime
-import glob
 import json
 from pathlib import Path
+from typing import NamedTuple
+
+
+def _memoize_success(ok=bool, maxsize: int = 256, copy_result: bool = False):
+    """
+    进程内LRU缓存，只缓存ok(result)为真的结果，失败的请求在重试时仍会重新发起
+    
+    copy_result为True时返回深拷贝，避免调用方原地修改缓存中的对象；force_refresh=True时跳过缓存重新请求。
+    """
+    def decorator(func):
+        cache = OrderedDict()
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(*args, force_refresh: bool = False, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            if not force_refresh:
+                with lock:
+                    if key in cache:
+                        cache.move_to_end(key)
+                        result = cache[key]
+                        return copy.deepcopy(result) if copy_result else result
+            # force_refresh只传给支持它的下层（如磁盘缓存）
+            result = func(*args, **kwargs, **({"force_refresh": True} if force_refresh else {}))
+            if ok(result):
+                with lock:
+                    cache[key] = result
+                    if len(cache) > maxsize:
+                        cache.popitem(last=False)
+                if copy_result:
+                    result = copy.deepcopy(result)
+            return result
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+
+# 网络/LLM请求结果在进程内复用，规划器重试失败步骤时不再重复请求；
+# 公司简介和财务报表另有24小时的磁盘缓存，跨运行复用
+_cached_get_stock_intro = _memoize_success()(
+    disk_memoize("stock_intro", 86400, TEXT_CODEC)(get_stock_intro)
+)
+_cached_get_shareholder_info = _memoize_success(ok=lambda r: bool(r and r.get('success')))(get_shareholder_info)
+_cached_identify_competitors = _memoize_success(copy_result=True)(identify_competitors_with_ai)
+
+
+def _has_any_statement(r) -> bool:
+    return bool(r) and any(df is not None for df in r.values())
+
+
+# 财务报表按(代码, 市场, 期间)缓存，至少取到一张报表才算成功；返回的DataFrame为共享对象，调用方只读不改
+_cached_get_all_financial_statements = _memoize_success(ok=_has_any_statement, maxsize=512)(
+    disk_memoize("financial_statements", 86400, STATEMENTS_CACHE_CODEC, ok=_has_any_statement)(
+        get_all_financial_statements
+    )
+)
+
+
+# A股代码首位到交易所前缀的映射，6开头为上交所，其余默认深交所
+_A_SHARE_PREFIX = {"6": "SH"}
+
+
+def _format_a_share_code(code: str) -> str:
+    if code[:2] in ("SH", "SZ"):
+        return code
+    return _A_SHARE_PREFIX.get(code[:1], "SZ") + code
+
+
+# 市场解析规则，按顺序匹配：(市场描述中的关键字, 规范化市场代码, 股票代码格式化函数)
+_MARKET_RULES = (
+    ("A", "A", _format_a_share_code),
+    ("港", "HK", None),
+)
+
+
+class _CompanyRef(NamedTuple):
+    """规范化后的公司标识，各取数步骤直接按属性访问"""
+    name: str
+    code: str
+    market: str
+
+
+# 竞争对手识别结果的磁盘缓存：竞争格局很少变化，30天内复用上次LLM的结果
+_COMPETITOR_CACHE_DIR = "./data/.llm_cache"
+_COMPETITOR_CACHE_TTL = 30 * 86400
+
+# 评价结果中包含score和feedback的JSON片段
+_EVAL_JSON_RE = re.compile(r'\{[^{}]*"score"[^{}]*"feedback"[^{}]*\}', re.DOTALL)
+
+# 维度评价使用的系统提示
+_EVAL_SYSTEM_PROMPT = "你是专业的金融研报评价专家，请客观公正地进行评价。"
+
+# 财务数据文件后缀及优先级（数值越小越优先），同一报表存在多种格式时只取最优的一份
+_DATA_SUFFIX_RANK = {".feather": 0, ".parquet": 1, ".csv": 2}
+
+
+def _write_text(path: str, text: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def _analyze_in_subprocess(llm_config: dict, output_dir: str, query: str, files):
+    """
+    子进程中的单次数据分析：每个进程独立的Analyzer、IPython执行环境和matplotlib状态
+
+    以spawn方式启动，参数只传可pickle的配置字典，LLM客户端在子进程内按配置重新创建。
+    """
+    from config.llm_config import LLMConfig
+    from toolset.utils.analyzer import Analyzer
+    analyzer = Analyzer(llm_config=LLMConfig.from_dict(llm_config), output_dir=output_dir, absolute_path=False)
+    return analyzer.analyze(query, files or [])
+
 
 class FinancialActionToolset:
     def __init__(self, profile, memory, llm, llm_config):
@@ -21,11 +144,18 @@ class FinancialActionToolset:
         self.m = memory
         self.llm = llm
         self.cfg = llm_config
+        # 按市场（对应不同的数据源主机）分别限速，代替每次请求后的固定等待
+        self._market_limiters = {}
+        self._cached_llm = None
+        self._normalized_companies = None
+        # 财务报表的落盘格式，默认feather供其他agent读取，可在profile配置中改为parquet/csv
+        self.data_format = self.p.get_config().get("data_format", "feather")
         # 初始化默认报告路径
         self.reports_dir = os.path.join(self.m.data_dir, "reports")
         self.default_report_path = os.path.join(self.reports_dir, "financial_analysis_report.md")
-        # Analyzer initialized
-        self.analyzer = Analyzer(llm_config=llm_config, llm=llm, output_dir=self.m.data_dir, absolute_path=False)
+        # Analyzer依赖IPython和matplotlib，导入较慢，首次数据分析时才创建
+        self._analyzer = None
+        self._eval_prompt_fingerprint = None
         
         # 初始化新的数据收集器
         self.industry_collector = IndustryDataCollector()
@@ -81,92 +211,183 @@ class FinancialActionToolset:
         return type_mapping.get(report_type_str.lower(), ReportType.COMPANY)
 
     #### DATA COLLECTION ACTIONS ####
-    def get_competitor_listed_companies(self, context):
+    def get_competitor_listed_companies(self, context, refresh: bool = False):
         # 只有公司研报才需要竞争对手
         if self.current_report_type != ReportType.COMPANY:
             return []
         
-        result = identify_competitors_with_ai(
-            api_key=self.cfg.api_key,
-            base_url=self.cfg.base_url,
-            model_name=self.cfg.model,
-            company_name=self.p.get_config()['company']
-        )
+        company_name = self.p.get_config()['company']
+        key = hashlib.sha256(json.dumps(
+            {"company": company_name, "model": self.cfg.model, "base_url": self.cfg.base_url},
+            ensure_ascii=False, sort_keys=True
+        ).encode("utf-8")).hexdigest()
+        cache_path = os.path.join(_COMPETITOR_CACHE_DIR, f"competitors_{key}.json")
+        
+        result = None
+        if not refresh and os.path.exists(cache_path):
+            cached = self.m.load_json(cache_path)
+            if time.time() - cached.get("created_at", 0) <= _COMPETITOR_CACHE_TTL:
+                result = cached.get("result")
+        if result is None:
+            result = _cached_identify_competitors(
+                api_key=self.cfg.api_key,
+                base_url=self.cfg.base_url,
+                model_name=self.cfg.model,
+                company_name=company_name
+            )
+            if result:
+                os.makedirs(_COMPETITOR_CACHE_DIR, exist_ok=True)
+                self.m.save_json(cache_path, {"created_at": time.time(), "result": result}, indent=False)
         result = [c for c in result if c.get('market') != "未上市"]
         return result
 
-    def get_all_financial_data(self, context):
-        # 只有公司研报才需要财务数据
-        if self.current_report_type != ReportType.COMPANY:
-            return []
-        
-        companies = context.get("all_companies", [])
-        data_lst = []
-        for p in companies:
-            try:
-                company, code, market = p['company'], p['code'], p['market']
-                print(f"获取：{company}({market}:{code})")
-                data = get_all_financial_statements(code, market, "年度")
-                data_lst.append(data)
-                save_financial_statements_to_csv(data, code, market, "年度", company, self.m.data_dir)
-                time.sleep(2)
-            except Exception as e:
-                print(f"⚠️ 获取失败: {e}")
-        return data_lst
-
-    def get_all_company_info(self, context):
-        # 只有公司研报才需要公司信息
-        if self.current_report_type != ReportType.COMPANY:
-            return ""
+    @staticmethod
+    def _parse_market(market_str: str, code: str) -> tuple[str, str]:
+        """
+        解析市场信息并格式化股票代码
         
-        def _parse_market( market_str: str, code: str) -> tuple[str, str]:
-            """
-            解析市场信息并格式化股票代码
+        Args:
+            market_str (str): 市场描述字符串（如"A股"、"港股"等）
+            code (str): 原始股票代码
             
-            Args:
-                market_str (str): 市场描述字符串（如"A股"、"港股"等）
-                code (str): 原始股票代码
-                
-            Returns:
-                Tuple[str, str]: 解析后的市场代码和格式化的股票代码
-                            - A股：返回("A", "SH000001"或"SZ000001"格式)
-                            - 港股：返回("HK", 原代码)
-            """
-            if "A" in market_str:
-                market = "A"
-                if not code.startswith("SH") and not code.startswith("SZ"):
-                    code = "SH" + code if code.startswith("6") else "SZ" + code
-                return market, code
-            elif "港" in market_str:
-                market = "HK"
-                return market, code
-            return market_str, code
+        Returns:
+            Tuple[str, str]: 解析后的市场代码和格式化的股票代码
+                        - A股：返回("A", "SH000001"或"SZ000001"格式)
+                        - 港股：返回("HK", 原代码)
+        """
+        for keyword, market, format_code in _MARKET_RULES:
+            if keyword in market_str:
+                return market, format_code(code) if format_code else code
+        return market_str, code
 
+    def _normalize_companies(self, context):
+        """
+        一次遍历规范化context中各公司的市场和代码（原地更新字典），返回_CompanyRef列表
+
+        同一公司列表只处理一次；缺少市场或代码的公司无法取数，直接跳过。
+        """
         companies = context.get("all_companies", [])
+        if self._normalized_companies is not None and self._normalized_companies[0] is companies:
+            return self._normalized_companies[1]
+        refs = []
         for c in companies:
             if 'market' in c and 'code' in c:
-                market, code = _parse_market(c['market'], c['code'])
+                market, code = self._parse_market(c['market'], c['code'])
                 c['market'] = market
                 c['code'] = code
+                refs.append(_CompanyRef(c.get('company', code), code, market))
+            else:
+                print(f"⚠️ {c.get('company', c)} 缺少市场或代码，跳过")
         context["all_companies"] = companies
+        # 持有列表引用做身份比较，竞争对手列表被替换后会重新规范化
+        self._normalized_companies = (companies, refs)
+        return refs
+
+    async def _fetch_financial(self, p):
+        """获取并保存单个公司的年度财务报表"""
+        company, code, market = p.name, p.code, p.market
+        async with self._market_limiter(market):
+            print(f"获取：{company}({market}:{code})")
+            data = await asyncio.to_thread(_cached_get_all_financial_statements, code, market, "年度")
+        await asyncio.to_thread(save_financial_statements, data, code, market, "年度", company, self.m.data_dir,
+                                self.data_format)
+        return data
+
+    @property
+    def analyzer(self):
+        """数据分析执行器，首次使用时才导入并创建"""
+        if self._analyzer is None:
+            from toolset.utils.analyzer import Analyzer
+            self._analyzer = Analyzer(llm_config=self.cfg, llm=self.llm, output_dir=self.m.data_dir, absolute_path=False)
+        return self._analyzer
+
+    @property
+    def cached_llm(self) -> CachedLLM:
+        """带磁盘缓存的LLM，用于输入不常变化的提示（如股东表格分析），首次使用时才打开缓存库"""
+        if self._cached_llm is None:
+            self._cached_llm = CachedLLM(self.llm)
+        return self._cached_llm
+
+    @property
+    def eval_prompt_fingerprint(self) -> str:
+        """评价提示模板（系统提示、各类型各维度的评价标准和提示正文）的摘要，模板修改后随之变化"""
+        if self._eval_prompt_fingerprint is None:
+            digest = hashlib.sha256(_EVAL_SYSTEM_PROMPT.encode("utf-8"))
+            for report_type in ReportType:
+                for dimension in self._get_evaluation_criteria(report_type):
+                    criteria = self._get_dimension_criteria(report_type, dimension)
+                    digest.update(self._build_evaluation_prompt("", dimension, criteria, report_type).encode("utf-8"))
+            self._eval_prompt_fingerprint = digest.hexdigest()
+        return self._eval_prompt_fingerprint
+
+    def _market_limiter(self, market: str) -> AsyncRateLimiter:
+        """同一市场相邻两次请求间隔1~2秒，不同市场互不影响"""
+        limiter = self._market_limiters.get(market)
+        if limiter is None:
+            limiter = self._market_limiters[market] = AsyncRateLimiter(1, 2)
+        return limiter
+
+    @staticmethod
+    def _market_semaphores(per_market: int = 3):
+        """按市场（数据源主机）限制同时在途的简介请求数，需在事件循环内创建"""
+        return defaultdict(lambda: asyncio.Semaphore(per_market))
+
+    async def _fetch_intro(self, item, market_sems=None):
+        """获取单个公司简介并保存为txt（直接写入已获取的简介，避免重复请求）"""
+        if market_sems is None:
+            info = await asyncio.to_thread(_cached_get_stock_intro, item.code, item.market)
+        else:
+            async with market_sems[item.market]:
+                info = await asyncio.to_thread(_cached_get_stock_intro, item.code, item.market)
+        if info:
+            filecompany = f"{item.name}_{item.market}_{item.code}.txt"
+            save_path = os.path.join(self.m.info_dir, filecompany)
+            await asyncio.to_thread(_write_text, save_path, info)
+        return info
+
+    def get_combined_company_data(self, context):
+        """一次并发遍历同时获取各公司的财务报表和公司简介"""
+        # 只有公司研报才需要财务数据和公司信息
+        if self.current_report_type != ReportType.COMPANY:
+            return {}
+        
+        companies = self._normalize_companies(context)
+        return asyncio.run(self._agather_company_payloads(companies))
 
-        result = ""
-        for item in companies:
-            info = get_stock_intro(item['code'], item['market'])
-            if info:
-                result += info
-                # 保存简介到txt文件
-                company = item.get('company', item['code'])
-                filecompany = f"{company}_{item['market']}_{item['code']}.txt"
-                save_path = os.path.join(self.m.info_dir, filecompany)
-                save_stock_intro_to_txt(item['code'], item['market'], save_path)
-        return result
+    async def _agather_company_payloads(self, companies, max_concurrency: int = 5):
+        """每家公司在同一信号量下并发请求财务报表和简介，返回{公司: {financial, info}}"""
+        sem = asyncio.Semaphore(max_concurrency)
+        market_sems = self._market_semaphores()
+        # 股东信息与公司数据无依赖，同时在后台抓取，结果进入进程内缓存供后续股东分析步骤直接使用
+        shareholder_prefetch = asyncio.ensure_future(asyncio.to_thread(_cached_get_shareholder_info))
+
+        async def _fetch(item):
+            async with sem:
+                financial, info = await asyncio.gather(
+                    self._fetch_financial(item), self._fetch_intro(item, market_sems), return_exceptions=True
+                )
+            name = item.name
+            for kind, r in (("财务数据", financial), ("公司信息", info)):
+                if isinstance(r, Exception):
+                    print(f"⚠️ {name} {kind}获取失败: {r}")
+            return name, {
+                "financial": None if isinstance(financial, Exception) else financial,
+                "info": None if isinstance(info, Exception) else info,
+            }
+
+        payloads = dict(await asyncio.gather(*(_fetch(item) for item in companies)))
+        try:
+            await shareholder_prefetch
+        except Exception as e:
+            print(f"⚠️ 股东信息预取失败: {e}")
+        return payloads
 
     def get_shareholder_analysis(self, context):
-        info = get_shareholder_info()
+        info = _cached_get_shareholder_info()
         if info['success']:
             content = get_table_content(info['tables'])
-            return self.llm.call("分析以下股东信息：\n" + content, system_prompt="你是股东分析专家")
+            return self.cached_llm.call("分析以下股东信息：\n" + content, system_prompt="你是股东分析专家",
+                                        cache_system=True)
         return "股东信息获取失败"
 
     def search_industry_info(self, context, engine: str = "sogou"):
@@ -177,30 +398,39 @@ class FinancialActionToolset:
         # 如果data/industry_info/all_search_results.json存在，则读取
         search_results_path = os.path.join(self.m.industry_dir, "all_search_results.json")
         if os.path.exists(search_results_path):
-            with open(search_results_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return self.m.load_json(search_results_path)
         
         # 否则进行搜索
         companies = [self.p.get_config()['company']] + [c['company'] for c in context.get("all_companies", [])]
-        results = {}
-        for company in companies:
-            r = SearchEngine(engine).search(f"{company} 市场份额 行业分析", max_results=10)
-            results[company] = r
+        results = asyncio.run(self._asearch_companies(companies, engine))
+
+        # 确保目录存在
+        os.makedirs(self.m.industry_dir, exist_ok=True)
+        # 该文件只作为后续步骤的输入，紧凑输出以加快写入和重新加载
+        self.m.save_json(search_results_path, results, indent=False)
+        return results
+
+    async def _asearch_companies(self, companies, engine: str, max_concurrency: int = 2):
+        """并发搜索各公司行业信息，共享限速器保持每5~10秒发出一次请求，同时最多max_concurrency个请求在途"""
+        limiter = AsyncRateLimiter(5, 10)
+        sem = asyncio.Semaphore(max_concurrency)
+        search_engine = SearchEngine(engine)
+
+        async def _search(company):
+            async with sem:
+                r = await search_engine.asearch(f"{company} 市场份额 行业分析", 10, limiter)
             # 拼接所有描述
             # all_desc = "\n".join([item['description'] for item in r if 'description' in item])
             # # 用LLM生成摘要
             # summary = self.llm.call(f"请用中文简要总结以下关于{company}的行业市场份额和竞争地位信息：\n{all_desc}", system_prompt="你是行业分析专家")
-            # results[company] = {
+            # r = {
             #     "search_results": r,
             #     "summary": summary
             # }
-            time.sleep(random.randint(5, 10))
+            return r
 
-        # 确保目录存在
-        os.makedirs(self.m.industry_dir, exist_ok=True)
-        with open(search_results_path, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
-        return results
+        found = await asyncio.gather(*(_search(c) for c in companies))
+        return dict(zip(companies, found))
 
     #### DATA ANALYSIS ACTIONS ####
     def quick_analysis(self, query, files=None):
@@ -218,40 +448,74 @@ class FinancialActionToolset:
         """
         return self.analyzer.analyze(query, files or [])
     
+    def _run_analyses(self, tasks):
+        """
+        执行一组相互独立的数据分析，tasks为{键: (query, files)}，返回{键: 报告}（空报告不收录）
+
+        Analyzer在进程内共享IPython单例和matplotlib全局状态，不能多线程并发，因此改为多进程并发
+        （进程数可在profile配置analysis_workers中设置，设为1时在当前进程内逐个执行）。
+        调用方可能已有其他线程在运行，fork会继承其持有的锁，因此使用spawn启动子进程，
+        入口脚本需将执行逻辑放在 if __name__ == "__main__" 之下。
+        """
+        workers = min(self.p.get_config().get("analysis_workers", 4), len(tasks))
+        if workers <= 1 or self.cfg is None:
+            results = {}
+            for key, (query, files) in tasks.items():
+                report = self.quick_analysis(query=query, files=files)
+                if report:
+                    results[key] = report
+            return results
+
+        results = {}
+        ctx = multiprocessing.get_context("spawn")
+        llm_config = self.cfg.to_dict()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = {
+                key: pool.submit(_analyze_in_subprocess, llm_config, self.m.data_dir, query, files)
+                for key, (query, files) in tasks.items()
+            }
+            for key, future in futures.items():
+                try:
+                    report = future.result()
+                except Exception as e:
+                    print(f"⚠️ {key} 分析失败: {e}")
+                    continue
+                if report:
+                    results[key] = report
+        return results
+
     def get_company_files(self, data_dir):
         """获取公司文件"""
         abs_data_dir = os.path.abspath(data_dir)
         print(f"获取公司数据目录: {abs_data_dir}")
-        all_files = glob.glob(f"{abs_data_dir}/*.csv")
-        companies = {}
-        for file in all_files:
-            filename = os.path.basename(file)
-            company_name = filename.split("_")[0]
-            companies.setdefault(company_name, []).append(file)
-        return companies
+        # 只扫描顶层文件：Analyzer的session_*输出目录和reports目录都在data_dir下，
+        # 其中生成的表格不能被当作公司数据再次分析
+        best = {}  # 文件名不含后缀 -> (优先级, 路径)
+        with os.scandir(abs_data_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                stem, dot, ext = name.rpartition(".")
+                rank = _DATA_SUFFIX_RANK.get(dot + ext)
+                if rank is None or not stem or name.startswith(".") or not entry.is_file():
+                    continue
+                prev = best.get(stem)
+                if prev is None or rank < prev[0]:
+                    best[stem] = (rank, entry.path)
+        companies = defaultdict(list)
+        for stem, (_, path) in best.items():
+            companies[stem.partition("_")[0]].append(path)
+        return dict(companies)
 
     def analyze_companies_in_directory(self, context):
         """
         分析指定目录下的所有公司数据
         """
         def analyze_companies(data_directory, query="基于表格的数据，分析有价值的内容，并绘制相关图表。最后生成汇报给我。"):
-            """分析目录中的所有公司"""
-            def analyze_individual_company(files, query=None):
-                """分析单个公司"""
-                if query is None:
-                    query = "基于表格的数据，分析有价值的内容，并绘制相关图表。最后生成汇报给我。"
-                report = self.quick_analysis(
-                    query=query, files=files
-                )
-                return report
-
+            """分析目录中的所有公司，各公司之间相互独立，并发执行"""
             company_files = self.get_company_files(data_directory)
-            all_reports = {}
-            for company_name, files in company_files.items():
-                report = analyze_individual_company(files, query)
-                if report:
-                    all_reports[company_name] = report
-            return all_reports
+            return self._run_analyses({
+                company_name: (query, files) for company_name, files in company_files.items()
+            })
 
         results = analyze_companies(
             data_directory=self.m.data_dir,
@@ -274,30 +538,20 @@ class FinancialActionToolset:
             if not company_files or target_company_name not in company_files:
                 return {}
             competitors = [company for company in company_files.keys() if company != target_company_name]
-            comparison_reports = {}
-            for competitor in competitors:
-                comparison_key = f"{target_company_name}_vs_{competitor}"
-                report = compare_two_companies(
-                    company_files[target_company_name],
-                    company_files[competitor]
-                )
-                if report:
-                    comparison_reports[comparison_key] = {
-                        'company1': target_company_name,
-                        'company2': competitor,
-                        'report': report
-                    }
-            return comparison_reports
-
-        def compare_two_companies(company1_files, company2_files):
-            """比较两个公司"""
             query = "基于两个公司的表格的数据，分析有共同点的部分，绘制对比分析的表格，并绘制相关图表。最后生成汇报给我。"
-            all_files = company1_files + company2_files
-            report = self.quick_analysis(
-                query=query,
-                files=all_files,
-            )
-            return report
+            # 目标公司与各竞争对手的对比相互独立，并发执行
+            reports = self._run_analyses({
+                competitor: (query, company_files[target_company_name] + company_files[competitor])
+                for competitor in competitors
+            })
+            return {
+                f"{target_company_name}_vs_{competitor}": {
+                    'company1': target_company_name,
+                    'company2': competitor,
+                    'report': reports[competitor]
+                }
+                for competitor in competitors if competitor in reports
+            }
         
         comparison_results = comparison_analysis(
             data_directory=self.m.data_dir,
@@ -322,13 +576,10 @@ class FinancialActionToolset:
             """获取商汤科技的财务数据文件"""
             abs_data_dir = os.path.abspath(data_dir)
             print(f"获取商汤科技财务数据目录: {abs_data_dir}")
-            all_files = glob.glob(f"{abs_data_dir}/*.csv")
             sensetime_files = []
-            for file in all_files:
-                filename = os.path.basename(file)
-                company_name = filename.split("_")[0]
+            for company_name, files in self.get_company_files(abs_data_dir).items():
                 if "商汤" in company_name or "SenseTime" in company_name:
-                    sensetime_files.append(file)
+                    sensetime_files.extend(files)
             return sensetime_files
         def analyze_sensetime_valuation(files):
             """分析商汤科技的估值与预测"""
@@ -352,14 +603,14 @@ class FinancialActionToolset:
             abs_data_dir = os.path.abspath(data_dir)
             print(f"获取公司信息目录: {abs_data_dir}")
             all_files = os.listdir(abs_data_dir)
-            company_infos = ""
+            parts = []
             for file in all_files:
                 if file.endswith(".txt"):
                     company_name = file.split(".")[0]
                     with open(os.path.join(data_dir, file), 'r', encoding='utf-8') as f:
                         content = f.read()
-                    company_infos += f"【公司信息开始】\n公司名称: {company_name}\n{content}\n【公司信息结束】\n\n"
-            return company_infos
+                    parts.append(f"【公司信息开始】\n公司名称: {company_name}\n{content}\n【公司信息结束】\n\n")
+            return "".join(parts)
         
         def format_final_reports(all_reports):
             """格式化最终报告"""
@@ -374,37 +625,46 @@ class FinancialActionToolset:
         
         # 整理公司信息
         company_infos = get_company_infos()
-        company_infos = self.llm.call(
+        # 整理类调用输入不变时输出应一致：温度设为0并走磁盘缓存
+        company_infos = self.cached_llm.call(
             f"请整理以下公司信息内容，确保格式清晰易读，并保留关键信息：\n{company_infos}",
             system_prompt="你是一个专业的公司信息整理师。",
             max_tokens=8192,
-            temperature=0.5
+            temperature=0,
+            cache_system=True
         )
         
         # 整理股权信息
-        info = get_shareholder_info()
+        info = _cached_get_shareholder_info()
         shangtang_shareholder_info = info.get("tables", [])
         table_content = get_table_content(shangtang_shareholder_info)
-        shareholder_analysis = self.llm.call(
+        shareholder_analysis = self.cached_llm.call(
             "请分析以下股东信息表格内容：\n" + table_content,
             system_prompt="你是一个专业的股东信息分析师。",
             max_tokens=8192,
-            temperature=0.5
+            temperature=0,
+            cache_system=True
         )
         
         # 整理行业信息搜索结果
-        search_results_file = os.path.join(self.m.industry_dir, "all_search_results.json")
-        with open(search_results_file, 'r', encoding='utf-8') as f:
-            all_search_results = json.load(f)
-        search_res = ""
+        # 本次运行已执行过行业搜索时直接复用上下文中的结果，不再从磁盘重新解析同一份JSON
+        all_search_results = context.get("search_industry_info")
+        if not isinstance(all_search_results, dict):
+            search_results_file = os.path.join(self.m.industry_dir, "all_search_results.json")
+            all_search_results = self.m.load_json(search_results_file)
+        # 片段收集到列表后一次拼接，避免字符串反复+=造成的二次复制
+        search_parts = []
         for company, results in all_search_results.items():
-            search_res += f"【{company}搜索信息开始】\n"
+            search_parts.append(f"【{company}搜索信息开始】\n")
             for result in results:
-                search_res += f"标题: {result.get('title', '无标题')}\n"
-                search_res += f"链接: {result.get('href', '无链接')}\n"
-                search_res += f"摘要: {result.get('body', '无摘要')}\n"
-                search_res += "----\n"
-            search_res += f"【{company}搜索信息结束】\n\n"
+                search_parts.append(
+                    f"标题: {result.get('title', '无标题')}\n"
+                    f"链接: {result.get('href', '无链接')}\n"
+                    f"摘要: {result.get('body', '无摘要')}\n"
+                    "----\n"
+                )
+            search_parts.append(f"【{company}搜索信息结束】\n\n")
+        search_res = "".join(search_parts)
         
         # 保存阶段一结果
         merged_results = context.get("merged_results", {})
@@ -416,16 +676,18 @@ class FinancialActionToolset:
         
         # 统一保存为markdown
         md_output_file = f"财务研报汇总_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
-        with open(md_output_file, 'w', encoding='utf-8') as f:
-            f.write(f"# 公司基础信息\n\n## 整理后公司信息\n\n{company_infos}\n\n")
-            f.write(f"# 股权信息分析\n\n{shareholder_analysis}\n\n")
-            f.write(f"# 行业信息搜索结果\n\n{search_res}\n\n")
-            f.write(f"# 财务数据分析与两两对比\n\n{formatted_report}\n\n")
-            if sensetime_valuation_report and isinstance(sensetime_valuation_report, dict):
-                f.write(f"# 商汤科技估值与预测分析\n\n{sensetime_valuation_report.get('final_report', '未生成报告')}\n\n")
-            # 添加图表部分
-            if charts_section:
-                f.write(charts_section)
+        md_parts = [
+            f"# 公司基础信息\n\n## 整理后公司信息\n\n{company_infos}\n\n",
+            f"# 股权信息分析\n\n{shareholder_analysis}\n\n",
+            f"# 行业信息搜索结果\n\n{search_res}\n\n",
+            f"# 财务数据分析与两两对比\n\n{formatted_report}\n\n",
+        ]
+        if sensetime_valuation_report and isinstance(sensetime_valuation_report, dict):
+            md_parts.append(f"# 商汤科技估值与预测分析\n\n{sensetime_valuation_report.get('final_report', '未生成报告')}\n\n")
+        # 添加图表部分
+        if charts_section:
+            md_parts.append(charts_section)
+        _write_text(md_output_file, "".join(md_parts))
         
         print(f"\n✅ 第一阶段完成！基础分析报告已保存到: {md_output_file}")
         
@@ -445,8 +707,6 @@ class FinancialActionToolset:
     
     def _find_and_add_session_charts(self):
         """查找session目录中的图表并生成markdown引用"""
-        import glob
-        
         print("🔍 搜索session目录中的分析图表...")
         data_financials_dir = os.path.join(os.getcwd(), "data", "financials")
         
@@ -454,23 +714,30 @@ class FinancialActionToolset:
             print("⚠️ 未找到data/financials目录")
             return ""
         
-        # 找到所有session目录
-        session_dirs = [d for d in os.listdir(data_financials_dir) if d.startswith('session_')]
+        # 找到所有session目录，直接使用DirEntry的stat结果取修改时间，选择最新的session
+        with os.scandir(data_financials_dir) as it:
+            session_dirs = [(e.stat().st_mtime, e.name) for e in it if e.name.startswith('session_')]
         if not session_dirs:
             print("⚠️ 未找到session目录")
             return ""
         
-        # 按修改时间排序，选择最新的session
-        session_dirs.sort(key=lambda x: os.path.getmtime(os.path.join(data_financials_dir, x)), reverse=True)
-        latest_session = session_dirs[0]
+        latest_session = max(session_dirs)[1]
         session_path = os.path.join(data_financials_dir, latest_session)
         
         print(f"📊 使用最新session目录: {latest_session}")
         
-        # 查找所有图片文件
-        image_files = []
-        for ext in ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg']:
-            image_files.extend(glob.glob(os.path.join(session_path, ext)))
+        # 一次遍历目录查找所有图片文件，按后缀分组保持原有顺序
+        image_exts = ('.png', '.jpg', '.jpeg', '.gif', '.svg')
+        by_ext = {ext: [] for ext in image_exts}
+        with os.scandir(session_path) as it:
+            for entry in it:
+                name = entry.name
+                if name.startswith('.'):
+                    continue
+                ext = os.path.splitext(name)[1]
+                if ext in by_ext:
+                    by_ext[ext].append(entry.path)
+        image_files = [path for ext in image_exts for path in by_ext[ext]]
         
         if not image_files:
             print("⚠️ session目录中未发现图表文件")
@@ -479,8 +746,7 @@ class FinancialActionToolset:
         print(f"📈 发现 {len(image_files)} 个分析图表")
         
         # 生成图表展示部分
-        charts_section = "\n\n# 财务分析图表\n\n"
-        charts_section += "以下是系统自动生成的财务分析图表：\n\n"
+        chart_parts = ["\n\n# 财务分析图表\n\n", "以下是系统自动生成的财务分析图表：\n\n"]
         
         for img_file in image_files:
             filename = os.path.basename(img_file)
@@ -490,11 +756,10 @@ class FinancialActionToolset:
             # 生成更友好的图表名称
             chart_name = filename.replace('_', ' ').replace('-', ' ').replace('.png', '').replace('.jpg', '').replace('.jpeg', '').title()
             
-            charts_section += f"## {chart_name}\n\n"
-            charts_section += f"![{chart_name}]({relative_path})\n\n"
+            chart_parts.append(f"## {chart_name}\n\n![{chart_name}]({relative_path})\n\n")
             print(f"✅ 已添加图表引用: {chart_name}")
         
-        return charts_section
+        return "".join(chart_parts)
     
 
 
@@ -522,24 +787,35 @@ class FinancialActionToolset:
         
         # 分段生成深度研报
         print("\n✍️ 开始分段生成深度研报...")
-        full_report = ['# 商汤科技公司研报\n']
-        prev_content = ''
-        
-        for idx, part in enumerate(parts):
-            part_title = part.get('part_title', f'部分{idx+1}')
-            print(f"\n  正在生成：{part_title}")
-            is_last = (idx == len(parts) - 1)
-            section_text = generate_section(
-                self.llm, part_title, prev_content, background, report_content, is_last
-            )
-            full_report.append(section_text)
-            print(f"  ✅ 已完成：{part_title}")
-            prev_content = '\n'.join(full_report)
-        
-        # 保存最终报告
-        final_report = '\n\n'.join(full_report)
+        title = '# 商汤科技公司研报\n'
+        # 前文只传更早章节的摘要和上一节原文，提示长度不随章节数增长
+        section_summaries = []
+        last_section = ''
         output_file = f"深度财务研报分析_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
-        save_markdown(final_report, output_file)
+        
+        # 每生成一节立即写入文件，中途失败时已完成的章节不会丢失
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(title)
+            for idx, part in enumerate(parts):
+                part_title = part.get('part_title', f'部分{idx+1}')
+                print(f"\n  正在生成：{part_title}")
+                is_last = (idx == len(parts) - 1)
+                prev_content = self._rolling_prev_content(title, section_summaries, last_section) if idx else ''
+                section_text = generate_section(
+                    self.llm, part_title, prev_content, background, report_content, is_last
+                )
+                f.write('\n\n' + section_text)
+                f.flush()
+                # 上一节退出原文窗口时才压缩为摘要，最后一节无需摘要
+                if last_section:
+                    section_summaries.append(summarize_section(self.cached_llm, last_section))
+                last_section = section_text
+                print(f"  ✅ 已完成：{part_title}")
+        print(f"\n📁 深度研报分析已保存到: {output_file}")
+        
+        usage = getattr(self.llm, "usage_stats", None)
+        if usage and usage["prompt_tokens"]:
+            print(f"📊 累计输入token {usage['prompt_tokens']}，其中命中提示缓存 {usage['cached_tokens']}")
         
         # 🎯 保存报告路径到类属性
         self._update_report_path("deep_report", output_file)
@@ -554,6 +830,15 @@ class FinancialActionToolset:
         
         return {"deep_report_file": output_file, "status": "completed"}
 
+    @staticmethod
+    def _rolling_prev_content(title, section_summaries, last_section):
+        """拼接生成下一节时参考的前文：更早章节的摘要加上一节原文"""
+        parts = [title]
+        if section_summaries:
+            parts.append("【前文各节摘要】\n" + "\n\n".join(section_summaries))
+        parts.append("【上一节原文】\n" + last_section)
+        return "\n".join(parts)
+
     #### 行业研报数据收集工具 ####
     def get_industry_overview(self, context):
         """获取行业概况"""
@@ -604,8 +889,7 @@ class FinancialActionToolset:
         # 保存搜索结果
         filename = f"{industry_name}_leading_companies.json"
         filepath = os.path.join(self.m.industry_dir, filename)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(search_results, f, ensure_ascii=False, indent=2)
+        self.m.save_json(filepath, search_results)
         
         return search_results
 
@@ -669,26 +953,22 @@ class FinancialActionToolset:
         if not overview_data:
             overview_file = os.path.join(self.m.industry_dir, f"{industry_name}_overview.json")
             if os.path.exists(overview_file):
-                with open(overview_file, 'r', encoding='utf-8') as f:
-                    overview_data = json.load(f)
+                overview_data = load_json(overview_file)
         
         if not chain_data:
             chain_file = os.path.join(self.m.industry_dir, f"{industry_name}_chain_analysis.json")
             if os.path.exists(chain_file):
-                with open(chain_file, 'r', encoding='utf-8') as f:
-                    chain_data = json.load(f)
+                chain_data = load_json(chain_file)
         
         if not leading_companies_data:
             companies_file = os.path.join(self.m.industry_dir, f"{industry_name}_leading_companies.json")
             if os.path.exists(companies_file):
-                with open(companies_file, 'r', encoding='utf-8') as f:
-                    leading_companies_data = json.load(f)
+                leading_companies_data = load_json(companies_file)
         
         if not market_scale_data:
             market_file = os.path.join(self.m.industry_dir, f"{industry_name}_market_scale.json")
             if os.path.exists(market_file):
-                with open(market_file, 'r', encoding='utf-8') as f:
-                    market_scale_data = json.load(f)
+                market_scale_data = load_json(market_file)
         
         # 整理数据
         if overview_data:
@@ -855,44 +1135,37 @@ class FinancialActionToolset:
         if not gdp_data:
             gdp_file = os.path.join("./data", "macro", f"{country}_gdp_data.json")
             if os.path.exists(gdp_file):
-                with open(gdp_file, 'r', encoding='utf-8') as f:
-                    gdp_data = json.load(f)
+                gdp_data = load_json(gdp_file)
         
         if not cpi_data:
             cpi_file = os.path.join("./data", "macro", f"{country}_cpi_data.json")
             if os.path.exists(cpi_file):
-                with open(cpi_file, 'r', encoding='utf-8') as f:
-                    cpi_data = json.load(f)
+                cpi_data = load_json(cpi_file)
 
         if not interest_rate_data:
             interest_rate_file = os.path.join("./data", "macro", f"{country}_interest_rate_data.json")
             if os.path.exists(interest_rate_file):
-                with open(interest_rate_file, 'r', encoding='utf-8') as f:
-                    interest_rate_data = json.load(f)
+                interest_rate_data = load_json(interest_rate_file)
         
         if not exchange_rate_data:
             exchange_rate_file = os.path.join("./data", "macro", f"exchange_rate.json")
             if os.path.exists(exchange_rate_file):
-                with open(exchange_rate_file, 'r', encoding='utf-8') as f:
-                    exchange_rate_data = json.load(f)
+                exchange_rate_data = load_json(exchange_rate_file)
 
         if not fed_data:
             fed_rate_file = os.path.join("./data", "macro", "fed_interest_rate_data.json")
             if os.path.exists(fed_rate_file):
-                with open(fed_rate_file, 'r', encoding='utf-8') as f:
-                    fed_data = json.load(f)
+                fed_data = load_json(fed_rate_file)
 
         if not policy_data:
             policy_file = os.path.join("./data", "macro", f"{country}_policy_reports.json")
             if os.path.exists(policy_file):
-                with open(policy_file, 'r', encoding='utf-8') as f:
-                    policy_data = json.load(f)
+                policy_data = load_json(policy_file)
         
         if not industry_impact_data:
             industry_impact_file = os.path.join("./data", "macro", "policy_impact.json")
             if os.path.exists(industry_impact_file):
-                with open(industry_impact_file, 'r', encoding='utf-8') as f:
-                    industry_impact_data = json.load(f)
+                industry_impact_data = load_json(industry_impact_file)
 
         # 整理数据
         if gdp_data:
@@ -1182,7 +1455,8 @@ class FinancialActionToolset:
 
         content = ""
         for file_path in files:
-            content = file_path.read_text(encoding="utf-8")
+            with open(file_path, 'rb', buffering=1 << 20) as f:
+                content = f.read().decode("utf-8")
             print(f"===== {file_path} =====")
             print(content[:200])
 
@@ -1336,8 +1610,7 @@ class FinancialActionToolset:
         
         # 保存评分数据
         json_file = os.path.join(base_dir, f"{base_name}_scores.json") 
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(final_evaluation, f, ensure_ascii=False, indent=2)
+        dump_json(json_file, final_evaluation)
         
         return f"评价结果已保存:\n- 报告: {report_file}\n- 数据: {json_file}"
     
@@ -1363,7 +1636,7 @@ class FinancialActionToolset:
             # 调用LLM进行评价
             response = self.llm.call(
                 evaluation_prompt,
-                system_prompt="你是专业的金融研报评价专家，请客观公正地进行评价。",
+                system_prompt=_EVAL_SYSTEM_PROMPT,
                 temperature=0.3
             )
             
@@ -1475,9 +1748,7 @@ class FinancialActionToolset:
         """解析LLM评价结果"""
         try:
             # 尝试从响应中提取JSON
-            import re
-            json_pattern = r'\{[^{}]*"score"[^{}]*"feedback"[^{}]*\}'
-            json_match = re.search(json_pattern, response, re.DOTALL)
+            json_match = _EVAL_JSON_RE.search(response)
             
             if json_match:
                 json_str = json_match.group(0)
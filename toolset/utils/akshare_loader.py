@@ -0,0 +1,8 @@
+import functools
+
+
+@functools.lru_cache(maxsize=None)
+def get_akshare():
+    """akshare导入耗时较长（秒级），首次取数时才导入；各取数模块共用这一个入口"""
+    import akshare
+    return akshare
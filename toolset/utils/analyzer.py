@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 import os
+import re
 import json
 import yaml
 from typing import Dict, Any, List, Optional
@@ -12,6 +13,9 @@ from .code_executor import CodeExecutor
 from config.llm_config import LLMConfig
 from prompts.planner.prompts import data_analysis_system_prompt, final_report_system_prompt,final_report_system_prompt_absolute
 
+# 代码执行输出中的图片路径
+_IMG_RE = re.compile(r'[\w./\\-]+\.(?:png|jpg|jpeg|svg)', re.IGNORECASE)
+
 
 class Analyzer:
     """
@@ -144,18 +148,14 @@ class Analyzer:
             # 检查代码执行结果中是否有图片生成但文件不存在的情况
             # 假设图片保存路径会在 result['output'] 或 result['figures'] 里体现
             # 如果检测到图片文件不存在，建议用户重新分析
-            missing_figures = []
             output = result.get('output', '')
             # 简单正则或字符串查找图片路径并判断是否存在
-            import re
-            img_paths = re.findall(r'(?:[\w./\\-]+\.(?:png|jpg|jpeg|svg))', str(output))
-            for img_path in img_paths:
-                if not os.path.isabs(img_path):
-                    abs_path = os.path.join(self.session_output_dir, img_path)
-                else:
-                    abs_path = img_path
-                if not os.path.exists(abs_path):
-                    missing_figures.append(img_path)
+            # 同一路径可能在输出中出现多次，去重（保持顺序）后只检查一次
+            img_paths = dict.fromkeys(_IMG_RE.findall(str(output)))
+            # os.path.join遇到绝对路径时直接返回该路径
+            missing_figures = [
+                p for p in img_paths if not os.path.exists(os.path.join(self.session_output_dir, p))
+            ]
             if missing_figures:
                 feedback += f"\n⚠️ 检测到以下图片未生成成功: {missing_figures}\n建议重新分析本轮或修正代码后再试。"
                 # 可以在这里返回一个特殊标志，供 analyze 主流程判断是否需要重启分析
@@ -360,8 +360,7 @@ class Analyzer:
         print("✅ 最终报告生成完成")
         # 手动添加附件清单到报告末尾
         if all_figures:
-            appendix_section = "\n\n## 附件清单\n\n"
-            appendix_section += "本报告包含以下图片附件：\n\n"
+            appendix_parts = ["\n\n## 附件清单\n\n", "本报告包含以下图片附件：\n\n"]
             
             for i, figure in enumerate(all_figures, 1):
                 filename = figure.get('filename', '未知文件名')
@@ -369,17 +368,16 @@ class Analyzer:
                 analysis = figure.get('analysis', '无分析')
                 file_path = figure.get('file_path', '')
                 
-                appendix_section += f"{i}. **{filename}**\n"
-                appendix_section += f"   - 描述：{description}\n"
-                appendix_section += f"   - 细节分析：{analysis}\n"
-                if self.absolute_path:
-                    appendix_section += f"   - 文件路径：{file_path}\n"
-                else:
-                    appendix_section += f"   - 文件路径：./{filename}\n"
-                appendix_section += "\n"
+                shown_path = file_path if self.absolute_path else f"./{filename}"
+                appendix_parts.append(
+                    f"{i}. **{filename}**\n"
+                    f"   - 描述：{description}\n"
+                    f"   - 细节分析：{analysis}\n"
+                    f"   - 文件路径：{shown_path}\n\n"
+                )
             
             # 将附件清单添加到报告内容末尾
-            final_report_content += appendix_section
+            final_report_content += "".join(appendix_parts)
         
         # 保存最终报告到文件
         report_file_path = os.path.join(self.session_output_dir, "最终分析报告.md")
@@ -1,5 +1,5 @@
 from typing import Optional
-import yaml
+from .yaml_io import load_yaml
 
 
 def extract_code_from_response(response: str) -> Optional[str]:
@@ -17,7 +17,7 @@ def extract_code_from_response(response: str) -> Optional[str]:
             else:
                 yaml_content = response.strip()
             
-            yaml_data = yaml.safe_load(yaml_content)
+            yaml_data = load_yaml(yaml_content)
             if 'code' in yaml_data:
                 return yaml_data['code']
         except:
@@ -0,0 +1,94 @@
+"""
+网络请求结果的磁盘缓存
+财务报表、公司简介、搜索结果在一天内基本不变，跨进程运行复用，避免每次重复下载
+"""
+
+import os
+import time
+import hashlib
+import functools
+
+from .json_io import dump_json, load_json
+
+# 缓存根目录，可通过环境变量FETCH_CACHE_DIR修改
+FETCH_CACHE_DIR = os.environ.get("FETCH_CACHE_DIR", "./data/.fetch_cache")
+
+
+def _cache_key(name: str, args, kwargs) -> str:
+    raw = repr((name, args, sorted(kwargs.items())))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _dump_json(path: str, value):
+    tmp_path = f"{path}.tmp"
+    dump_json(tmp_path, value, indent=False)
+    os.replace(tmp_path, path)
+
+
+def _load_json(path: str):
+    return load_json(path)
+
+
+def _dump_text(path: str, value: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(value)
+    os.replace(tmp_path, path)
+
+
+def _load_text(path: str) -> str:
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+# 序列化方式：(缓存文件后缀, 写出函数, 读取函数)
+JSON_CODEC = (".json", _dump_json, _load_json)
+TEXT_CODEC = (".txt", _dump_text, _load_text)
+
+
+def disk_memoize(namespace: str, ttl: float, codec=JSON_CODEC, ok=bool, key=None):
+    """
+    跨进程运行的磁盘缓存装饰器，只缓存ok(result)为真的结果，超过ttl秒的条目视为过期
+
+    以sha256(函数名, 参数)为键存放在FETCH_CACHE_DIR/namespace下；参数中含有对象时，
+    可传入key(*args, **kwargs)返回参与计算键的参数元组。
+    调用时传入force_refresh=True跳过读取并重新请求；wrapper.peek(*args, **kwargs)只读缓存，未命中返回None。
+    """
+    suffix, dump, load = codec
+
+    def decorator(func):
+        cache_dir = os.path.join(FETCH_CACHE_DIR, namespace)
+
+        def _path(args, kwargs) -> str:
+            if key is not None:
+                args, kwargs = key(*args, **kwargs), {}
+            return os.path.join(cache_dir, _cache_key(func.__qualname__, args, kwargs) + suffix)
+
+        def _read(path: str):
+            try:
+                if time.time() - os.path.getmtime(path) <= ttl:
+                    return load(path)
+            except Exception:
+                # 条目不存在或已损坏，按未命中处理
+                pass
+            return None
+
+        @functools.wraps(func)
+        def wrapper(*args, force_refresh: bool = False, **kwargs):
+            path = _path(args, kwargs)
+            if not force_refresh:
+                cached = _read(path)
+                if cached is not None:
+                    return cached
+            result = func(*args, **kwargs)
+            if ok(result):
+                try:
+                    os.makedirs(cache_dir, exist_ok=True)
+                    dump(path, result)
+                except Exception as e:
+                    print(f"⚠️ 写入缓存失败（{namespace}）: {e}")
+            return result
+
+        wrapper.peek = lambda *args, **kwargs: _read(_path(args, kwargs))
+        return wrapper
+    return decorator
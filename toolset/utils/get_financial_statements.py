@@ -1,7 +1,10 @@
-import akshare as ak
 import pandas as pd
 from typing import Dict, Optional
 import os
+import json
+import shutil
+
+from .akshare_loader import get_akshare
 
 
 def get_balance_sheet(stock_code: str = "00020", market: str = "HK", period: str = "年度", verbose: bool = False) -> Optional[pd.DataFrame]:
@@ -22,13 +25,13 @@ def get_balance_sheet(stock_code: str = "00020", market: str = "HK", period: str
             print(f"正在获取{market}股票代码 {stock_code} 的{period}资产负债表...")
         
         if market == "HK":
-            df_balance_sheet = ak.stock_financial_hk_report_em(
+            df_balance_sheet = get_akshare().stock_financial_hk_report_em(
                 stock=stock_code, 
                 symbol="资产负债表", 
                 indicator=period
             )
         elif market == "A":
-            df_balance_sheet = ak.stock_balance_sheet_by_yearly_em(symbol=stock_code)
+            df_balance_sheet = get_akshare().stock_balance_sheet_by_yearly_em(symbol=stock_code)
         else:
             raise ValueError(f"不支持的市场类型: {market}，请使用 'HK' 或 'A'")
         
@@ -63,13 +66,13 @@ def get_income_statement(stock_code: str = "00020", market: str = "HK", period:
             print(f"正在获取{market}股票代码 {stock_code} 的{period}利润表...")
         
         if market == "HK":
-            df_income_statement = ak.stock_financial_hk_report_em(
+            df_income_statement = get_akshare().stock_financial_hk_report_em(
                 stock=stock_code, 
                 symbol="利润表", 
                 indicator=period
             )
         elif market == "A":
-            df_income_statement = ak.stock_profit_sheet_by_yearly_em(symbol=stock_code)
+            df_income_statement = get_akshare().stock_profit_sheet_by_yearly_em(symbol=stock_code)
         else:
             raise ValueError(f"不支持的市场类型: {market}，请使用 'HK' 或 'A'")
         
@@ -105,13 +108,13 @@ def get_cash_flow_statement(stock_code: str = "00020", market: str = "HK", perio
             print(f"正在获取{market}股票代码 {stock_code} 的{period}现金流量表...")
         
         if market == "HK":
-            df_cash_flow = ak.stock_financial_hk_report_em(
+            df_cash_flow = get_akshare().stock_financial_hk_report_em(
                 stock=stock_code, 
                 symbol="现金流量表", 
                 indicator=period
             )
         elif market == "A":
-            df_cash_flow = ak.stock_cash_flow_sheet_by_yearly_em(symbol=stock_code)
+            df_cash_flow = get_akshare().stock_cash_flow_sheet_by_yearly_em(symbol=stock_code)
         else:
             raise ValueError(f"不支持的市场类型: {market}，请使用 'HK' 或 'A'")
         
@@ -163,37 +166,129 @@ def get_all_financial_statements(stock_code: str = "00020", market: str = "HK",
     return financial_statements
 
 
-def save_financial_statements_to_csv(financial_statements: Dict[str, Optional[pd.DataFrame]], 
-                                   stock_code: str = "00020", 
-                                   market: str = "HK",
-                                   period: str = "年度",
-                                   company_name: Optional[str] = None,
-                                   save_dir: str = ".") -> None:
+# 各存储格式的文件后缀和写出方式：
+# feather(zstd)写出最快，作为本项目各agent之间交换数据的默认格式；parquet体积小、通用性好，用于归档；
+# feather/parquet需要pyarrow
+_STATEMENT_WRITERS = {
+    "csv": (".csv", lambda df, path: df.to_csv(path, index=False, encoding='utf-8-sig')),
+    "parquet": (".parquet", lambda df, path: df.to_parquet(path, index=False, compression="snappy")),
+    "feather": (".feather", lambda df, path: df.reset_index(drop=True).to_feather(path, compression="zstd")),
+}
+
+
+def _dump_statements_cache(path: str, financial_statements: Dict[str, Optional[pd.DataFrame]]) -> None:
+    """缓存目录中每张报表一个feather文件，_meta.json记录全部报表类型（获取失败的报表不写文件）"""
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for statement_type, df in financial_statements.items():
+        if df is not None:
+            df.reset_index(drop=True).to_feather(os.path.join(tmp_path, f"{statement_type}.feather"))
+    with open(os.path.join(tmp_path, "_meta.json"), 'w', encoding='utf-8') as f:
+        json.dump(list(financial_statements), f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+
+def _load_statements_cache(path: str) -> Dict[str, Optional[pd.DataFrame]]:
+    with open(os.path.join(path, "_meta.json"), 'r', encoding='utf-8') as f:
+        statement_types = json.load(f)
+    financial_statements = {}
+    for statement_type in statement_types:
+        file_path = os.path.join(path, f"{statement_type}.feather")
+        financial_statements[statement_type] = pd.read_feather(file_path) if os.path.exists(file_path) else None
+    return financial_statements
+
+
+# 财务报表的磁盘缓存序列化方式（见toolset.utils.fetch_cache），用feather保留列类型，不用pickle
+STATEMENTS_CACHE_CODEC = (".statements", _dump_statements_cache, _load_statements_cache)
+
+
+def save_financial_statements(financial_statements: Dict[str, Optional[pd.DataFrame]],
+                              stock_code: str = "00020",
+                              market: str = "HK",
+                              period: str = "年度",
+                              company_name: Optional[str] = None,
+                              save_dir: str = ".",
+                              fmt: str = "feather") -> None:
     """
-    将财务报表保存为CSV文件
+    将财务报表按指定格式保存
+    
+    每张报表是一个DataFrame，整表一次性交给pandas写出，不做逐行写入；
+    值为None（获取失败）的报表跳过。列式格式写出失败（如未安装pyarrow）时回退为CSV。
     
     Args:
-        financial_statements (Dict): 包含财务报表的字典
+        financial_statements (Dict): 包含财务报表的字典，键为报表类型，值为DataFrame或None
         stock_code (str): 股票代码，用于文件命名
         market (str): 股票市场，"HK"为港股，"A"为A股
         period (str): 报告期间，用于文件命名
         company_name (str): 公司名称，用于文件命名，如果为None则只使用股票代码
         save_dir (str): 保存文件的目录，默认为当前目录
+        fmt (str): 存储格式，"feather"（默认，内部交换）、"parquet"（归档）或"csv"
     """
+    if fmt not in _STATEMENT_WRITERS:
+        raise ValueError(f"不支持的存储格式: {fmt}")
     for statement_type, df in financial_statements.items():
-        if df is not None:
-            if company_name:
-                filename = f"{company_name}_{market}_{stock_code}_{statement_type}_{period}.csv"
-            else:
-                filename = f"{market}_{stock_code}_{statement_type}_{period}.csv"
-            
-            # 使用指定目录保存文件
-            filepath = os.path.join(save_dir, filename)
-            df.to_csv(filepath, index=False, encoding='utf-8-sig')
-            # print(f"已保存 {statement_type} 到文件: {filepath}")
+        if df is None:
+            continue
+        if company_name:
+            stem = f"{company_name}_{market}_{stock_code}_{statement_type}_{period}"
         else:
-            # print(f"跳过保存 {statement_type}，因为数据获取失败")
-            pass
+            stem = f"{market}_{stock_code}_{statement_type}_{period}"
+        
+        suffix, writer = _STATEMENT_WRITERS[fmt]
+        try:
+            writer(df, os.path.join(save_dir, stem + suffix))
+        except (ImportError, ValueError, TypeError) as e:
+            if fmt == "csv":
+                raise
+            print(f"⚠️ {stem} 保存为{fmt}失败（{e}），改为保存CSV")
+            suffix, writer = _STATEMENT_WRITERS["csv"]
+            writer(df, os.path.join(save_dir, stem + suffix))
+
+
+def save_financial_statements_to_csv(financial_statements: Dict[str, Optional[pd.DataFrame]], 
+                                   stock_code: str = "00020", 
+                                   market: str = "HK",
+                                   period: str = "年度",
+                                   company_name: Optional[str] = None,
+                                   save_dir: str = ".") -> None:
+    """将财务报表保存为CSV文件，参数同save_financial_statements"""
+    save_financial_statements(financial_statements, stock_code, market, period, company_name, save_dir, fmt="csv")
+
+
+def save_financial_statements_to_parquet(financial_statements: Dict[str, Optional[pd.DataFrame]],
+                                         stock_code: str = "00020",
+                                         market: str = "HK",
+                                         period: str = "年度",
+                                         company_name: Optional[str] = None,
+                                         save_dir: str = ".") -> None:
+    """将财务报表保存为Parquet文件（snappy压缩），读取比CSV快且体积更小，参数同save_financial_statements"""
+    save_financial_statements(financial_statements, stock_code, market, period, company_name, save_dir, fmt="parquet")
+
+
+def convert_csv_dir_to_parquet(data_dir: str, remove_csv: bool = False) -> int:
+    """
+    将目录下已有的CSV财务报表一次性转换为Parquet
+    
+    Returns:
+        int: 成功转换的文件数
+    """
+    converted = 0
+    with os.scandir(data_dir) as it:
+        for entry in it:
+            if not entry.is_file() or not entry.name.endswith(".csv"):
+                continue
+            target = entry.path[:-4] + ".parquet"
+            try:
+                pd.read_csv(entry.path, encoding='utf-8-sig').to_parquet(target, index=False, compression="snappy")
+            except (ImportError, ValueError, TypeError) as e:
+                print(f"⚠️ 转换失败 {entry.name}: {e}")
+                continue
+            converted += 1
+            if remove_csv:
+                os.remove(entry.path)
+    return converted
 
 
 
@@ -1,5 +1,6 @@
 import requests
 from bs4 import BeautifulSoup
+from .http_session import get_session
 from typing import Dict, List, Optional
 
 
@@ -43,7 +44,7 @@ def get_shareholder_info(stock_code: str = "HK0020",
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = get_session().get(url, headers=headers, timeout=30)
         response.raise_for_status()
         response.encoding = 'utf-8'
         
@@ -1,7 +1,9 @@
-import akshare as ak
 import pandas as pd
 from typing import Optional, Literal
 
+from .akshare_loader import get_akshare
+
+
 def get_stock_intro(symbol: str = "000066", market: Literal["A", "HK"] = "A") -> Optional[str]:
     """
     获取股票的基本介绍信息，包括主营业务、经营范围等。
@@ -15,7 +17,7 @@ def get_stock_intro(symbol: str = "000066", market: Literal["A", "HK"] = "A") ->
         # 去掉A股代码的SH/SZ前缀
         clean_symbol = symbol.replace('SH', '').replace('SZ', '')
         try:
-            df = ak.stock_zyjs_ths(symbol=clean_symbol)
+            df = get_akshare().stock_zyjs_ths(symbol=clean_symbol)
             if df is not None and not df.empty:
                 return df.to_string(index=False)
         except Exception as e:
@@ -25,7 +27,7 @@ def get_stock_intro(symbol: str = "000066", market: Literal["A", "HK"] = "A") ->
         # 去掉港股代码的HK前缀
         clean_symbol = symbol.replace('HK', '')
         try:
-            df = ak.stock_hk_company_profile_em(symbol=clean_symbol)
+            df = get_akshare().stock_hk_company_profile_em(symbol=clean_symbol)
             if df is not None and not df.empty:
                 return df.to_string(index=False)
         except Exception as e:
@@ -0,0 +1,31 @@
+"""
+共享HTTP连接池
+同一线程内的requests请求复用同一个Session，保持长连接，避免每次请求重新进行TCP/TLS握手
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Session不保证线程安全，按线程各自持有（与search_engine中DDGS客户端的做法一致）
+_session_local = threading.local()
+
+
+def _new_session() -> requests.Session:
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset({"GET", "HEAD"}))
+    adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """获取当前线程复用的Session，首次调用时创建"""
+    session = getattr(_session_local, "session", None)
+    if session is None:
+        session = _session_local.session = _new_session()
+    return session
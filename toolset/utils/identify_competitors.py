@@ -5,6 +5,8 @@ from typing import Dict, List
 
 import openai
 
+from .yaml_io import load_yaml
+
 def identify_competitors_with_ai(api_key,
                                  base_url,
                                  model_name, 
@@ -74,7 +76,7 @@ def identify_competitors_with_ai(api_key,
     
     try:
         # 解析YAML格式
-        data = yaml.safe_load(competitors_text)
+        data = load_yaml(competitors_text)
         competitors = data.get('competitors', [])
         return competitors[:5]
     except yaml.YAMLError:
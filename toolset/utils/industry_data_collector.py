@@ -1,11 +1,9 @@
 # industry_data_collector.py
 import os
-import json
 import requests
 from typing import Dict, List, Any, Optional
-import time
-from .search_engine import SearchEngine
-import random
+from .search_engine import SearchEngine, search_many
+from .json_io import dump_json
 
 class IndustryDataCollector:
     """行业数据收集器"""
@@ -25,18 +23,12 @@ class IndustryDataCollector:
                 f"{industry_name} 行业分析报告"
             ]
             
-            results = {}
-            for query in search_queries:
-                print(f"🔍 搜索: {query}")
-                search_results = list(self.search_engines.search(query, max_results=5))
-                results[query] = search_results
-                time.sleep(random.uniform(1, 2))
+            results = search_many(self.search_engines, search_queries, max_results=5, label="搜索")
             
             # 保存结果
             filename = f"{industry_name}_overview.json"
             filepath = os.path.join(self.industry_dir, filename)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
+            dump_json(filepath, results)
                 
             return results
             
@@ -53,18 +45,12 @@ class IndustryDataCollector:
                 f"{industry_name} 产业链分析 价值链"
             ]
             
-            results = {}
-            for query in search_queries:
-                print(f"🔍 搜索产业链: {query}")
-                search_results = list(self.search_engines.search(query, max_results=5))
-                results[query] = search_results
-                time.sleep(random.uniform(1, 2))
+            results = search_many(self.search_engines, search_queries, max_results=5, label="搜索产业链")
             
             # 保存结果
             filename = f"{industry_name}_chain_analysis.json"
             filepath = os.path.join(self.industry_dir, filename)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
+            dump_json(filepath, results)
                 
             return results
             
@@ -81,18 +67,12 @@ class IndustryDataCollector:
                 f"{industry_name} 政策解读 发展规划"
             ]
             
-            results = {}
-            for query in search_queries:
-                print(f"🔍 搜索政策影响: {query}")
-                search_results = list(self.search_engines.search(query, max_results=5))
-                results[query] = search_results
-                time.sleep(random.uniform(1, 2))
+            results = search_many(self.search_engines, search_queries, max_results=5, label="搜索政策影响")
             
             # 保存结果
             filename = f"{industry_name}_policy_impact.json"
             filepath = os.path.join(self.industry_dir, filename)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
+            dump_json(filepath, results)
                 
             return results
             
@@ -109,18 +89,12 @@ class IndustryDataCollector:
                 f"{industry_name} 技术演进 未来发展"
             ]
             
-            results = {}
-            for query in search_queries:
-                print(f"🔍 搜索技术趋势: {query}")
-                search_results = list(self.search_engines.search(query, max_results=5))
-                results[query] = search_results
-                time.sleep(random.uniform(1, 2))
+            results = search_many(self.search_engines, search_queries, max_results=5, label="搜索技术趋势")
             
             # 保存结果
             filename = f"{industry_name}_tech_trends.json"
             filepath = os.path.join(self.industry_dir, filename)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
+            dump_json(filepath, results)
                 
             return results
             
@@ -137,18 +111,12 @@ class IndustryDataCollector:
                 f"{industry_name} 行业白皮书 研究报告"
             ]
             
-            results = {}
-            for query in search_queries:
-                print(f"🔍 搜索协会报告: {query}")
-                search_results = list(self.search_engines.search(query, max_results=5))
-                results[query] = search_results
-                time.sleep(random.uniform(1, 2))
+            results = search_many(self.search_engines, search_queries, max_results=5, label="搜索协会报告")
             
             # 保存结果
             filename = f"{industry_name}_association_reports.json"
             filepath = os.path.join(self.industry_dir, filename)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
+            dump_json(filepath, results)
                 
             return results
             
@@ -165,18 +133,12 @@ class IndustryDataCollector:
                 f"{industry_name} 市场份额 竞争格局 排名"
             ]
             
-            results = {}
-            for query in search_queries:
-                print(f"🔍 搜索市场规模: {query}")
-                search_results = list(self.search_engines.search(query, max_results=5))
-                results[query] = search_results
-                time.sleep(random.uniform(1, 2))
+            results = search_many(self.search_engines, search_queries, max_results=5, label="搜索市场规模")
             
             # 保存结果
             filename = f"{industry_name}_market_scale.json"
             filepath = os.path.join(self.industry_dir, filename)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
+            dump_json(filepath, results)
                 
             return results
             
@@ -0,0 +1,49 @@
+import json
+
+# 尝试导入orjson，如果失败则回退到标准库json
+# 其他模块统一从这里导入orjson及可用标记，不再各自重复判断
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def loads(data):
+    """解析JSON字符串或UTF-8字节，优先使用orjson"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(data, default=None) -> str:
+    """序列化为2空格缩进的JSON字符串，default处理无法直接序列化的对象"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, default=default, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(data, indent=2, ensure_ascii=False, default=default)
+
+
+def dump_json(path: str, data, indent: bool = True) -> None:
+    """将数据以UTF-8写入JSON文件，优先使用orjson；indent=False时紧凑输出，用于只由程序读取的缓存文件"""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            payload = orjson.dumps(data, option=option)
+        except TypeError:
+            # orjson不支持的类型交给标准库处理
+            payload = None
+        if payload is not None:
+            with open(path, 'wb') as f:
+                f.write(payload)
+            return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2 if indent else None)
+
+
+def load_json(path: str):
+    """读取JSON文件，优先使用orjson"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
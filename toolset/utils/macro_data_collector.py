@@ -1,11 +1,9 @@
 # macro_data_collector.py
 import os
-import json
 import requests
 from typing import Dict, List, Any, Optional
-from .search_engine import SearchEngine
-import time
-import random
+from .search_engine import SearchEngine, search_many
+from .json_io import dump_json
 
 class MacroDataCollector:
     """宏观经济数据收集器"""
@@ -25,18 +23,12 @@ class MacroDataCollector:
                 f"{country} GDP构成 三大产业 统计数据"
             ]
             
-            results = {}
-            for query in search_queries:
-                print(f"🔍 搜索GDP数据: {query}")
-                search_results = list(self.search_engine.search(query, max_results=5))
-                results[query] = search_results
-                time.sleep(random.uniform(1, 2))
+            results = search_many(self.search_engine, search_queries, max_results=5, label="搜索GDP数据")
             
             # 保存结果
             filename = f"{country}_gdp_data.json"
             filepath = os.path.join(self.macro_dir, filename)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
+            dump_json(filepath, results)
                 
             return results
             
@@ -53,18 +45,12 @@ class MacroDataCollector:
                 f"{country} CPI走势 价格变化 统计局"
             ]
             
-            results = {}
-            for query in search_queries:
-                print(f"🔍 搜索CPI数据: {query}")
-                search_results = list(self.search_engine.search(query, max_results=5))
-                results[query] = search_results
-                time.sleep(random.uniform(1, 2))
+            results = search_many(self.search_engine, search_queries, max_results=5, label="搜索CPI数据")
             
             # 保存结果
             filename = f"{country}_cpi_data.json"
             filepath = os.path.join(self.macro_dir, filename)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
+            dump_json(filepath, results)
                 
             return results
             
@@ -81,18 +67,12 @@ class MacroDataCollector:
                 f"{country} 市场利率 银行间利率 走势"
             ]
             
-            results = {}
-            for query in search_queries:
-                print(f"🔍 搜索利率数据: {query}")
-                search_results = list(self.search_engine.search(query, max_results=5))
-                results[query] = search_results
-                time.sleep(random.uniform(1, 2))
+            results = search_many(self.search_engine, search_queries, max_results=5, label="搜索利率数据")
             
             # 保存结果
             filename = f"{country}_interest_rate_data.json"
             filepath = os.path.join(self.macro_dir, filename)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
+            dump_json(filepath, results)
                 
             return results
             
@@ -109,18 +89,12 @@ class MacroDataCollector:
                 f"汇率变动 外汇市场 汇率政策"
             ]
             
-            results = {}
-            for query in search_queries:
-                print(f"🔍 搜索汇率数据: {query}")
-                search_results = list(self.search_engine.search(query, max_results=5))
-                results[query] = search_results
-                time.sleep(random.uniform(1, 2))
+            results = search_many(self.search_engine, search_queries, max_results=5, label="搜索汇率数据")
             
             # 保存结果
             filename = f"exchange_rate.json"
             filepath = os.path.join(self.macro_dir, filename)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
+            dump_json(filepath, results)
                 
             return results
             
@@ -137,18 +111,12 @@ class MacroDataCollector:
                 "美国利率 联邦储备 利率变动 影响"
             ]
             
-            results = {}
-            for query in search_queries:
-                print(f"🔍 搜索美联储数据: {query}")
-                search_results = list(self.search_engine.search(query, max_results=5))
-                results[query] = search_results
-                time.sleep(random.uniform(1, 2))
+            results = search_many(self.search_engine, search_queries, max_results=5, label="搜索美联储数据")
             
             # 保存结果
             filename = "fed_interest_rate_data.json"
             filepath = os.path.join(self.macro_dir, filename)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
+            dump_json(filepath, results)
                 
             return results
             
@@ -165,18 +133,12 @@ class MacroDataCollector:
                 f"{country} 十四五规划 经济发展 政策文件"
             ]
             
-            results = {}
-            for query in search_queries:
-                print(f"🔍 搜索政策报告: {query}")
-                search_results = list(self.search_engine.search(query, max_results=5))
-                results[query] = search_results
-                time.sleep(random.uniform(1, 2))
+            results = search_many(self.search_engine, search_queries, max_results=5, label="搜索政策报告")
             
             # 保存结果
             filename = f"{country}_policy_reports.json"
             filepath = os.path.join(self.macro_dir, filename)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
+            dump_json(filepath, results)
                 
             return results
             
@@ -193,18 +155,12 @@ class MacroDataCollector:
                 f"{industry_name} 国家政策 发展政策 扶持政策"
             ]
             
-            results = {}
-            for query in search_queries:
-                print(f"🔍 搜索行业政策影响: {query}")
-                search_results = list(self.search_engine.search(query, max_results=5))
-                results[query] = search_results
-                time.sleep(random.uniform(1, 2))
+            results = search_many(self.search_engine, search_queries, max_results=5, label="搜索行业政策影响")
             
             # 保存结果
             filename = "policy_impact.json"
             filepath = os.path.join(self.macro_dir, filename)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
+            dump_json(filepath, results)
                 
             return results
             
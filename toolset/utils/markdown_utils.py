@@ -1,9 +1,10 @@
 import os
-import yaml
-import requests
+import glob
 import shutil
 from urllib.parse import urlparse
 import re
+from .http_session import get_session
+from .yaml_io import load_yaml
 
 def load_report_content(md_path):
         """加载报告内容"""
@@ -57,7 +58,7 @@ def generate_outline(llm, background, report_content):
             yaml_block = outline_list.split('```yaml')[1].split('```')[0]
         else:
             yaml_block = outline_list
-        parts = yaml.safe_load(yaml_block)
+        parts = load_yaml(yaml_block)
         if isinstance(parts, dict):
             parts = list(parts.values())
     except Exception as e:
@@ -66,12 +67,17 @@ def generate_outline(llm, background, report_content):
     return parts
 
 def generate_section(llm, part_title, prev_content, background, report_content, is_last):
-    """生成章节"""
-    section_prompt = f"""
-你是一位顶级金融分析师和研报撰写专家。请基于以下内容，直接输出\"{part_title}\"这一部分的完整研报内容。
+    """
+    生成章节
+
+    提示分为两段：要求、背景和财务研报汇总内容在各章节间完全相同，作为前缀放在最前，
+    以命中服务端提示前缀缓存；本次章节标题和已生成前文放在其后。前缀中不要插入任何随章节变化的内容。
+    """
+    section_prefix = f"""
+你是一位顶级金融分析师和研报撰写专家。请基于以下内容，直接输出【本次任务】中指定部分的完整研报内容。
 
 **重要要求：**
-1. 直接输出完整可用的研报内容，以\"## {part_title}\"开头
+1. 直接输出完整可用的研报内容，以\"## \"加【本次任务】中的标题开头
 2. 在正文中引用数据、事实、图片等信息时，适当位置插入参考资料符号（如[1][2][3]），符号需与文末引用文献编号一致
 3. **图片引用要求（务必严格遵守）：**
 - 只允许引用【财务研报汇总内容】中真实存在的图片地址（格式如：./images/图片名字.png），必须与原文完全一致。
@@ -88,12 +94,6 @@ def generate_section(llm, part_title, prev_content, background, report_content,
 - 主营业务信息标注：（数据来源：同花顺-主营介绍[2]）
 - 股东结构信息标注：（数据来源：同花顺-股东信息网页爬虫[3]）
 
-【本次任务】
-{part_title}
-
-【已生成前文】
-{prev_content}
-
 【背景说明开始】
 {background}
 【背景说明结束】
@@ -101,6 +101,13 @@ def generate_section(llm, part_title, prev_content, background, report_content,
 【财务研报汇总内容开始】
 {report_content}
 【财务研报汇总内容结束】
+"""
+    section_prompt = f"""
+【本次任务】
+{part_title}
+
+【已生成前文】
+{prev_content}
 """
     if is_last:
         section_prompt += """
@@ -113,10 +120,27 @@ def generate_section(llm, part_title, prev_content, background, report_content,
         section_prompt,
         system_prompt="你是顶级金融分析师，专门生成完整可用的研报内容。输出必须是完整的研报正文，无需用户修改。严格禁止输出分隔符、建议性语言或虚构内容。只允许引用真实存在于【财务研报汇总内容】中的图片地址，严禁虚构、猜测、改编图片路径。如引用了不存在的图片，将被判为错误输出。",
         max_tokens=8192,
-        temperature=0.5
+        temperature=0.5,
+        cache_system=True,
+        prefix=section_prefix
     )
     return section_text
 
+def summarize_section(llm, section_text, max_chars=400):
+    """将已生成章节压缩为要点摘要，供后续章节作为前文参考"""
+    summary = llm.call(
+        f"请将以下研报章节压缩为不超过{max_chars}字的要点摘要，保留章节标题、关键数据、主要结论，"
+        f"以及正文中出现的参考资料编号（如[1][2]）。只输出摘要本身。\n\n{section_text}",
+        system_prompt="你是资深金融研报编辑，擅长提炼章节要点。",
+        max_tokens=1024,
+        temperature=0,
+        cache_system=True
+    )
+    if summary:
+        return summary.strip()
+    # 摘要调用失败时退回截取章节开头（含标题）
+    return section_text[:max_chars]
+
 def save_markdown(content, output_file):
     """保存markdown文件"""
     with open(output_file, 'w', encoding='utf-8') as f:
@@ -173,7 +197,7 @@ def is_url(path):
 def download_image(url, save_path):
     """下载图片"""
     try:
-        resp = requests.get(url, stream=True, timeout=10)
+        resp = get_session().get(url, stream=True, timeout=10)
         resp.raise_for_status()
         with open(save_path, 'wb') as f:
             for chunk in resp.iter_content(1024):
@@ -227,7 +251,7 @@ def extract_images_from_markdown(md_path, images_dir, new_md_path):
         if is_url(img_path):
             # 下载网络图片
             try:
-                response = requests.get(img_path, stream=True)
+                response = get_session().get(img_path, stream=True)
                 response.raise_for_status()
                 with open(new_img_path, 'wb') as f:
                     shutil.copyfileobj(response.raw, f)
@@ -272,7 +296,6 @@ def extract_images_from_markdown(md_path, images_dir, new_md_path):
             # 查找所有图片文件
             image_files = []
             for ext in ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg']:
-                import glob
                 image_files.extend(glob.glob(os.path.join(session_path, ext)))
             
             if image_files:
@@ -24,8 +24,7 @@ class ReportTypeConfig:
                 ],
                 "data_tools": [
                     "get_competitor_listed_companies",
-                    "get_all_financial_data", 
-                    "get_all_company_info",
+                    "get_combined_company_data",
                     "get_shareholder_analysis",
                     "get_company_search_info"
                 ],
@@ -3,9 +3,15 @@
 支持 DuckDuckGo 和 Sogou 两种搜索方式
 """
 
+import os
 import time
-from typing import List, Dict, Any
+import random
+import asyncio
+import threading
+import itertools
+from typing import List, Dict, Any, Optional
 from duckduckgo_search import DDGS
+from .fetch_cache import disk_memoize
 
 # 尝试导入搜狗搜索，如果失败则只支持DDG
 try:
@@ -14,6 +20,64 @@ try:
 except ImportError:
     SOGOU_AVAILABLE = False
 
+# DDGS客户端按线程复用，避免每次搜索重新建立连接；客户端本身不保证线程安全，故不跨线程共享
+_ddgs_local = threading.local()
+
+# 可选代理池（环境变量DDGS_PROXIES，逗号分隔），新建的线程客户端依次轮换使用，分散搜索限流
+_DDGS_PROXIES = [p.strip() for p in os.environ.get("DDGS_PROXIES", "").split(",") if p.strip()]
+_proxy_cycle = itertools.cycle(_DDGS_PROXIES) if _DDGS_PROXIES else None
+_proxy_lock = threading.Lock()
+
+
+def _new_ddgs() -> DDGS:
+    if _proxy_cycle is None:
+        return DDGS()
+    with _proxy_lock:
+        proxy = next(_proxy_cycle)
+    try:
+        return DDGS(proxy=proxy)
+    except TypeError:
+        # 旧版本duckduckgo_search的参数名为proxies
+        return DDGS(proxies=proxy)
+
+
+def _get_ddgs() -> DDGS:
+    client = getattr(_ddgs_local, "client", None)
+    if client is None:
+        client = _ddgs_local.client = _new_ddgs()
+    return client
+
+# 限速抖动使用独立的随机数生成器，可通过seed复现请求节奏
+_RNG = random.Random()
+
+
+class AsyncRateLimiter:
+    """
+    异步限速器（容量为1的令牌桶）
+
+    相邻两次放行的间隔取[min_interval, max_interval]内的随机值，保留原有的随机抖动；
+    只限制请求的发出节奏，请求本身的网络耗时可以相互重叠。
+    """
+
+    def __init__(self, min_interval: float, max_interval: Optional[float] = None):
+        self.min_interval = min_interval
+        self.max_interval = max_interval if max_interval is not None else min_interval
+        self._next_slot = 0.0
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        # 读取与预订时间槽之间没有await，单个事件循环内天然原子
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + _RNG.uniform(self.min_interval, self.max_interval)
+        if slot > now:
+            await asyncio.sleep(slot - now)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
 class SearchEngine:
     """搜索引擎封装类"""
 
@@ -45,29 +109,50 @@ class SearchEngine:
         Returns:
             搜索结果列表，每个结果包含 title, url, description 字段
         """
+        cached = _cached_search.peek(self, keywords, max_results)
+        if cached is not None:
+            return cached
+        # 只有真正发出请求时才等待
+        results = _cached_search(self, keywords, max_results, force_refresh=True)
+        time.sleep(self.delay)
+        return results
+
+    async def asearch(self, keywords: str, max_results: int = 10,
+                      limiter: Optional[AsyncRateLimiter] = None) -> List[Dict[str, Any]]:
+        """
+        异步搜索接口，在工作线程中执行搜索
+
+        请求节奏由调用方共享的limiter统一控制，不再在每次搜索后固定sleep；命中缓存时不占用限速名额。
+        """
+        cached = await asyncio.to_thread(_cached_search.peek, self, keywords, max_results)
+        if cached is not None:
+            return cached
+        if limiter is None:
+            return await asyncio.to_thread(_cached_search, self, keywords, max_results, force_refresh=True)
+        async with limiter:
+            return await asyncio.to_thread(_cached_search, self, keywords, max_results, force_refresh=True)
+
+    def _search_once(self, keywords: str, max_results: int) -> List[Dict[str, Any]]:
+        """执行一次搜索（不含请求间延迟），搜狗失败时回退到DuckDuckGo"""
         print(f"使用 {self.engine.upper()} 搜索引擎搜索: '{keywords}'")
         try:
             if self.engine == "ddg":
-                results = self._search_ddg(keywords, max_results)
+                return self._search_ddg(keywords, max_results)
             elif self.engine == "sogou":
-                results = self._search_sogou(keywords, max_results)
-            else:
-                results = []
-            
-            time.sleep(self.delay)
-            return results
+                return self._search_sogou(keywords, max_results)
+            return []
         except Exception as e:
             print(f"搜索失败 ({self.engine}): {e}")
             # 如果搜狗失败，可以考虑回退
             if self.engine == "sogou":
                 print("搜狗搜索失败，尝试回退到 DuckDuckGo...")
                 self.engine = "ddg"
-                return self.search(keywords, max_results)
+                return self._search_once(keywords, max_results)
             return []
 
     def _search_ddg(self, keywords: str, max_results: int) -> List[Dict[str, Any]]:
         """DuckDuckGo 搜索"""
-        results = DDGS().text(
+        results = _get_ddgs().text(
             keywords=keywords,
             region="cn-zh",
             max_results=max_results
@@ -89,6 +174,44 @@ class SearchEngine:
         return sogou_search(keywords, num_results=max_results)
 
 
+def _search_cache_key(engine: "SearchEngine", keywords: str, max_results: int):
+    return engine.engine, keywords, max_results
+
+
+@disk_memoize("search", 3600, key=_search_cache_key)
+def _cached_search(engine: "SearchEngine", keywords: str, max_results: int) -> List[Dict[str, Any]]:
+    """
+    搜索结果缓存1小时，空结果不缓存
+
+    以(引擎类型, 关键词, 结果数)为键；未命中时在调用方的实例上搜索，搜狗失败后回退到DuckDuckGo的状态得以保留。
+    """
+    return engine._search_once(keywords, max_results)
+
+
+def search_many(engine: "SearchEngine", queries: List[str], max_results: int = 5, label: str = "搜索",
+                min_interval: float = 1, max_interval: float = 2,
+                max_concurrency: int = 3) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    并发执行多条相互独立的搜索，按查询顺序返回 {查询: 结果列表}
+
+    共享限速器保持相邻请求间隔在[min_interval, max_interval]秒，替代逐条搜索后的固定sleep；
+    同时最多max_concurrency个请求在途，网络等待相互重叠。
+    """
+    async def _run():
+        limiter = AsyncRateLimiter(min_interval, max_interval)
+        sem = asyncio.Semaphore(max_concurrency)
+
+        async def _one(query):
+            async with sem:
+                print(f"🔍 {label}: {query}")
+                return list(await engine.asearch(query, max_results, limiter))
+
+        found = await asyncio.gather(*(_one(q) for q in queries))
+        return dict(zip(queries, found))
+
+    return asyncio.run(_run())
+
+
 if __name__ == "__main__":
     # 测试代码
     print("测试搜索引擎封装...")
@@ -0,0 +1,9 @@
+import yaml
+
+# 优先使用libyaml的C实现加载器，未编译libyaml时回退到纯Python实现；其他模块统一从这里导入
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_yaml(stream):
+    """安全解析YAML字符串或文件对象"""
+    return yaml.load(stream, Loader=YAML_LOADER)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+LLM响应的持久化缓存模块
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+
+# 尝试导入zstandard，如果失败则使用标准库zlib压缩
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+def _compress(text: str) -> bytes:
+    """压缩响应文本，首字节标记压缩算法，便于在依赖变化后仍能读取旧数据"""
+    data = text.encode("utf-8")
+    if ZSTD_AVAILABLE:
+        return b"z" + zstandard.ZstdCompressor().compress(data)
+    return b"l" + zlib.compress(data)
+
+
+def _decompress(blob: bytes) -> str:
+    marker, payload = blob[:1], blob[1:]
+    if marker == b"z":
+        if not ZSTD_AVAILABLE:
+            raise ValueError("缓存数据使用zstd压缩，但未安装zstandard")
+        return zstandard.ZstdDecompressor().decompress(payload).decode("utf-8")
+    return zlib.decompress(payload).decode("utf-8")
+
+
+class CachedLLM:
+    """
+    带SQLite持久化缓存的LLMHelper包装
+
+    相同的(模型, 温度, 最大token数, 系统提示, 用户提示)直接返回缓存结果，跨进程运行保留；
+    调用失败返回的空字符串不写入缓存。其余属性和方法透传给被包装的LLMHelper。
+    """
+
+    def __init__(self, helper, db_path: str = ".llm_cache.sqlite", ttl_days: float = 7):
+        self.helper = helper
+        self.db_path = db_path
+        self.ttl_seconds = ttl_days * 86400
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, response BLOB, created_at INTEGER)"
+        )
+        self._conn.commit()
+
+    def __getattr__(self, name):
+        if name == "helper":
+            raise AttributeError(name)
+        return getattr(self.helper, name)
+
+    def _key(self, prompt: str, system_prompt: str, max_tokens: int, temperature: float, prefix: str = None) -> str:
+        config = self.helper.config
+        if max_tokens is None:
+            max_tokens = config.max_tokens
+        if temperature is None:
+            temperature = config.temperature
+        raw = f"{config.model}|{temperature}|{max_tokens}|{system_prompt or ''}|{prefix or ''}{prompt}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        try:
+            return _decompress(row[0])
+        except Exception:
+            return None
+
+    def _put(self, key: str, response: str):
+        if not response:
+            return
+        blob = _compress(response)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, created_at) VALUES (?, ?, ?)",
+                (key, blob, int(time.time()))
+            )
+            self._conn.commit()
+
+    def call(self, prompt: str, system_prompt: str = None, max_tokens: int = None, temperature: float = None,
+             cache_system: bool = False, prefix: str = None) -> str:
+        """同步调用LLM，优先读取缓存"""
+        key = self._key(prompt, system_prompt, max_tokens, temperature, prefix)
+        cached = self._get(key)
+        if cached is not None:
+            return cached
+        response = self.helper.call(prompt, system_prompt, max_tokens, temperature, cache_system, prefix)
+        self._put(key, response)
+        return response
+
+    async def async_call(self, prompt: str, system_prompt: str = None, max_tokens: int = None,
+                         temperature: float = None, cache_system: bool = False, prefix: str = None) -> str:
+        """异步调用LLM，优先读取缓存"""
+        key = self._key(prompt, system_prompt, max_tokens, temperature, prefix)
+        cached = self._get(key)
+        if cached is not None:
+            return cached
+        response = await self.helper.async_call(prompt, system_prompt, max_tokens, temperature, cache_system, prefix)
+        self._put(key, response)
+        return response
+
+    def clear_expired(self) -> int:
+        """删除过期条目，返回删除数量"""
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (int(time.time() - self.ttl_seconds),)
+            )
+            self._conn.commit()
+        return cur.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
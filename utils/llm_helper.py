@@ -4,9 +4,11 @@ LLM调用辅助模块
 """
 
 import asyncio
-import yaml
+import threading
 from config.llm_config import LLMConfig
 from utils.fallback_openai_client import AsyncFallbackOpenAIClient
+from toolset.utils.json_io import loads as json_loads
+from toolset.utils.yaml_io import load_yaml
 
 class LLMHelper:
     """LLM调用辅助类，支持同步和异步调用"""
@@ -18,13 +20,65 @@ class LLMHelper:
             primary_base_url=config.base_url,
             primary_model_name=config.model
         )
+        # 累计token用量，cached_tokens为命中服务端提示缓存的输入token数
+        self.usage_stats = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0}
+        self._usage_lock = threading.Lock()
     
-    async def async_call(self, prompt: str, system_prompt: str = None, max_tokens: int = None, temperature: float = None) -> str:
-        """异步调用LLM"""
+    def _system_message(self, system_prompt: str, cache_system: bool) -> dict:
+        """
+        构建system消息
+        
+        Anthropic需要显式标记可缓存的前缀；OpenAI兼容接口自动缓存相同前缀，
+        只需保证system提示位于最前且内容稳定。
+        """
+        if cache_system and self.config.provider == "anthropic":
+            return {"role": "system", "content": [
+                {"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}
+            ]}
+        return {"role": "system", "content": system_prompt}
+    
+    def _user_message(self, prompt: str, prefix: str, cache_system: bool) -> dict:
+        """
+        构建user消息
+        
+        prefix为多次调用间保持不变的前导内容（如背景资料），始终放在最前；
+        Anthropic下作为单独的内容块标记可缓存，其余接口直接拼接，依赖自动前缀缓存。
+        """
+        if not prefix:
+            return {"role": "user", "content": prompt}
+        if cache_system and self.config.provider == "anthropic":
+            return {"role": "user", "content": [
+                {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": prompt}
+            ]}
+        return {"role": "user", "content": prefix + prompt}
+    
+    def _record_usage(self, response):
+        """记录token用量及提示缓存命中情况"""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        # OpenAI兼容接口在prompt_tokens_details.cached_tokens，Anthropic在cache_read_input_tokens
+        cached = getattr(details, "cached_tokens", None) or getattr(usage, "cache_read_input_tokens", None) or 0
+        with self._usage_lock:
+            self.usage_stats["calls"] += 1
+            self.usage_stats["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+            self.usage_stats["cached_tokens"] += cached
+    
+    async def async_call(self, prompt: str, system_prompt: str = None, max_tokens: int = None, temperature: float = None,
+                         cache_system: bool = False, prefix: str = None) -> str:
+        """
+        异步调用LLM
+        
+        Args:
+            cache_system: system提示在多次调用间保持不变时设为True，启用服务端提示缓存
+            prefix: user消息中多次调用共享的前导内容，置于prompt之前，cache_system为True时一并缓存
+        """
         messages = []
         if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
+            messages.append(self._system_message(system_prompt, cache_system))
+        messages.append(self._user_message(prompt, prefix, cache_system))
         
         kwargs = {}
         if max_tokens is not None:
@@ -42,11 +96,13 @@ class LLMHelper:
                 messages=messages,
                 **kwargs
             )
+            self._record_usage(response)
             return response.choices[0].message.content
         except Exception as e:
             print(f"LLM调用失败: {e}")
             return ""
-    def call(self, prompt: str, system_prompt: str = None, max_tokens: int = None, temperature: float = None) -> str:
+    def call(self, prompt: str, system_prompt: str = None, max_tokens: int = None, temperature: float = None,
+             cache_system: bool = False, prefix: str = None) -> str:
         """同步调用LLM"""
         try:
             # 尝试获取当前事件循环
@@ -56,10 +112,10 @@ class LLMHelper:
                 try:
                     import nest_asyncio
                     nest_asyncio.apply()
-                    return asyncio.run(self.async_call(prompt, system_prompt, max_tokens, temperature))
+                    return asyncio.run(self.async_call(prompt, system_prompt, max_tokens, temperature, cache_system, prefix))
                 except ImportError:
                     # 如果没有nest_asyncio，使用create_task
-                    task = asyncio.create_task(self.async_call(prompt, system_prompt, max_tokens, temperature))
+                    task = asyncio.create_task(self.async_call(prompt, system_prompt, max_tokens, temperature, cache_system, prefix))
                     # 等待任务完成
                     import concurrent.futures
                     import threading
@@ -72,7 +128,7 @@ class LLMHelper:
                         try:
                             new_loop = asyncio.new_event_loop()
                             asyncio.set_event_loop(new_loop)
-                            result = new_loop.run_until_complete(self.async_call(prompt, system_prompt, max_tokens, temperature))
+                            result = new_loop.run_until_complete(self.async_call(prompt, system_prompt, max_tokens, temperature, cache_system, prefix))
                             new_loop.close()
                         except Exception as e:
                             exception = e
@@ -86,10 +142,10 @@ class LLMHelper:
                     return result
             else:
                 # 如果事件循环未运行，直接使用asyncio.run
-                return asyncio.run(self.async_call(prompt, system_prompt, max_tokens, temperature))
+                return asyncio.run(self.async_call(prompt, system_prompt, max_tokens, temperature, cache_system, prefix))
         except RuntimeError:
             # 如果没有事件循环，创建新的
-            return asyncio.run(self.async_call(prompt, system_prompt, max_tokens, temperature))
+            return asyncio.run(self.async_call(prompt, system_prompt, max_tokens, temperature, cache_system, prefix))
     
     def parse_yaml_response(self, response: str) -> dict:
         """解析YAML格式的响应"""
@@ -99,6 +155,10 @@ class LLMHelper:
                 start = response.find('```yaml') + 7
                 end = response.find('```', start)
                 yaml_content = response[start:end].strip()
+            elif '```json' in response:
+                start = response.find('```json') + 7
+                end = response.find('```', start)
+                yaml_content = response[start:end].strip()
             elif '```' in response:
                 start = response.find('```') + 3
                 end = response.find('```', start)
@@ -106,7 +166,13 @@ class LLMHelper:
             else:
                 yaml_content = response.strip()
             
-            return yaml.safe_load(yaml_content)
+            # 模型常直接返回JSON，先尝试JSON解析（远快于YAML），失败再按YAML解析
+            if yaml_content[:1] in ('{', '['):
+                try:
+                    return json_loads(yaml_content)
+                except ValueError:
+                    pass
+            return load_yaml(yaml_content)
         except Exception as e:
             print(f"YAML解析失败: {e}")
             print(f"原始响应: {response}")
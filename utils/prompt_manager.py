@@ -1,24 +1,55 @@
-import yaml
+import functools
 import json
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemLoader, Template
 from typing import Dict, List
+from toolset.utils.yaml_io import load_yaml
+
+
+@functools.lru_cache(maxsize=8)
+def _get_environment(template_dir: str) -> Environment:
+    """同一模板目录共享一个Environment，模板编译结果随之缓存"""
+    return Environment(loader=FileSystemLoader(template_dir), auto_reload=False)
+
+
+@functools.lru_cache(maxsize=32)
+def _get_compiled_template(template_dir: str, template_name: str) -> Template:
+    """获取编译好的模板，每个模板只解析编译一次"""
+    return _get_environment(template_dir).get_template(template_name)
+
+
+@functools.lru_cache(maxsize=32)
+def _load_yaml(path: str) -> dict:
+    """解析YAML文件，结果只读共享"""
+    with open(path, "r", encoding="utf-8") as f:
+        return load_yaml(f)
+
+
+@functools.lru_cache(maxsize=32)
+def _load_json(path: str) -> dict:
+    """解析JSON文件，结果只读共享"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
 
 class PromptManager:
     def __init__(self, base_dir="prompts"):
-        self.env = Environment(loader=FileSystemLoader(f"{base_dir}/template"))
+        self.template_dir = f"{base_dir}/template"
+        self.env = _get_environment(self.template_dir)
+
+    def get_template(self, template_name: str) -> Template:
+        """获取编译好的模板，调用方可持有并反复render"""
+        return _get_compiled_template(self.template_dir, template_name)
 
     def load_system_prompt(self, planner_yaml_path: str, agent_name: str) -> str:
         # 加载工具信息
-        with open(planner_yaml_path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
+        data = _load_yaml(planner_yaml_path)
 
         # 从JSON文件加载身份信息
         json_path = "prompts/planner/agent_profile_prompt.json"
-        with open(json_path, "r", encoding="utf-8") as f:
-            json_data = json.load(f)
-            agent_config = json_data.get("agents", {}).get(agent_name, {})
-            prompt = agent_config.get("identity", "") + "\n\n"
-            tool_available = agent_config.get("tools", "")
+        json_data = _load_json(json_path)
+        agent_config = json_data.get("agents", {}).get(agent_name, {})
+        prompt = agent_config.get("identity", "") + "\n\n"
+        tool_available = agent_config.get("tools", "")
             
         for tool in data.get("tools", []):
             if tool["name"] not in tool_available:
@@ -34,8 +65,7 @@ class PromptManager:
     def load_system_prompt_from_profile(self, planner_yaml_path: str, profile, toolset: List[str]) -> str:
         """从agent profile动态生成system prompt"""
         # 加载工具信息
-        with open(planner_yaml_path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
+        data = _load_yaml(planner_yaml_path)
 
         # 从profile生成身份描述
         identity = self._generate_identity_from_profile(profile)
@@ -73,5 +103,4 @@ class PromptManager:
         return identity
     
     def render_user_prompt(self, template_name: str, context: dict) -> str:
-        template = self.env.get_template(template_name)
-        return template.render(**context)
+        return self.get_template(template_name).render(**context)